@@ -7,15 +7,21 @@ LOVANTVICTORIA営業支援システム
 
 import os
 import json
+import atexit
 import time
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
-import threading
 import logging
 
 # フォーム自動化ロジックをインポート
-from form_automation import process_urls, setup_logging
+from form_automation import process_urls, setup_logging, launch_browser
+from browser_pool import BrowserPool, WARM_POOL_SIZE, resolve_chromedriver_path
+from job_journal import journal_path_for
+from dataset_cache import file_content_hash, cached_metadata
+from contact_index import get_contact_index, KIND_URL, KIND_DOMAIN
+from job_manager import JobManager, JobRejected, JOB_QUEUED, ACTIVE_STATES
+from engine_metrics import ENGINE_METRICS, render_gauge
 
 # Flaskアプリケーションの初期化
 app = Flask(__name__)
@@ -30,21 +36,13 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# グローバル変数で処理状態を管理
-processing_status = {
-    'is_running': False,
-    'current_url': '',
-    'total_urls': 0,
-    'processed': 0,
-    'success': 0,
-    'failed': 0,
-    'results': [],
-    'output_file': None
-}
+# ジョブ管理（ジョブごとに処理状態・結果・出力ファイルを保持し、ブラウザ予算の範囲で並行実行）
+# 起動済みChromeのプール（ブラウザ枠ごとに保持し、ジョブ間で使い回す）
+browser_pool = BrowserPool(launch_browser)
+job_manager = JobManager(process_urls, browser_pool=browser_pool)
 
-# グローバルで実行中のスレッドとWebDriverを管理
-current_thread = None
-current_driver = None
+# SSEで変化がないときに送るキープアライブの間隔（秒）
+SSE_KEEPALIVE_SECONDS = 15
 
 def allowed_file(filename):
     """アップロード可能なファイル形式をチェック"""
@@ -77,13 +75,26 @@ def upload_file():
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
             file.save(filepath)
             
-            # ファイルを読み取ってURL数をカウント
-            from form_automation import read_input_file, get_target_urls
+            from form_automation import load_input_dataset
             
             try:
-                df = read_input_file(filepath)
-                urls = get_target_urls(df)
-                url_count = len(urls)
+                # 同じ内容のファイルを解析済みならキャッシュの件数を返す（解析を省略）
+                content_hash = file_content_hash(filepath)
+                cached = cached_metadata(content_hash)
+                if cached:
+                    url_count = cached['url_count']
+                    total_rows = cached['rows']
+                    logger.info(f"解析済みデータセットを再利用: {filename}")
+                else:
+                    # ファイルを1回だけ少しずつ読み取り、URL数を数えながら処理開始時に使うキャッシュを書き込む
+                    # （シート全体は保持しない）
+                    stats = {}
+                    url_count = len(load_input_dataset(filepath, content_hash=content_hash, stats=stats))
+                    if 'total_rows' in stats:
+                        total_rows = stats['total_rows']
+                    else:
+                        # 同じ内容のファイルが同時にアップロードされ、先にキャッシュされた
+                        total_rows = cached_metadata(content_hash)['rows']
                 
                 logger.info(f"ファイルアップロード成功: {filename}, URL数: {url_count}")
                 return jsonify({
@@ -91,7 +102,7 @@ def upload_file():
                     'filename': filename,
                     'filepath': filepath,
                     'url_count': url_count,
-                    'total_rows': len(df)
+                    'total_rows': total_rows
                 })
                 
             except Exception as e:
@@ -113,10 +124,17 @@ def upload_file():
 @app.route('/start_processing', methods=['POST'])
 def start_processing():
     """フォーム送信処理を開始"""
+    return _start_job(resume=False)
+
+@app.route('/resume', methods=['POST'])
+def resume_processing():
+    """中断した処理をジャーナルから再開（記録済みの行は再送信しない）"""
+    return _start_job(resume=True)
+
+def _start_job(resume):
+    """リクエスト内容を検証してジョブを登録（ブラウザ予算に空きがあればすぐ開始）"""
+    label = '再開' if resume else '開始'
     try:
-        if processing_status['is_running']:
-            return jsonify({'error': '既に処理中です'}), 400
-        
         data = request.get_json()
         if not data or 'filepath' not in data:
             return jsonify({'error': 'ファイルパスが指定されていません'}), 400
@@ -125,124 +143,134 @@ def start_processing():
         if not os.path.exists(filepath):
             return jsonify({'error': 'ファイルが見つかりません'}), 400
         
-        # 処理状態を初期化
-        processing_status.update({
-            'is_running': True,
-            'current_url': '',
-            'total_urls': 0,
-            'processed': 0,
-            'success': 0,
-            'failed': 0,
-            'results': [],
-            'output_file': None
-        })
-        
-        # バックグラウンドで処理を開始
-        global current_thread
-        current_thread = threading.Thread(
-            target=run_automation_background,
-            args=(filepath,)
-        )
-        current_thread.daemon = True
-        current_thread.start()
+        if resume and not os.path.exists(journal_path_for(filepath)):
+            return jsonify({'error': '再開できる処理記録がありません'}), 400
         
-        logger.info(f"自動化処理開始: {filepath}")
-        return jsonify({'message': '処理を開始しました'})
+        preflight = bool(data.get('preflight', True))
         
-    except Exception as e:
-        logger.error(f"処理開始エラー: {str(e)}")
-        return jsonify({'error': f'処理開始エラー: {str(e)}'}), 500
-
-def run_automation_background(filepath):
-    """バックグラウンドで自動化処理を実行"""
-    global current_driver
-    try:
-        # フォーム自動化処理を実行
-        # WebDriverコールバック関数を定義
-        def set_current_driver(driver):
-            global current_driver
-            current_driver = driver
+        try:
+            workers = int(data.get('workers', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'ワーカー数は整数で指定してください'}), 400
+        if workers < 1:
+            return jsonify({'error': 'ワーカー数は1以上で指定してください'}), 400
         
-        result = process_urls(
-            filepath,
-            processing_status,
-            update_status_callback,
-            driver_callback=set_current_driver
-        )
+        try:
+            job = job_manager.submit(filepath, {
+                'workers': workers,
+                'fast_fill': bool(data.get('fast_fill', False)),
+                'preflight': preflight,
+                'resume': resume,
+                'command_stats': bool(data.get('command_stats', False)),
+                'profile': bool(data.get('profile', False))
+            })
+        except JobRejected as e:
+            return jsonify({'error': str(e)}), 409
         
-        # 処理完了
-        processing_status['is_running'] = False
-        processing_status['output_file'] = result.get('output_file')
-        
-        logger.info(f"処理完了: 成功={processing_status['success']}, 失敗={processing_status['failed']}")
-        
-        # WebDriver参照をクリア
-        current_driver = None
+        logger.info(f"自動化処理{label}: {filepath} (ジョブ: {job.id}, ワーカー数: {job.workers})")
+        return jsonify({
+            'message': f'処理を{label}しました' if job.state != JOB_QUEUED else '処理待ちキューに追加しました',
+            'job_id': job.id,
+            'state': job.state
+        })
         
     except Exception as e:
-        logger.error(f"バックグラウンド処理エラー: {str(e)}")
-        processing_status['is_running'] = False
-        current_driver = None
+        logger.error(f"処理{label}エラー: {str(e)}")
+        return jsonify({'error': f'処理{label}エラー: {str(e)}'}), 500
 
-def update_status_callback(current_url, processed, success, failed, total, results):
-    """処理状況を更新するコールバック関数"""
-    processing_status.update({
-        'current_url': current_url,
-        'processed': processed,
-        'success': success,
-        'failed': failed,
-        'total_urls': total,
-        'results': results
+def _get_job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return None, (jsonify({'error': 'ジョブが見つかりません'}), 404)
+    return job, None
+
+@app.route('/jobs')
+def list_jobs():
+    """ジョブ一覧とブラウザ予算の使用状況を取得"""
+    return jsonify({
+        'jobs': job_manager.list_jobs(),
+        'browser_budget': job_manager.browser_budget,
+        'browsers_in_use': job_manager.browsers_in_use(),
+        'warm_browsers': browser_pool.size()
     })
 
-@app.route('/status')
-def get_status():
-    """現在の処理状況を取得"""
-    return jsonify(processing_status)
+@app.route('/metrics')
+def metrics():
+    """処理時間のヒストグラム・処理件数・処理速度・キューの状態（Prometheusのテキスト形式）"""
+    stats = job_manager.queue_stats()
+    lines = ENGINE_METRICS.render()
+    lines += render_gauge('form_jobs', '状態別のジョブ数', stats['states'], 'state')
+    lines += render_gauge('form_job_queue_depth', '実行待ちのジョブ数', stats['queued'])
+    lines += render_gauge('form_urls_pending', '実行中ジョブの未処理URL数', stats['pending_urls'])
+    lines += render_gauge('form_browsers_in_use', '使用中のブラウザ枠', job_manager.browsers_in_use())
+    lines += render_gauge('form_browser_budget', 'ブラウザ予算', job_manager.browser_budget)
+    lines += render_gauge('form_warm_browsers', '事前起動済みのブラウザ', browser_pool.size())
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/jobs/<job_id>/status')
+def get_status(job_id):
+    """ジョブの処理状況を取得（?since=N で N 件目以降の結果だけを返す）"""
+    job, error = _get_job_or_404(job_id)
+    if error:
+        return error
+    since = request.args.get('since', 0, type=int)
+    return jsonify(job.snapshot(since))
 
-@app.route('/stop', methods=['POST'])
-def stop_processing():
-    """処理を停止"""
+@app.route('/jobs/<job_id>/events')
+def stream_status(job_id):
+    """ジョブの進捗をServer-Sent Eventsで配信（前回送信以降の結果だけを送る）"""
+    job, error = _get_job_or_404(job_id)
+    if error:
+        return error
+    since = request.args.get('since', 0, type=int)
+    
+    def generate():
+        cursor = since
+        version = None
+        while True:
+            current = job.wait_for_change(version, SSE_KEEPALIVE_SECONDS) if version is not None else job.version
+            if current == version:
+                # 変化がなくても接続を維持するためのコメント行
+                yield ': keepalive\n\n'
+                continue
+            version = current
+            snapshot = job.snapshot(cursor)
+            cursor = snapshot['cursor']
+            event = 'progress' if snapshot['state'] in ACTIVE_STATES else 'done'
+            yield f"event: {event}\ndata: {json.dumps(snapshot, ensure_ascii=False, default=str)}\n\n"
+            if event == 'done':
+                break
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/<job_id>/stop', methods=['POST'])
+def stop_processing(job_id):
+    """ジョブを停止（実行待ちならキューから取り消し）"""
     try:
-        global current_driver, current_thread
-        
-        # 処理状態を停止に設定
-        processing_status['is_running'] = False
-        logger.info("処理停止要求")
-        
-        # WebDriverが存在する場合は強制終了
-        if current_driver:
-            try:
-                logger.info("WebDriverを強制終了中...")
-                current_driver.quit()
-                current_driver = None
-                logger.info("WebDriver終了完了")
-            except Exception as e:
-                logger.warning(f"WebDriver終了エラー（無視）: {str(e)}")
-        
-        # スレッドが存在し実行中の場合は終了を待機
-        if current_thread and current_thread.is_alive():
-            logger.info("バックグラウンドスレッドの終了を待機中...")
-            # スレッドの終了を少し待機（最大3秒）
-            current_thread.join(timeout=3)
-            if current_thread.is_alive():
-                logger.warning("スレッドが終了しませんでしたが、処理を続行します")
-            current_thread = None
-        
-        return jsonify({'message': '処理を停止しました'})
+        if not job_manager.stop(job_id):
+            return jsonify({'error': 'ジョブが見つかりません'}), 404
+        return jsonify({'message': '処理を停止しました', 'job_id': job_id})
     except Exception as e:
         logger.error(f"処理停止エラー: {str(e)}")
         return jsonify({'error': f'停止エラー: {str(e)}'}), 500
 
-@app.route('/download')
-def download_result():
-    """処理結果ファイルをダウンロード"""
+@app.route('/jobs/<job_id>/download')
+def download_result(job_id):
+    """ジョブの処理結果ファイルをダウンロード"""
     try:
-        output_file = processing_status.get('output_file')
+        job, error = _get_job_or_404(job_id)
+        if error:
+            return error
+        
+        output_file = job.status.get('output_file')
         if not output_file or not os.path.exists(output_file):
             return jsonify({'error': '結果ファイルが見つかりません'}), 404
         
-        logger.info(f"結果ファイルダウンロード: {output_file}")
+        logger.info(f"結果ファイルダウンロード: {output_file} (ジョブ: {job_id})")
         return send_file(
             output_file,
             as_attachment=True,
@@ -252,6 +280,53 @@ def download_result():
         logger.error(f"ダウンロードエラー: {str(e)}")
         return jsonify({'error': f'ダウンロードエラー: {str(e)}'}), 500
 
+@app.route('/jobs/<job_id>/reports/<kind>')
+def download_report(job_id, kind):
+    """ジョブの計測レポート（kind: commands = WebDriverコマンド集計, profile = プロファイル）をダウンロード"""
+    job, error = _get_job_or_404(job_id)
+    if error:
+        return error
+    
+    report_file = (job.status.get('reports') or {}).get(kind)
+    if not report_file or not os.path.exists(report_file):
+        return jsonify({'error': '計測レポートが見つかりません'}), 404
+    
+    logger.info(f"計測レポートダウンロード: {report_file} (ジョブ: {job_id})")
+    return send_file(report_file, as_attachment=True, download_name=os.path.basename(report_file))
+
+@app.route('/suppressions')
+def list_suppressions():
+    """配信停止リストを取得"""
+    return jsonify({'suppressions': get_contact_index().list_suppressions()})
+
+@app.route('/suppressions', methods=['POST'])
+def add_suppressions():
+    """配信停止リストに追加（values にURLまたはドメインのリスト、kind は 'domain' か 'url'）"""
+    try:
+        data = request.get_json() or {}
+        kind = data.get('kind', KIND_DOMAIN)
+        if kind not in (KIND_URL, KIND_DOMAIN):
+            return jsonify({'error': "kind は 'domain' または 'url' を指定してください"}), 400
+        values = data.get('values') or ([data['value']] if data.get('value') else [])
+        if not values:
+            return jsonify({'error': '追加するURLまたはドメインが指定されていません'}), 400
+        
+        index = get_contact_index()
+        added = [index.add_suppression(str(value), kind, data.get('reason', '')) for value in values]
+        logger.info(f"配信停止リストに追加: {kind} {len(added)}件")
+        return jsonify({'message': f'{len(added)}件を配信停止リストに追加しました', 'added': added})
+    except Exception as e:
+        logger.error(f"配信停止リスト追加エラー: {str(e)}")
+        return jsonify({'error': f'配信停止リスト追加エラー: {str(e)}'}), 500
+
+@app.route('/suppressions', methods=['DELETE'])
+def remove_suppression():
+    """配信停止リストから削除（kind と value は一覧の値をそのまま指定）"""
+    data = request.get_json() or {}
+    if not get_contact_index().remove_suppression(data.get('value', ''), data.get('kind', KIND_DOMAIN)):
+        return jsonify({'error': '配信停止リストに登録されていません'}), 404
+    return jsonify({'message': '配信停止リストから削除しました'})
+
 @app.errorhandler(404)
 def not_found(error):
     """404エラーハンドラ"""
@@ -284,5 +359,13 @@ if __name__ == '__main__':
     print("   3. export DISPLAY=:99 でディスプレイ設定")
     print("=" * 60)
     
+    # ChromeDriverを解決し、ブラウザを事前起動しておく（最初のジョブの起動待ちをなくす）
+    try:
+        resolve_chromedriver_path()
+        browser_pool.warm(range(min(WARM_POOL_SIZE, job_manager.browser_budget)))
+        atexit.register(browser_pool.shutdown)
+    except Exception as e:
+        logger.warning(f"ブラウザの事前起動をスキップ: {str(e)}")
+    
     # GCE本番環境対応（外部からのアクセスを許可）
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク群
+LOVANTVICTORIA営業支援システム
+
+リポジトリ直下から `python -m benchmarks.<モジュール名>` で実行する。
+"""
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入力抽出・結果結合のベンチマーク
+get_target_urls / merge_results（列単位処理）と、従来の iterrows / 行ごとの df.loc 代入を比較する。
+
+実行例:
+    python -m benchmarks.bench_dataframe_io
+    python -m benchmarks.bench_dataframe_io --rows 10000 100000 --legacy-max-rows 100000
+"""
+
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+
+from form_automation import get_target_urls, merge_results
+
+def legacy_get_target_urls(df, url_column='contact_url'):
+    """従来の iterrows による抽出（比較用）"""
+    urls = []
+    for idx, row in df.iterrows():
+        url = str(row[url_column]).strip()
+        if url and url != 'nan' and url.lower().startswith('http'):
+            urls.append({
+                'index': idx,
+                'url': url,
+                'company': row.get('company', row.get('会社名', f'行{idx+1}'))
+            })
+    return urls
+
+def legacy_merge_results(df, results):
+    """従来の行ごとの df.loc 代入による結合（比較用）"""
+    df['processing_status'] = 'not_processed'
+    df['processing_error'] = ''
+    df['processing_timestamp'] = ''
+    for result in results:
+        idx = result.get('index', -1)
+        if idx >= 0 and idx < len(df):
+            df.loc[idx, 'processing_status'] = result['status']
+            df.loc[idx, 'processing_error'] = result['error']
+            df.loc[idx, 'processing_timestamp'] = result['timestamp']
+    return df
+
+def make_dataset(rows, seed=0):
+    """URLの7割が有効なダミーのマスターリストを生成"""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, 10, size=rows)
+    urls = np.where(
+        kinds < 7,
+        np.char.add(' https://example', np.char.add(np.arange(rows).astype(str), '.co.jp/contact ')),
+        np.where(kinds < 9, 'info@example.com', '')
+    )
+    return pd.DataFrame({
+        'company': np.char.add('会社', np.arange(rows).astype(str)),
+        'contact_url': urls,
+        'address': '東京都'
+    })
+
+def make_results(urls):
+    """抽出したURLすべてに対するダミーの処理結果"""
+    return [
+        {'index': url_info['index'], 'status': 'success' if i % 3 else 'failed',
+         'error': '送信成功' if i % 3 else 'フォーム欄が見つかりません',
+         'timestamp': '2025-01-01 00:00:00'}
+        for i, url_info in enumerate(urls)
+    ]
+
+def timed(func, *args):
+    started = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - started
+
+def run(rows_list, legacy_max_rows):
+    print(f"{'行数':>10} | {'処理':<16} | {'従来(秒)':>10} | {'列単位(秒)':>10} | {'高速化':>8}")
+    print('-' * 68)
+    for rows in rows_list:
+        df = make_dataset(rows)
+
+        urls, fast_extract = timed(get_target_urls, df)
+        results = make_results(urls)
+        merged, fast_merge = timed(merge_results, df.copy(), results)
+
+        legacy_extract = legacy_merge = None
+        if rows <= legacy_max_rows:
+            legacy_urls, legacy_extract = timed(legacy_get_target_urls, df)
+            legacy_merged, legacy_merge = timed(legacy_merge_results, df.copy(), results)
+            # 結果が一致することを確認（空白除去後のURLで比較）
+            assert [u['url'] for u in legacy_urls] == [u['url'] for u in urls]
+            assert (legacy_merged['processing_status'] == merged['processing_status']).all()
+
+        for label, legacy, fast in (('URL抽出', legacy_extract, fast_extract),
+                                    ('結果結合', legacy_merge, fast_merge)):
+            legacy_text = f'{legacy:10.3f}' if legacy is not None else f"{'(省略)':>10}"
+            speedup = f'{legacy / fast:7.1f}x' if legacy is not None else f"{'-':>8}"
+            print(f'{rows:>10,} | {label:<16} | {legacy_text} | {fast:10.3f} | {speedup}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='入力抽出・結果結合のベンチマーク')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=1_000_000,
+                        help='従来実装を計測する最大行数（これより大きい行数では省略）')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    run(args.rows, args.legacy_max_rows)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
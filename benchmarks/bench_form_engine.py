@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フォーム処理エンジンのオフラインベンチマーク
+LOVANTVICTORIA営業支援システム
+
+ローカルのフォームサイト（benchmarks/fixture_site.py）を起動し、そのURLを並べたCSVを
+process_urls で処理する。段階ごと（navigate/detect/fill/selects/submit/confirm/verify）の処理時間、
+1分あたりの処理URL数、処理結果と入力内容の正解率を集計し、保存済みのベースラインと比較する。
+実行にはChromeとChromeDriverが必要（外部サイトにはアクセスしない）。
+
+実行例:
+    python -m benchmarks.bench_form_engine --save-baseline
+    python -m benchmarks.bench_form_engine --workers 2 --repeat 3 --label workers2
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import form_automation
+from form_automation import process_urls, FORM_FIELD_VALUES
+from engine_metrics import SPAN_NAMES
+from benchmarks.fixture_site import FixtureSite, FORM_VARIANTS
+
+# ベースラインの保存先
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'form_engine.json')
+
+# 悪化とみなす割合（時間は増加、処理速度は減少）
+REGRESSION_TOLERANCE = 0.2
+
+# 時間の指標で無視する差（秒、計測のばらつき）
+MIN_TIME_DELTA = 0.25
+
+STAGES = SPAN_NAMES
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+def score_fields(variant, submission):
+    """期待するフィールドのうち、正しく入力・選択された数と期待数を返す"""
+    expected = len(variant['fields']) + len(variant['choices'])
+    if not expected:
+        return 0, 0
+    if submission is None:
+        return 0, expected
+    posted = submission['fields']
+    correct = 0
+    for name, field_type in variant['fields'].items():
+        value = posted.get(name, '')
+        # 種別がNoneの欄は空のままが正解
+        wanted = FORM_FIELD_VALUES[field_type] if field_type else ''
+        if value.replace('\r\n', '\n') == wanted.replace('\r\n', '\n'):
+            correct += 1
+    for name in variant['choices']:
+        if posted.get(name):
+            correct += 1
+    return correct, expected
+
+def evaluate(corpus, results, site, wall_time):
+    """処理結果と送信内容を期待値と照合して指標を作る"""
+    by_token = {}
+    for result in results:
+        token = parse_qs(urlsplit(result['url']).query).get('r', [''])[0]
+        by_token[token] = result
+
+    stage_values = {stage: [] for stage in STAGES}
+    elapsed_values = []
+    variants = {}
+    outcome_matches = 0
+    fields_correct = 0
+    fields_expected = 0
+    browser_processed = 0
+
+    for entry in corpus:
+        variant = FORM_VARIANTS[entry['variant']]
+        result = by_token.get(entry['token'], {'status': 'missing', 'error': '結果なし'})
+        submission = site.submission_log.get(entry['token'])
+
+        succeeded = result['status'] == 'success'
+        outcome_ok = result['status'] != 'missing' and succeeded == (variant['expect'] == 'success')
+        correct, expected = score_fields(variant, submission)
+        outcome_matches += outcome_ok
+        fields_correct += correct
+        fields_expected += expected
+
+        if result['status'] in ('success', 'failed') and 'elapsed' in result:
+            browser_processed += 1
+            elapsed_values.append(result['elapsed'])
+            for stage, seconds in (result.get('stage_timings') or {}).items():
+                stage_values.setdefault(stage, []).append(seconds)
+
+        summary = variants.setdefault(entry['variant'], {
+            'runs': 0, 'success': 0, 'outcome_ok': 0, 'fields_correct': 0, 'fields_expected': 0, 'errors': []
+        })
+        summary['runs'] += 1
+        summary['success'] += succeeded
+        summary['outcome_ok'] += outcome_ok
+        summary['fields_correct'] += correct
+        summary['fields_expected'] += expected
+        if not outcome_ok and result.get('error') not in summary['errors']:
+            summary['errors'].append(result.get('error'))
+
+    return {
+        'urls': len(corpus),
+        'browser_processed': browser_processed,
+        'wall_time': round(wall_time, 2),
+        'urls_per_minute': round(len(corpus) / wall_time * 60, 2) if wall_time else None,
+        'outcome_accuracy': round(outcome_matches / len(corpus), 4) if corpus else None,
+        'field_accuracy': round(fields_correct / fields_expected, 4) if fields_expected else None,
+        'elapsed': {'p50': percentile(elapsed_values, 50), 'p95': percentile(elapsed_values, 95)},
+        'stages': {
+            stage: {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'count': len(values)}
+            for stage, values in stage_values.items()
+        },
+        'variants': variants
+    }
+
+def run_benchmark(repeat, workers, engine_options, host_interval, keep_workdir=False):
+    """フォームサイトに対して process_urls を1回実行し、指標を返す"""
+    workdir = tempfile.mkdtemp(prefix='form_bench_')
+    original_cwd = os.getcwd()
+    original_interval = form_automation.INTER_URL_INTERVAL
+    site = FixtureSite(hosts=workers).start()
+    try:
+        # キャッシュ・ジャーナル・連絡履歴が前回の実行や本番データと混ざらないよう作業フォルダで実行
+        os.chdir(workdir)
+        form_automation.INTER_URL_INTERVAL = host_interval
+
+        corpus = site.corpus(repeat)
+        input_path = os.path.join(workdir, 'fixture_urls.csv')
+        pd.DataFrame({
+            'company': [f"{entry['variant']}#{entry['token']}" for entry in corpus],
+            'contact_url': [entry['url'] for entry in corpus]
+        }).to_csv(input_path, index=False)
+
+        collected = {}
+
+        def callback(current_url, processed, success, failed, total, results):
+            collected['results'] = list(results)
+
+        status = {
+            'is_running': True, 'processed': 0, 'success': 0, 'failed': 0, 'skipped': 0,
+            'current_url': '', 'total_urls': 0
+        }
+        options = dict(engine_options, workers=workers, dedup=False, dataset_cache=False, resume=False)
+
+        started = time.time()
+        outcome = process_urls(input_path, status, callback, options=options)
+        wall_time = time.time() - started
+        if not outcome.get('success'):
+            raise RuntimeError(f"process_urls が失敗しました: {outcome.get('error')}")
+
+        results = collected.get('results', [])
+        return evaluate(corpus, results, site, wall_time)
+    finally:
+        os.chdir(original_cwd)
+        form_automation.INTER_URL_INTERVAL = original_interval
+        site.stop()
+        if keep_workdir:
+            print(f"作業フォルダ: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def load_baselines(path=BASELINE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_baseline(label, metrics, options, path=BASELINE_PATH):
+    baselines = load_baselines(path)
+    baselines[label] = {
+        'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'options': options,
+        'metrics': metrics
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def compare(metrics, baseline, tolerance=REGRESSION_TOLERANCE):
+    """ベースラインとの比較行 [(指標, ベースライン, 今回, 悪化したか)] を返す"""
+    rows = []
+
+    def lower_is_better(name, old, new):
+        if old is None or new is None:
+            return
+        worse = new > old * (1 + tolerance) and new - old > MIN_TIME_DELTA
+        rows.append((name, old, new, worse))
+
+    def higher_is_better(name, old, new, allowed):
+        if old is None or new is None:
+            return
+        rows.append((name, old, new, new < old - allowed))
+
+    higher_is_better('outcome_accuracy', baseline['outcome_accuracy'], metrics['outcome_accuracy'], 0)
+    higher_is_better('field_accuracy', baseline['field_accuracy'], metrics['field_accuracy'], 0)
+    higher_is_better('urls_per_minute', baseline['urls_per_minute'], metrics['urls_per_minute'],
+                     (baseline['urls_per_minute'] or 0) * tolerance)
+    for key in ('p50', 'p95'):
+        lower_is_better(f'elapsed.{key}', baseline['elapsed'][key], metrics['elapsed'][key])
+    for stage in STAGES:
+        old = baseline['stages'].get(stage, {})
+        new = metrics['stages'].get(stage, {})
+        for key in ('p50', 'p95'):
+            lower_is_better(f'{stage}.{key}', old.get(key), new.get(key))
+    return rows
+
+def report(metrics):
+    print(f"URL数: {metrics['urls']} (ブラウザで処理: {metrics['browser_processed']})  "
+          f"所要時間: {metrics['wall_time']}秒  処理速度: {metrics['urls_per_minute']} URL/分")
+    print(f"処理結果の正解率: {metrics['outcome_accuracy']}  入力内容の正解率: {metrics['field_accuracy']}")
+    print()
+    print(f"{'段階':>10} {'p50(秒)':>9} {'p95(秒)':>9} {'件数':>6}")
+    for stage, values in metrics['stages'].items():
+        print(f"{stage:>10} {str(values['p50']):>9} {str(values['p95']):>9} {values['count']:>6}")
+    print(f"{'合計':>10} {str(metrics['elapsed']['p50']):>9} {str(metrics['elapsed']['p95']):>9}")
+    print()
+    print(f"{'バリエーション':>18} {'成功':>6} {'結果一致':>8} {'入力':>8}  誤り")
+    for name, summary in metrics['variants'].items():
+        fields = f"{summary['fields_correct']}/{summary['fields_expected']}"
+        print(f"{name:>18} {summary['success']:>3}/{summary['runs']:<2} "
+              f"{summary['outcome_ok']:>5}/{summary['runs']:<2} {fields:>8}  {'; '.join(map(str, summary['errors']))}")
+
+def report_comparison(rows, label, recorded_at):
+    print()
+    print(f"ベースライン '{label}'（{recorded_at}）との比較:")
+    print(f"{'指標':>18} {'ベースライン':>12} {'今回':>10}")
+    for name, old, new, worse in rows:
+        print(f"{name:>18} {old:>12} {new:>10}{'  ← 悪化' if worse else ''}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='フォーム処理エンジンのオフラインベンチマーク')
+    parser.add_argument('--repeat', type=int, default=2, help='各バリエーションを処理する回数')
+    parser.add_argument('--workers', type=int, default=1, help='並列ワーカー数（同数のポートにURLを分散）')
+    parser.add_argument('--host-interval', type=float, default=0,
+                        help='同一ホストの開始間隔（秒、実サイト向けの既定値は使わない）')
+    parser.add_argument('--detection-mode', choices=['snapshot', 'selectors'], default='snapshot')
+    parser.add_argument('--fast-fill', action='store_true', help='入力・選択をスクリプトで一括設定')
+    parser.add_argument('--form-cache', action='store_true', help='フォームレイアウトキャッシュを使う')
+    parser.add_argument('--no-preflight', action='store_true', help='HTTP事前チェックを行わない')
+    parser.add_argument('--label', default='default', help='ベースラインの名前')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='ベースラインファイル')
+    parser.add_argument('--save-baseline', action='store_true', help='今回の結果をベースラインとして保存')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE, help='悪化とみなす割合')
+    parser.add_argument('--keep-workdir', action='store_true', help='結果ファイル・ログの作業フォルダを残す')
+    parser.add_argument('--verbose', action='store_true', help='エンジンのログを表示')
+    args = parser.parse_args(argv)
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    else:
+        logging.disable(logging.WARNING)
+
+    engine_options = {
+        'detection_mode': args.detection_mode,
+        'fast_fill': args.fast_fill,
+        'form_cache': args.form_cache,
+        'preflight': not args.no_preflight
+    }
+    recorded_options = dict(engine_options, repeat=args.repeat, workers=args.workers,
+                            host_interval=args.host_interval)
+
+    metrics = run_benchmark(args.repeat, args.workers, engine_options, args.host_interval, args.keep_workdir)
+    report(metrics)
+
+    if args.save_baseline:
+        save_baseline(args.label, metrics, recorded_options, args.baseline)
+        print(f"\nベースライン '{args.label}' を保存しました: {args.baseline}")
+        return 0
+
+    baseline = load_baselines(args.baseline).get(args.label)
+    if baseline is None:
+        print(f"\nベースライン '{args.label}' がありません（--save-baseline で保存）")
+        return 0
+    if baseline['options'] != recorded_options:
+        print(f"\n注意: ベースラインと条件が異なります {baseline['options']}")
+
+    rows = compare(metrics, baseline['metrics'], args.tolerance)
+    report_comparison(rows, args.label, baseline['recorded_at'])
+    regressions = [name for name, _, _, worse in rows if worse]
+    if regressions:
+        print(f"\n悪化した指標: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
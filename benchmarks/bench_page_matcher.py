@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ページ判定のパターン照合のベンチマーク
+従来のパターンごとの部分一致ループ（確認画面判定は page_source 全体を小文字化して走査）、
+パターン表を1つの正規表現にまとめた方式、page_matcher（小文字化済みのパターン表・コンパクトな抽出）を
+比較する。page_matcher の判定結果が従来と一致することも確認する。
+
+実行例:
+    python -m benchmarks.bench_page_matcher
+    python -m benchmarks.bench_page_matcher --source-kb 50 300 --repeat 500
+"""
+
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+
+from page_matcher import (
+    SUBMIT_BUTTON_TEXTS, CONFIRMATION_BUTTON_TEXTS, SUCCESS_URL_PATTERNS, SUCCESS_MESSAGES,
+    SUCCESS_TITLE_PATTERNS, CONFIRMATION_PATTERNS, SUBMIT_BUTTONS, CONFIRMATION_BUTTONS,
+    match_success, match_confirmation
+)
+
+def legacy_detect_success(current_url, page_text, title):
+    """従来の detect_success の照合部分（比較用）"""
+    current_url = current_url.lower()
+    for pattern in ['thanks', 'complete', 'success', 'finish', 'done', 'thankyou', 'sent']:
+        if pattern in current_url:
+            return f"成功URL検出: {current_url} (パターン: {pattern})"
+    page_text = page_text.lower()
+    success_messages = [
+        '送信しました', 'ありがとう', '受け付けました', '完了', '送信完了',
+        'thank you', 'success', 'submitted', 'received', 'sent successfully',
+        'お問い合わせありがとう', 'メッセージを送信', '正常に送信'
+    ]
+    for msg in success_messages:
+        if msg.lower() in page_text:
+            return f"成功メッセージ検出: {msg}"
+    title = title.lower()
+    for pattern in ['thanks', 'thank you', 'complete', 'success', '完了', 'ありがとう']:
+        if pattern in title:
+            return f"成功タイトル検出: {title}"
+    return None
+
+def legacy_is_confirmation(page_source, current_url):
+    """従来の確認画面判定（page_source 全体を走査、比較用）"""
+    page_source = page_source.lower()
+    current_url = current_url.lower()
+    confirmation_patterns = ['確認', 'confirm', 'preview', 'check', '内容確認', 'verification']
+    return any(pattern in page_source or pattern in current_url for pattern in confirmation_patterns)
+
+def legacy_text_position(haystack, texts):
+    """従来のボタンテキストの優先順位判定（比較用）"""
+    haystack = haystack.strip().lower()
+    for position, text in enumerate(texts):
+        if text.lower() in haystack:
+            return position
+    return None
+
+def compile_alternation(patterns):
+    """パターン表を1つの正規表現（選択）にまとめる（比較用）"""
+    return re.compile('|'.join(re.escape(pattern.lower()) for pattern in dict.fromkeys(patterns)))
+
+REGEX_SUCCESS = [compile_alternation(SUCCESS_URL_PATTERNS), compile_alternation(SUCCESS_MESSAGES),
+                 compile_alternation(SUCCESS_TITLE_PATTERNS)]
+REGEX_CONFIRMATION = compile_alternation(CONFIRMATION_PATTERNS)
+REGEX_SUBMIT = compile_alternation(SUBMIT_BUTTON_TEXTS)
+
+def regex_success(page):
+    """正規表現でまとめた成功判定（一致の有無のみ、比較用）"""
+    return any(regex.search(page[key]) for regex, key in zip(REGEX_SUCCESS, ('url', 'text', 'title')))
+
+def regex_confirmation(page):
+    return any(REGEX_CONFIRMATION.search(page[key]) for key in ('url', 'title', 'text', 'controls'))
+
+FILLER_WORDS = [
+    '株式会社', 'サービス', '会社概要', 'ニュース', 'プライバシーポリシー', 'アクセス', '採用情報',
+    'solutions', 'products', 'about', 'news', 'privacy', 'recruit', 'access', 'Copyright'
+]
+
+def make_page(kind, source_kb, seed=0):
+    """判定対象のページを (page_source, 抽出dict) で生成
+
+    kind: form（入力画面）/ confirm（確認画面）/ thanks（完了画面）
+    """
+    rng = random.Random(seed)
+    body_words = [rng.choice(FILLER_WORDS) for _ in range(400)]
+    if kind == 'confirm':
+        body_words.insert(200, '入力内容の確認')
+    elif kind == 'thanks':
+        body_words.append('お問い合わせありがとうございました。')
+    text = ' '.join(body_words)
+    controls = {'form': '送信する /contact/post', 'confirm': '戻る 送信する /contact/complete', 'thanks': ''}[kind]
+    url = {'form': 'https://example.co.jp/contact/', 'confirm': 'https://example.co.jp/contact/post',
+           'thanks': 'https://example.co.jp/contact/'}[kind]
+
+    # HTMLは本文に加えてスクリプト・スタイル・属性で膨らむ
+    markup = []
+    while sum(map(len, markup)) < source_kb * 1024:
+        markup.append(
+            f'<div class="c-block__item js-item-{rng.randint(0, 9999)}" data-id="{rng.randint(0, 99999)}">'
+            f'<a href="/news/{rng.randint(0, 999)}">{rng.choice(FILLER_WORDS)}</a></div>'
+            '<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments);}</script>'
+        )
+    source = f'<html><head><title>{kind}</title></head><body>{"".join(markup)}<p>{text}</p></body></html>'
+    page = {'url': url.lower(), 'title': kind, 'text': text.lower(), 'controls': controls.lower()}
+    return source, page
+
+BUTTON_LABELS = ['送信する', '確認画面へ', '次へ進む', 'Send message', 'CONTACT US', 'リセット', '戻る',
+                 'Submit', '確定する', 'はい', 'OK', 'Search', 'メニュー', 'confirm']
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+def check_equivalence(pages):
+    """従来の判定と同じ結果になるか確認し、不一致の件数を返す"""
+    mismatches = 0
+    for kind, (source, page) in pages.items():
+        if legacy_detect_success(page['url'], page['text'], page['title']) != match_success(page):
+            print(f"成功判定が不一致: {kind}")
+            mismatches += 1
+    for label in BUTTON_LABELS:
+        for texts, table in ((SUBMIT_BUTTON_TEXTS, SUBMIT_BUTTONS), (CONFIRMATION_BUTTON_TEXTS, CONFIRMATION_BUTTONS)):
+            if legacy_text_position(label, texts) != table.first(label.strip().lower()):
+                print(f"ボタン順位が不一致: {label}")
+                mismatches += 1
+    return mismatches
+
+def run(source_sizes, repeat):
+    print(f"{'HTML':>8} {'画面':>8} {'処理':>10} {'従来(µs)':>10} {'正規表現(µs)':>12} {'新(µs)':>8} "
+          f"{'倍率':>7} {'転送(従来/新)':>14}")
+    mismatches = 0
+    for source_kb in source_sizes:
+        pages = {kind: make_page(kind, source_kb) for kind in ('form', 'confirm', 'thanks')}
+        mismatches += check_equivalence(pages)
+        for kind, (source, page) in pages.items():
+            extract_size = sum(len(value) for value in page.values())
+            cases = [
+                ('成功判定',
+                 lambda: legacy_detect_success(page['url'], page['text'], page['title']),
+                 lambda: regex_success(page),
+                 lambda: match_success(page)),
+                ('確認画面判定',
+                 lambda: legacy_is_confirmation(source, page['url']),
+                 lambda: regex_confirmation(page),
+                 lambda: match_confirmation(page)),
+            ]
+            for name, legacy, regex, current in cases:
+                legacy_time = timed(legacy, repeat)
+                regex_time = timed(regex, repeat)
+                current_time = timed(current, repeat)
+                sizes = f"{len(source) // 1024}KB/{extract_size // 1024}KB" if name == '確認画面判定' else ''
+                print(f"{source_kb:>6}KB {kind:>8} {name:>8} {legacy_time * 1e6:>10.1f} {regex_time * 1e6:>12.1f} "
+                      f"{current_time * 1e6:>8.1f} {legacy_time / current_time:>6.1f}x {sizes:>14}")
+
+    labels = BUTTON_LABELS * 10
+    legacy_time = timed(lambda: [legacy_text_position(label, SUBMIT_BUTTON_TEXTS) for label in labels], repeat)
+    regex_time = timed(lambda: [REGEX_SUBMIT.search(label.strip().lower()) for label in labels], repeat)
+    current_time = timed(lambda: [SUBMIT_BUTTONS.first(label.strip().lower()) for label in labels], repeat)
+    print(f"\nボタン候補{len(labels)}件の順位付け: 従来 {legacy_time * 1e6:.1f}µs / "
+          f"正規表現（一致の有無のみ） {regex_time * 1e6:.1f}µs / 新 {current_time * 1e6:.1f}µs "
+          f"({legacy_time / current_time:.1f}x)")
+    print(f"判定結果の不一致: {mismatches}件")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ページ判定のパターン照合のベンチマーク')
+    parser.add_argument('--source-kb', type=int, nargs='+', default=[30, 150, 600], help='page_sourceの大きさ（KB）')
+    parser.add_argument('--repeat', type=int, default=200, help='各計測の繰り返し回数')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    return 1 if run(args.source_kb, args.repeat) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用のローカル問い合わせフォームサイト
+LOVANTVICTORIA営業支援システム
+
+実在のサイトに送信せずにフォーム処理エンジンを計測するため、よくある問い合わせフォームの
+バリエーション（Contact Form 7形式の name 属性、id・placeholderだけの入力欄、プルダウンと
+ラジオボタン、確認画面、サンクスページへのリダイレクト、応答の遅いページ、壊れたページ）を
+127.0.0.1 上で配信する。送信された内容はURLごとに記録し、期待値との照合に使う。
+
+単体で起動して中身を確認する場合:
+    python -m benchmarks.fixture_site --port 8765
+"""
+
+import sys
+import time
+import logging
+import argparse
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+# 応答の遅いページの遅延（秒）
+SLOW_PAGE_DELAY = 4
+
+# フォーム送信時に付与する識別用の hidden 項目名
+TOKEN_FIELD = '_bench'
+
+# 各バリエーションの入力欄
+# fields: {name属性: 期待するフィールド種別（FORM_FIELD_VALUES のキー、Noneは入力されないこと）}
+# choices: 何か選択されているべき select / radio の name属性
+# flow: inline（送信先で完了メッセージ）/ redirect（サンクスページへ303）/ confirm（確認画面を経由）/
+#       reject（入力エラーで同じフォームを再表示）
+# expect: 期待する処理結果（success / failed）
+FORM_VARIANTS = {
+    'cf7': {
+        'title': 'お問い合わせ | Contact Form 7',
+        'form': """
+<div class="wpcf7" id="wpcf7-f5-p10-o1">
+<form action="{action}" method="post" class="wpcf7-form init" novalidate="novalidate">
+  <p><label>お名前（必須）<br><span class="wpcf7-form-control-wrap your-name">
+    <input type="text" name="your-name" size="40" class="wpcf7-form-control wpcf7-text" aria-required="true"></span></label></p>
+  <p><label>メールアドレス（必須）<br><span class="wpcf7-form-control-wrap your-email">
+    <input type="email" name="your-email" size="40" class="wpcf7-form-control wpcf7-email" aria-required="true"></span></label></p>
+  <p><label>題名<br><span class="wpcf7-form-control-wrap your-subject">
+    <input type="text" name="your-subject" size="40" class="wpcf7-form-control wpcf7-text"></span></label></p>
+  <p><label>メッセージ本文<br><span class="wpcf7-form-control-wrap your-message">
+    <textarea name="your-message" cols="40" rows="10" class="wpcf7-form-control wpcf7-textarea"></textarea></span></label></p>
+  <p><input type="submit" value="送信" class="wpcf7-form-control wpcf7-submit"></p>
+</form>
+</div>""",
+        'fields': {'your-name': 'name', 'your-email': 'email', 'your-message': 'message', 'your-subject': None},
+        'choices': [],
+        'flow': 'inline',
+        'expect': 'success'
+    },
+    'id-only': {
+        'title': 'Contact',
+        'form': """
+<form action="{action}" method="post">
+  <div><input type="text" id="fullname" name="f1"></div>
+  <div><input type="text" id="organization" name="f2"></div>
+  <div><input type="text" id="mailaddress" name="f3"></div>
+  <div><input type="tel" id="telephone" name="f4"></div>
+  <div><textarea id="inquiry" name="f5"></textarea></div>
+  <button type="submit">Submit</button>
+</form>""",
+        'fields': {'f1': 'name', 'f2': 'company', 'f3': 'email', 'f4': 'phone', 'f5': 'message'},
+        'choices': [],
+        'flow': 'redirect',
+        'expect': 'success'
+    },
+    'placeholder-only': {
+        'title': 'お問い合わせフォーム',
+        'form': """
+<form action="{action}" method="post">
+  <input type="text" name="q[0]" placeholder="お名前">
+  <input type="text" name="q[1]" placeholder="会社名">
+  <input type="text" name="q[2]" placeholder="メールアドレス">
+  <input type="text" name="q[3]" placeholder="電話番号">
+  <textarea name="q[4]" placeholder="お問い合わせ内容"></textarea>
+  <input type="submit" value="送信する">
+</form>""",
+        'fields': {'q[0]': 'name', 'q[1]': 'company', 'q[2]': 'email', 'q[3]': 'phone', 'q[4]': 'message'},
+        'choices': [],
+        'flow': 'redirect',
+        'expect': 'success'
+    },
+    'select-radio': {
+        'title': 'お問い合わせ',
+        'form': """
+<form action="{action}" method="post">
+  <p>お問い合わせ種別
+    <select name="category">
+      <option value="">選択してください</option>
+      <option value="service">サービスについて</option>
+      <option value="other">その他</option>
+    </select></p>
+  <p>ご連絡方法
+    <label><input type="radio" name="reply" value="mail">メール</label>
+    <label><input type="radio" name="reply" value="phone">電話</label></p>
+  <p><label for="c-company">会社名</label><input type="text" id="c-company" name="company"></p>
+  <p><label for="c-name">お名前</label><input type="text" id="c-name" name="name"></p>
+  <p><label for="c-email">メール</label><input type="email" id="c-email" name="email"></p>
+  <p><label for="c-body">内容</label><textarea id="c-body" name="body"></textarea></p>
+  <p><button type="submit">送信</button></p>
+</form>""",
+        'fields': {'company': 'company', 'name': 'name', 'email': 'email', 'body': 'message'},
+        'choices': ['category', 'reply'],
+        'flow': 'inline',
+        'expect': 'success'
+    },
+    'confirm-page': {
+        'title': 'お問い合わせ（入力）',
+        'form': """
+<form action="{action}" method="post">
+  <dl>
+    <dt>会社名</dt><dd><input type="text" name="company"></dd>
+    <dt>お名前</dt><dd><input type="text" name="name"></dd>
+    <dt>メールアドレス</dt><dd><input type="email" name="email"></dd>
+    <dt>電話番号</dt><dd><input type="tel" name="tel"></dd>
+    <dt>お問い合わせ内容</dt><dd><textarea name="message"></textarea></dd>
+  </dl>
+  <input type="submit" value="入力内容を確認する">
+</form>""",
+        'fields': {'company': 'company', 'name': 'name', 'email': 'email', 'tel': 'phone', 'message': 'message'},
+        'choices': [],
+        'flow': 'confirm',
+        'expect': 'success'
+    },
+    'slow': {
+        'title': 'お問い合わせ',
+        'form': """
+<form action="{action}" method="post">
+  <p>お名前 <input type="text" name="name"></p>
+  <p>メール <input type="email" name="email"></p>
+  <p>内容 <textarea name="message"></textarea></p>
+  <p><input type="submit" value="送信"></p>
+</form>""",
+        'fields': {'name': 'name', 'email': 'email', 'message': 'message'},
+        'choices': [],
+        'flow': 'redirect',
+        'expect': 'success',
+        'delay': SLOW_PAGE_DELAY
+    },
+    'rejects-input': {
+        'title': 'お問い合わせ',
+        'form': """
+<form action="{action}" method="post">
+  <p>お名前 <input type="text" name="name"></p>
+  <p>メール <input type="email" name="email"></p>
+  <p>内容 <textarea name="message"></textarea></p>
+  <p><input type="submit" value="送信"></p>
+</form>""",
+        'fields': {'name': 'name', 'email': 'email', 'message': 'message'},
+        'choices': [],
+        'flow': 'reject',
+        'expect': 'failed'
+    },
+    'no-form': {
+        'title': '会社概要',
+        'body': '<h1>会社概要</h1><p>お問い合わせはお電話でお願いいたします。</p>',
+        'fields': {},
+        'choices': [],
+        'flow': 'inline',
+        'expect': 'failed'
+    },
+    'server-error': {
+        'title': '500 Internal Server Error',
+        'body': '<h1>Internal Server Error</h1>',
+        'fields': {},
+        'choices': [],
+        'flow': 'inline',
+        'expect': 'failed',
+        'http_status': 500
+    }
+}
+
+_PAGE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+</body></html>"""
+
+_CONFIRM_BODY = """<h1>入力内容の確認</h1>
+<p>以下の内容でよろしければ「送信する」ボタンを押してください。</p>
+<form action="{action}" method="post">
+<table>{rows}</table>
+{hidden}
+<input type="button" value="戻る" onclick="history.back()">
+<input type="submit" value="送信する">
+</form>"""
+
+_INLINE_DONE_BODY = '<h1>お問い合わせ</h1><p>お問い合わせありがとうございました。メッセージは送信されました。</p>'
+
+_THANKS_BODY = '<h1>送信完了</h1><p>お問い合わせを受け付けました。担当者よりご連絡いたします。</p>'
+
+_REJECT_BODY = '<p class="error">入力内容に誤りがあります。もう一度ご入力ください。</p>'
+
+class SubmissionLog:
+    """フォームサイトが受け取った送信内容（トークンごと）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def submitted(self, token, fields):
+        """最初の送信（入力内容）を記録"""
+        with self.lock:
+            entry = self.entries.setdefault(token, {'fields': {}, 'completed': False})
+            entry['fields'] = fields
+
+    def completed(self, token):
+        """完了ページまで到達したことを記録"""
+        with self.lock:
+            entry = self.entries.setdefault(token, {'fields': {}, 'completed': False})
+            entry['completed'] = True
+
+    def get(self, token):
+        with self.lock:
+            entry = self.entries.get(token)
+            return dict(entry) if entry else None
+
+def render_page(title, body):
+    return _PAGE.format(title=escape(title), body=body).encode('utf-8')
+
+def _hidden_inputs(fields):
+    return '\n'.join(
+        f'<input type="hidden" name="{escape(name)}" value="{escape(value)}">' for name, value in fields.items()
+    )
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """/<バリエーション>/ のフォームと送信先を配信する"""
+
+    # サーバーごとに設定（SubmissionLog）
+    submission_log = None
+
+    def log_message(self, format, *args):
+        logging.debug(f"フィクスチャサイト: {format % args}")
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _route(self):
+        """パスを (バリエーション名, 動作, クエリ) に分解"""
+        parts = urlsplit(self.path)
+        segments = [segment for segment in parts.path.split('/') if segment]
+        name = segments[0] if segments else ''
+        action = segments[1] if len(segments) > 1 else ''
+        return name, FORM_VARIANTS.get(name), action, parse_qs(parts.query)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        name, variant, action, query = self._route()
+        if variant is None:
+            self._send(404, render_page('404 Not Found', '<h1>Not Found</h1>'))
+            return
+
+        if action == 'thanks':
+            token = query.get('t', [''])[0]
+            if token:
+                self.submission_log.completed(token)
+            self._send(200, render_page('送信完了', _THANKS_BODY))
+            return
+
+        if variant.get('delay'):
+            time.sleep(variant['delay'])
+        if 'body' in variant:
+            self._send(variant.get('http_status', 200), render_page(variant['title'], variant['body']))
+            return
+
+        token = query.get('r', [''])[0]
+        self._send(200, self._form_page(name, variant, token))
+
+    def _form_page(self, name, variant, token, prefix=''):
+        form = variant['form'].format(action=f'/{name}/post')
+        # 識別用トークンは最初の閉じタグの直前に埋め込む（エンジンはhidden項目を無視する）
+        form = form.replace('</form>', _hidden_inputs({TOKEN_FIELD: token}) + '\n</form>', 1)
+        return render_page(variant['title'], prefix + form)
+
+    def do_POST(self):
+        name, variant, action, _ = self._route()
+        if variant is None:
+            self._send(404, render_page('404 Not Found', '<h1>Not Found</h1>'))
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        posted = {
+            key: values[-1]
+            for key, values in parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True).items()
+        }
+        token = posted.pop(TOKEN_FIELD, '')
+
+        if action == 'post':
+            self.submission_log.submitted(token, posted)
+            flow = variant['flow']
+            if flow == 'reject':
+                self._send(200, self._form_page(name, variant, token, _REJECT_BODY))
+            elif flow == 'confirm':
+                rows = ''.join(
+                    f'<tr><th>{escape(key)}</th><td>{escape(value)}</td></tr>' for key, value in posted.items()
+                )
+                hidden = _hidden_inputs(dict(posted, **{TOKEN_FIELD: token}))
+                body = _CONFIRM_BODY.format(action=f'/{name}/complete', rows=rows, hidden=hidden)
+                self._send(200, render_page('入力内容の確認', body))
+            elif flow == 'redirect':
+                self._send(303, headers={'Location': f"/{name}/thanks?{urlencode({'t': token})}"})
+            else:
+                self.submission_log.completed(token)
+                self._send(200, render_page(variant['title'], _INLINE_DONE_BODY))
+            return
+
+        if action == 'complete':
+            self._send(303, headers={'Location': f"/{name}/thanks?{urlencode({'t': token})}"})
+            return
+
+        self._send(404, render_page('404 Not Found', '<h1>Not Found</h1>'))
+
+class FixtureSite:
+    """127.0.0.1 上でフォームサイトを起動する（hosts 個のポート = 別ホストとして扱われる）
+
+    エンジンは同じホストのURLを同時に1件しか処理しないため、並列ワーカーを計測するときは
+    ワーカー数と同じ数のポートでURLを分散させる。
+    """
+
+    def __init__(self, hosts=1, port=0):
+        self.hosts = max(1, hosts)
+        self.port = port
+        self.submission_log = SubmissionLog()
+        self.servers = []
+        self.threads = []
+
+    def start(self):
+        handler = type('BoundFixtureHandler', (FixtureHandler,), {'submission_log': self.submission_log})
+        for offset in range(self.hosts):
+            port = self.port + offset if self.port else 0
+            server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name=f'fixture-site-{offset}')
+            thread.daemon = True
+            thread.start()
+            self.servers.append(server)
+            self.threads.append(thread)
+        logging.info(f"フィクスチャサイト起動: {', '.join(self.base_urls())}")
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+        self.threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def base_urls(self):
+        return [f'http://127.0.0.1:{server.server_address[1]}' for server in self.servers]
+
+    def corpus(self, repeat=1, variants=None):
+        """計測対象のURLリスト [{'url', 'variant', 'token'}] をホストに振り分けて返す"""
+        names = variants or list(FORM_VARIANTS)
+        bases = self.base_urls()
+        entries = []
+        for round_index in range(repeat):
+            for name in names:
+                token = f'{len(entries)}'
+                base = bases[len(entries) % len(bases)]
+                entries.append({'url': f'{base}/{name}/?r={token}', 'variant': name, 'token': token})
+        return entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ベンチマーク用フォームサイトを起動')
+    parser.add_argument('--port', type=int, default=8765, help='待ち受けポート')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    site = FixtureSite(port=args.port).start()
+    for name, variant in FORM_VARIANTS.items():
+        print(f"{site.base_urls()[0]}/{name}/  ({variant['flow']}, 期待値: {variant['expect']})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        site.stop()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
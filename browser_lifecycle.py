@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+タブ・ブラウザのライフサイクル管理
+LOVANTVICTORIA営業支援システム
+
+失敗したURLのタブは確認用に開いたまま残すが、残す数に上限を設け、超えたら
+最も古いタブの状態（URL・タイトル・スクリーンショット）を保存してから閉じる。
+また一定件数を処理したとき、またはレンダラープロセスの合計RSS（/procから取得）が
+しきい値を超えたときに、ブラウザの再起動が必要と判定する。
+ChromeやchromedriverがOOMなどで異常終了した場合は、WebDriverのセッションが
+失われたことを検出し、原因を分類する。
+"""
+
+import os
+import json
+import time
+import signal
+import logging
+from collections import deque
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+# 開いたまま残す失敗タブの上限
+MAX_RETAINED_FAILED_TABS = 20
+
+# この件数を処理したらブラウザを再起動（0で無効）
+RESTART_AFTER_URLS = 200
+
+# レンダラープロセスの合計RSSがこれを超えたらブラウザを再起動（MB、0で無効）
+RENDERER_RSS_LIMIT_MB = 2048
+
+# RSSを確認する間隔（処理件数）
+RSS_CHECK_EVERY = 10
+
+# セッション喪失からブラウザを起動し直す回数の上限（ワーカーごと、超えたらワーカーを停止）
+MAX_SESSION_RESPAWNS = 5
+
+# セッション喪失時に処理中だったURLを再処理する回数（同じURLで繰り返し落ちる場合は失敗として記録）
+SESSION_RETRIES_PER_URL = 1
+
+# セッション喪失の原因（WebDriverのエラーメッセージに含まれる文字列 → 原因）
+SESSION_FAILURE_CAUSES = [
+    ('invalid session id', 'invalid_session'),          # セッションが削除された
+    ('session deleted', 'invalid_session'),
+    ('no such session', 'invalid_session'),
+    ('chrome not reachable', 'chrome_unreachable'),     # Chromeが応答しない・終了した
+    ('browser has closed', 'chrome_unreachable'),
+    ('not connected to devtools', 'devtools_disconnected'),
+    ('disconnected', 'devtools_disconnected'),          # DevToolsとの接続が切れた
+    ('target crashed', 'chrome_crashed'),
+    ('connection refused', 'driver_unreachable'),       # chromedriverが終了した
+    ('max retries exceeded', 'driver_unreachable'),
+    ('remote end closed connection', 'driver_unreachable'),
+    ('connection aborted', 'driver_unreachable')
+]
+
+# 閉じたタブの状態を保存するフォルダ
+CAPTURE_FOLDER = 'captures'
+
+def _read_proc_table():
+    """/proc から {pid: (親pid, コマンドライン)} を作る（/procがなければ空）"""
+    table = {}
+    try:
+        pids = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+    except OSError:
+        return table
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', encoding='utf-8', errors='replace') as f:
+                stat = f.read()
+            # 2番目の項目（コマンド名）は括弧付きで空白を含みうるため、最後の ')' 以降を分割
+            parent = int(stat.rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode('utf-8', errors='replace')
+            table[int(pid)] = (parent, cmdline)
+        except (OSError, IndexError, ValueError):
+            # 読み取り中に終了したプロセスは無視
+            continue
+    return table
+
+def _process_rss_bytes(pid):
+    """プロセスのRSS（バイト）。取得できなければ0"""
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+def renderer_rss_bytes(root_pid):
+    """root_pid（chromedriver）配下のレンダラープロセスの合計RSS（バイト）
+
+    /proc が使えない環境では None を返す。
+    """
+    if root_pid is None or not os.path.isdir('/proc'):
+        return None
+    table = _read_proc_table()
+    children = {}
+    for pid, (parent, _) in table.items():
+        children.setdefault(parent, []).append(pid)
+
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        if '--type=renderer' in table[pid][1]:
+            total += _process_rss_bytes(pid)
+    return total
+
+def driver_process_id(driver):
+    """WebDriverが起動したchromedriverのプロセスID（取得できなければNone）"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+def session_failure_cause(error):
+    """WebDriverのセッション喪失を示すエラーから原因を分類する（不明なら unresponsive）"""
+    if isinstance(error, (Urllib3HTTPError, ConnectionError)):
+        return 'driver_unreachable'
+    message = str(error).lower()
+    for marker, cause in SESSION_FAILURE_CAUSES:
+        if marker in message:
+            return cause
+    return 'unresponsive'
+
+def kill_browser_processes(user_data_dir):
+    """user_data_dir を使っているChromeのプロセスを終了させ、終了させた数を返す
+
+    chromedriverだけが落ちた場合に残るChromeが、同じデバッグポートを使い続けないようにする。
+    /proc が使えない環境では何もしない。
+    """
+    if not user_data_dir or not os.path.isdir('/proc'):
+        return 0
+    marker = f'--user-data-dir={user_data_dir}'
+    killed = 0
+    for pid, (_, cmdline) in _read_proc_table().items():
+        if marker in cmdline.split() and pid != os.getpid():
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except OSError:
+                continue
+    return killed
+
+class BrowserLifecycle:
+    """1つのWebDriverについて、残す失敗タブと再起動の要否を管理する"""
+
+    def __init__(self, driver, max_failed_tabs=MAX_RETAINED_FAILED_TABS,
+                 restart_after_urls=RESTART_AFTER_URLS, rss_limit_mb=RENDERER_RSS_LIMIT_MB,
+                 capture_folder=CAPTURE_FOLDER, label=''):
+        self.max_failed_tabs = max_failed_tabs
+        self.restart_after_urls = restart_after_urls
+        self.rss_limit_bytes = rss_limit_mb * 1024 * 1024 if rss_limit_mb else 0
+        self.capture_folder = capture_folder
+        self.label = label
+        self.restarts = 0
+        self.evicted = 0
+        self.attach(driver)
+
+    def attach(self, driver):
+        """（再起動後の）WebDriverを管理対象にする"""
+        self.driver = driver
+        self.main_handle = driver.current_window_handle
+        self.retained = deque()
+        self.urls_since_start = 0
+        self.last_rss = None
+
+    def retain(self, handle, result):
+        """失敗タブを残し、上限を超えたら最も古いタブを保存して閉じる"""
+        self.retained.append((handle, result))
+        while len(self.retained) > self.max_failed_tabs:
+            self._evict(*self.retained.popleft())
+        self._switch_to_main()
+
+    def release_all(self):
+        """残しているタブをすべて保存して閉じる（ブラウザ再起動前に呼ぶ）"""
+        while self.retained:
+            self._evict(*self.retained.popleft())
+
+    def _evict(self, handle, result):
+        """タブの状態を保存してから閉じる"""
+        try:
+            self.driver.switch_to.window(handle)
+            capture = self.capture(result)
+            self.driver.close()
+            self.evicted += 1
+            logging.info(f"{self.label}失敗タブを保存して閉じました: {capture}")
+        except Exception as e:
+            logging.warning(f"{self.label}失敗タブのクローズエラー（無視）: {str(e)}")
+        finally:
+            self._switch_to_main()
+
+    def capture(self, result):
+        """現在のタブのURL・タイトル・スクリーンショットを保存し、保存先の基本パスを返す"""
+        os.makedirs(self.capture_folder, exist_ok=True)
+        base = os.path.join(
+            self.capture_folder,
+            f"{time.strftime('%Y%m%d_%H%M%S')}_row{result.get('index')}"
+        )
+        state = {
+            'index': result.get('index'),
+            'url': result.get('url'),
+            'company': result.get('company'),
+            'error': result.get('error'),
+            'current_url': self.driver.current_url,
+            'title': self.driver.title,
+            'captured_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        with open(f'{base}.json', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+        try:
+            self.driver.save_screenshot(f'{base}.png')
+        except Exception as e:
+            logging.warning(f"{self.label}スクリーンショット保存エラー: {str(e)}")
+        return base
+
+    def _switch_to_main(self):
+        try:
+            self.driver.switch_to.window(self.main_handle)
+        except Exception as e:
+            logging.warning(f"{self.label}メインタブへの切り替えエラー: {str(e)}")
+
+    def session_failure(self):
+        """WebDriverのセッションが失われていれば原因を、使えればNoneを返す
+
+        タブの切り替えやページの状態に依存しないコマンド（ウィンドウ一覧の取得）で確認する。
+        """
+        try:
+            self.driver.window_handles
+            return None
+        except Exception as e:
+            cause = session_failure_cause(e)
+            logging.warning(f"{self.label}WebDriverのセッション確認に失敗（{cause}）: {str(e)}")
+            return cause
+
+    def discard_all(self):
+        """残しているタブを保存せずに忘れる（セッションが失われたとき）"""
+        self.retained.clear()
+
+    def url_done(self):
+        """1件処理したことを記録"""
+        self.urls_since_start += 1
+
+    def restart_reason(self):
+        """再起動が必要なら理由を、不要ならNoneを返す"""
+        if self.restart_after_urls and self.urls_since_start >= self.restart_after_urls:
+            return f'{self.urls_since_start}件処理'
+
+        if self.rss_limit_bytes and self.urls_since_start % RSS_CHECK_EVERY == 0:
+            self.last_rss = renderer_rss_bytes(driver_process_id(self.driver))
+            if self.last_rss is not None and self.last_rss > self.rss_limit_bytes:
+                return f'レンダラーRSS {self.last_rss / 1024 / 1024:.0f}MB'
+        return None
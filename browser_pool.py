@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ブラウザプール
+LOVANTVICTORIA営業支援システム
+
+ChromeDriverの実行ファイルは一度だけ解決してローカルに記録し、以降はネットワークに
+問い合わせない。アプリ起動時にChromeを事前に起動・動作確認してプールに保持し、
+ジョブのワーカーはブラウザ枠ごとに起動済みのChromeを受け取る。
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+
+# 解決済みChromeDriverのパスを記録するファイル
+DRIVER_PIN_PATH = os.path.join('cache', 'chromedriver.json')
+
+# アプリ起動時に事前起動するChromeの数
+WARM_POOL_SIZE = int(os.environ.get('FORM_WARM_BROWSERS', 2))
+
+# 動作確認用のローカルページ（ネットワークに出ない）
+READINESS_PAGE = 'data:text/html;charset=utf-8,<title>ready</title><p id="ready">ready</p>'
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def _is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def _read_pin():
+    try:
+        with open(DRIVER_PIN_PATH, encoding='utf-8') as f:
+            return json.load(f).get('path')
+    except (OSError, ValueError):
+        return None
+
+def _write_pin(path):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_PIN_PATH), exist_ok=True)
+        with open(DRIVER_PIN_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.strftime('%Y-%m-%d %H:%M:%S')}, f)
+    except OSError as e:
+        logging.warning(f"ChromeDriverパスの記録エラー: {str(e)}")
+
+def resolve_chromedriver_path():
+    """ChromeDriverの実行ファイルのパスを返す（プロセス内では一度だけ解決）
+
+    環境変数 CHROMEDRIVER_PATH → 記録済みのパス → PATH上の chromedriver の順に探し、
+    どれもなければ webdriver_manager でダウンロードしてパスを記録する。
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _is_executable(_driver_path):
+            return _driver_path
+
+        path = os.environ.get('CHROMEDRIVER_PATH')
+        source = '環境変数'
+        if not _is_executable(path):
+            path, source = _read_pin(), '記録済み'
+        if not _is_executable(path):
+            path, source = shutil.which('chromedriver'), 'PATH'
+        if not _is_executable(path):
+            from webdriver_manager.chrome import ChromeDriverManager
+            path, source = ChromeDriverManager().install(), 'webdriver_manager'
+
+        if source != '環境変数':
+            _write_pin(path)
+        logging.info(f"ChromeDriver: {path}（{source}）")
+        _driver_path = path
+        return path
+
+def check_browser_ready(driver, timeout=5):
+    """ローカルページを開いてスクリプトが動くか確認（外部サイトにはアクセスしない）"""
+    try:
+        driver.set_page_load_timeout(timeout)
+        driver.get(READINESS_PAGE)
+        return driver.execute_script(
+            "return document.readyState === 'complete' && !!document.getElementById('ready');"
+        ) is True
+    except Exception as e:
+        logging.warning(f"ブラウザ動作確認失敗: {str(e)}")
+        return False
+
+def reset_browser(driver):
+    """メインタブ以外を閉じる（プールへ返す前の後片付け）"""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+class BrowserPool:
+    """ブラウザ枠ごとに起動済みのChromeを1つずつ保持するプール"""
+
+    def __init__(self, launch_func, page_load_timeout=10):
+        # launch_func(slot, page_load_strategy) -> (driver, user_data_dir)
+        self.launch_func = launch_func
+        self.page_load_timeout = page_load_timeout
+        self.idle = {}
+        self.launching = set()
+        self.lock = threading.Lock()
+
+    def warm(self, slots, page_load_strategy='eager'):
+        """指定したブラウザ枠のChromeをバックグラウンドで起動しておく"""
+        for slot in slots:
+            self._launch_async(slot, page_load_strategy)
+
+    def _launch_async(self, slot, page_load_strategy):
+        with self.lock:
+            if slot in self.idle or slot in self.launching:
+                return
+            self.launching.add(slot)
+        thread = threading.Thread(target=self._launch, args=(slot, page_load_strategy),
+                                  name=f'browser-pool-{slot}')
+        thread.daemon = True
+        thread.start()
+
+    def _launch(self, slot, page_load_strategy):
+        try:
+            started = time.time()
+            driver, user_data_dir = self.launch_func(slot, page_load_strategy)
+            with self.lock:
+                self.idle[slot] = {
+                    'driver': driver,
+                    'user_data_dir': user_data_dir,
+                    'page_load_strategy': page_load_strategy
+                }
+            logging.info(f"ブラウザプール: 枠{slot}を起動しました ({time.time() - started:.1f}秒)")
+        except Exception as e:
+            logging.warning(f"ブラウザプール: 枠{slot}の起動に失敗: {str(e)}")
+        finally:
+            with self.lock:
+                self.launching.discard(slot)
+
+    def acquire(self, slot, page_load_strategy='eager', wait=0):
+        """起動済みのChromeを (driver, user_data_dir) で受け取る（なければNone）
+
+        起動中なら最大 wait 秒待つ。受け取る前に動作確認し、応答しないものは破棄する。
+        """
+        deadline = time.time() + wait
+        while True:
+            with self.lock:
+                entry = self.idle.pop(slot, None)
+                launching = slot in self.launching
+            if entry or not launching or time.time() >= deadline:
+                break
+            time.sleep(0.1)
+
+        if entry is None:
+            return None
+        if entry['page_load_strategy'] != page_load_strategy or not check_browser_ready(entry['driver']):
+            self._discard(entry)
+            return None
+        entry['driver'].set_page_load_timeout(self.page_load_timeout)
+        return entry['driver'], entry['user_data_dir']
+
+    def release(self, slot, driver, user_data_dir, page_load_strategy='eager'):
+        """使い終わったChromeを片付けてプールに戻す（応答しなければ破棄して起動し直す）"""
+        entry = {'driver': driver, 'user_data_dir': user_data_dir, 'page_load_strategy': page_load_strategy}
+        try:
+            reset_browser(driver)
+            healthy = check_browser_ready(driver)
+        except Exception as e:
+            logging.warning(f"ブラウザプール: 枠{slot}の後片付けに失敗: {str(e)}")
+            healthy = False
+
+        if healthy:
+            with self.lock:
+                if slot not in self.idle:
+                    self.idle[slot] = entry
+                    return
+        self._discard(entry)
+        self._launch_async(slot, page_load_strategy)
+
+    def _discard(self, entry):
+        try:
+            entry['driver'].quit()
+        except Exception:
+            pass
+        shutil.rmtree(entry['user_data_dir'], ignore_errors=True)
+
+    def size(self):
+        with self.lock:
+            return len(self.idle)
+
+    def shutdown(self):
+        """保持しているChromeをすべて終了"""
+        with self.lock:
+            entries = list(self.idle.values())
+            self.idle.clear()
+        for entry in entries:
+            self._discard(entry)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebDriverコマンドの計測
+LOVANTVICTORIA営業支援システム
+
+ジョブオプション command_stats を有効にすると、WebDriverのコマンド送信（command_executor.execute）を
+包んで、コマンド（findElement, isElementDisplayed, getElementText, w3cExecuteScript など）ごとの
+回数と所要時間を、URLごと・エンジン関数（find_form_fields, find_submit_button,
+handle_select_elements, wait_for_outcome など）ごとに集計する。ジョブオプション profile を有効にすると、
+ワーカースレッドを cProfile で計測する。集計はジョブの結果ファイルと並べて保存する。
+"""
+
+import io
+import sys
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+
+# 呼び出し元のエンジン関数として扱うモジュール
+ENGINE_MODULES = {
+    'form_automation', 'wait_engine', 'form_cache', 'resource_blocking', 'browser_lifecycle', 'browser_pool',
+    'page_matcher', 'submit_outcome'
+}
+
+# 呼び出し元として数えない汎用の関数（その呼び出し元に計上する）
+GENERIC_FUNCTIONS = {'wait_until', '<lambda>', '<listcomp>', '<dictcomp>', '<genexpr>'}
+
+# レポートに載せるURLの上限（所要時間の長い順）
+REPORT_TOP_URLS = 50
+
+# プロファイル結果に載せる関数の数
+PROFILE_TOP_FUNCTIONS = 60
+
+def _calling_function():
+    """コマンドを送ったエンジン関数の名前（最も内側の、汎用でない関数）"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        name = frame.f_code.co_name
+        if frame.f_globals.get('__name__') in ENGINE_MODULES and name not in GENERIC_FUNCTIONS:
+            return name
+        frame = frame.f_back
+    return 'other'
+
+def _add(table, key, seconds):
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = {'count': 0, 'seconds': 0.0}
+    entry['count'] += 1
+    entry['seconds'] += seconds
+
+def _merge(target, source):
+    for key, entry in source.items():
+        merged = target.setdefault(key, {'count': 0, 'seconds': 0.0})
+        merged['count'] += entry['count']
+        merged['seconds'] += entry['seconds']
+
+def _sorted_table(table):
+    """所要時間の長い順に並べ、秒を丸めたリストにする"""
+    return [
+        {'name': key, 'count': entry['count'], 'seconds': round(entry['seconds'], 3),
+         'avg_ms': round(entry['seconds'] * 1000 / entry['count'], 1) if entry['count'] else 0}
+        for key, entry in sorted(table.items(), key=lambda item: item[1]['seconds'], reverse=True)
+    ]
+
+class CommandRecorder:
+    """1つのWebDriverのコマンドを計測する（ワーカースレッドごとに1つ）"""
+
+    def __init__(self, driver):
+        self.driver = None
+        self.begin()
+        self.attach(driver)
+
+    def attach(self, driver):
+        """WebDriverのコマンド送信を計測付きに差し替える（再起動後のWebDriverにも呼ぶ）"""
+        self.detach()
+        executor = driver.command_executor
+        original = executor.execute
+
+        def execute(command, params):
+            started = time.perf_counter()
+            try:
+                return original(command, params)
+            finally:
+                self._record(command, _calling_function(), time.perf_counter() - started)
+
+        executor.execute = execute
+        self.driver = driver
+
+    def detach(self):
+        """差し替えを元に戻す（プールへ返す前に呼ぶ）"""
+        if self.driver is None:
+            return
+        try:
+            del self.driver.command_executor.execute
+        except AttributeError:
+            pass
+        self.driver = None
+
+    def _record(self, command, function, seconds):
+        self.commands += 1
+        self.seconds += seconds
+        _add(self.by_command, command, seconds)
+        _add(self.by_function, function, seconds)
+        _add(self.by_pair, (function, command), seconds)
+
+    def begin(self):
+        """URL1件分の計測を始める"""
+        self.commands = 0
+        self.seconds = 0.0
+        self.by_command = {}
+        self.by_function = {}
+        self.by_pair = {}
+
+    def end(self):
+        """URL1件分の計測結果を返す"""
+        return {
+            'commands': self.commands,
+            'seconds': self.seconds,
+            'by_command': self.by_command,
+            'by_function': self.by_function,
+            'by_pair': self.by_pair
+        }
+
+class CommandReport:
+    """ジョブ全体のコマンド集計とワーカーのプロファイル"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = 0
+        self.seconds = 0.0
+        self.by_command = {}
+        self.by_function = {}
+        self.by_pair = {}
+        self.urls = []
+        self.profile_stats = None
+
+    def add_url(self, result, usage):
+        """URL1件分の計測結果を加える"""
+        with self.lock:
+            self.commands += usage['commands']
+            self.seconds += usage['seconds']
+            _merge(self.by_command, usage['by_command'])
+            _merge(self.by_function, usage['by_function'])
+            _merge(self.by_pair, usage['by_pair'])
+            self.urls.append({
+                'index': result.get('index'),
+                'url': result.get('url'),
+                'status': result.get('status'),
+                'elapsed': result.get('elapsed'),
+                'commands': usage['commands'],
+                'seconds': round(usage['seconds'], 3),
+                'by_function': _sorted_table(usage['by_function'])
+            })
+
+    def add_profile(self, profiler):
+        """ワーカーのプロファイルを合算する"""
+        with self.lock:
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(profiler)
+            else:
+                self.profile_stats.add(profiler)
+
+    def report(self):
+        with self.lock:
+            urls = sorted(self.urls, key=lambda entry: entry['seconds'], reverse=True)
+            return {
+                'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'urls_measured': len(self.urls),
+                'commands': self.commands,
+                'seconds': round(self.seconds, 3),
+                'avg_commands_per_url': round(self.commands / len(self.urls), 1) if self.urls else 0,
+                'by_command': _sorted_table(self.by_command),
+                'by_function': _sorted_table(self.by_function),
+                'by_function_command': [
+                    dict(entry, name=f"{entry['name'][0]}:{entry['name'][1]}")
+                    for entry in _sorted_table(self.by_pair)
+                ],
+                'slowest_urls': urls[:REPORT_TOP_URLS]
+            }
+
+    def save(self, base_path):
+        """集計を保存し、{種類: パス} を返す（commands: JSON, profile: テキスト）"""
+        paths = {}
+        if self.urls:
+            try:
+                path = f'{base_path}_commands.json'
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(self.report(), f, ensure_ascii=False, indent=2)
+                paths['commands'] = path
+            except OSError as e:
+                logging.error(f"コマンド集計の保存エラー: {str(e)}")
+
+        with self.lock:
+            stats = self.profile_stats
+        if stats is not None:
+            try:
+                path = f'{base_path}_profile.txt'
+                buffer = io.StringIO()
+                stats.stream = buffer
+                stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(buffer.getvalue())
+                paths['profile'] = path
+            except OSError as e:
+                logging.error(f"プロファイルの保存エラー: {str(e)}")
+        return paths
+
+def start_profiler():
+    """現在のスレッドの cProfile を開始（他の計測ツールが動作中なら None）"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        logging.warning(f"プロファイルを開始できません: {str(e)}")
+        return None
+    return profiler
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+連絡履歴インデックス
+LOVANTVICTORIA営業支援システム
+
+正規化したURLと登録ドメインごとに最後の処理結果と日時をSQLiteに保存し、
+ジョブ間で共有する。ファイル内の重複URL、一定期間内に送信済みのURL・ドメイン、
+配信停止（サプレッション）リストに載っているURL・ドメインはブラウザで処理しない。
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import tldextract
+
+# インデックスの保存先（キャッシュではないため cache/ には置かない）
+CONTACT_INDEX_PATH = os.path.join('data', 'contact_index.sqlite3')
+
+# この日数以内に送信済みのURL・ドメインには再送信しない（0で無効）
+CONTACT_WINDOW_DAYS = 90
+
+# 正規化時に取り除くトラッキング用のクエリパラメータ
+TRACKING_PARAMS = {'gclid', 'fbclid', 'yclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga'}
+
+# 登録ドメインの判定に使う公開サフィックスリスト（ライブラリ同梱のスナップショットを使い、実行時に取得しない）。
+# github.io・wixsite.com などの私的サフィックスも含めるため、foo.github.io は foo.github.io が登録ドメインになる
+_SUFFIX_EXTRACTOR = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None, include_psl_private_domains=True)
+
+# 複数の会社のフォームやサイトが同居するドメイン（登録ドメイン）。
+# ここに載っているドメインはドメイン単位の送信済み判定から除外し、正規化URL単位でのみ判定する
+SHARED_DOMAINS = {
+    # フォーム作成サービス
+    'google.com', 'forms.gle', 'form-mailer.jp', 'formrun.jp', 'form.run', 'tayori.com', 'formzu.net',
+    'jotform.com', 'typeform.com', 'wufoo.com', 'formstack.com', 'formassembly.com', 'cognitoforms.com',
+    'office.com', 'microsoft.com', 'hubspot.com', 'hsforms.com', 'hsforms.net', 'hs-sites.com',
+    'kintoneapp.com', 'cybozu.com', 'zoho.com', 'pardot.com',
+    # サイト作成サービス（公開サフィックスリストに載っていないもの）
+    'jimdofree.com', 'jimdo.com', 'wordpress.com', 'amebaownd.com', 'fc2.com', 'goope.jp',
+    'wix.com', 'studio.site', 'peraichi.com', 'crayonsite.net'
+}
+
+# 種別（suppressions.kind）
+KIND_URL = 'url'
+KIND_DOMAIN = 'domain'
+
+def _host_of(url):
+    parts = urlsplit(url if '://' in url else f'http://{url}')
+    host = (parts.hostname or '').lower().rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+def normalize_url(url):
+    """同じページを指すURLを同じ文字列にする
+
+    スキーム・www.・既定ポート・フラグメント・末尾のスラッシュ・トラッキング用パラメータの
+    違いを無視し、クエリはキー順に並べる。
+    """
+    url = str(url).strip()
+    parts = urlsplit(url if '://' in url else f'http://{url}')
+    host = _host_of(url)
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f'{host}:{port}'
+    path = parts.path.rstrip('/') or ''
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    return f"{host}{path}{'?' + urlencode(query) if query else ''}"
+
+def registrable_domain(url):
+    """URLの登録ドメイン（例: contact.example.co.jp → example.co.jp, foo.github.io → foo.github.io）
+
+    公開サフィックスリストで判定する。IPアドレスや localhost など判定できないホストはそのまま返す。
+    """
+    host = _host_of(url)
+    return _SUFFIX_EXTRACTOR(host).top_domain_under_public_suffix or host
+
+class ContactIndex:
+    """正規化URL・登録ドメインごとの連絡履歴と配信停止リスト"""
+
+    def __init__(self, path=CONTACT_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS contacts ('
+            ' url_key TEXT PRIMARY KEY,'
+            ' domain TEXT NOT NULL,'
+            ' url TEXT,'
+            ' status TEXT,'
+            ' contacted_at REAL NOT NULL,'
+            ' last_success_at REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS contacts_domain ON contacts (domain, last_success_at)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS suppressions ('
+            ' kind TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' reason TEXT,'
+            ' added_at REAL NOT NULL,'
+            ' PRIMARY KEY (kind, value))'
+        )
+
+    def record(self, result):
+        """処理結果を記録（成功時は最終送信日時も更新）"""
+        url = result.get('url')
+        if not url or result.get('status') not in ('success', 'failed'):
+            return
+        now = time.time()
+        success_at = now if result['status'] == 'success' else None
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO contacts (url_key, domain, url, status, contacted_at, last_success_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(url_key) DO UPDATE SET url = excluded.url, status = excluded.status,'
+                ' contacted_at = excluded.contacted_at,'
+                ' last_success_at = COALESCE(excluded.last_success_at, contacts.last_success_at)',
+                (normalize_url(url), registrable_domain(url), url, result['status'], now, success_at)
+            )
+
+    def add_suppression(self, value, kind=KIND_DOMAIN, reason=''):
+        """配信停止リストに追加（URLは正規化、ドメインは登録ドメインにして保存）"""
+        key = normalize_url(value) if kind == KIND_URL else registrable_domain(value)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO suppressions (kind, value, reason, added_at) VALUES (?, ?, ?, ?)',
+                (kind, key, reason, time.time())
+            )
+        return key
+
+    def remove_suppression(self, value, kind=KIND_DOMAIN):
+        with self.lock:
+            cursor = self.conn.execute('DELETE FROM suppressions WHERE kind = ? AND value = ?', (kind, value))
+        return cursor.rowcount > 0
+
+    def list_suppressions(self):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT kind, value, reason, added_at FROM suppressions ORDER BY added_at'
+            ).fetchall()
+        return [
+            {'kind': kind, 'value': value, 'reason': reason,
+             'added_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(added_at))}
+            for kind, value, reason, added_at in rows
+        ]
+
+    def _lookup(self, url_keys, domains, since):
+        """まとめて照会し (配信停止のURL, 配信停止のドメイン, 送信済みURL→日時, 送信済みドメイン→日時) を返す"""
+        def query(sql, values):
+            found = {}
+            values = list(values)
+            # SQLiteの変数上限を超えないよう分割して照会
+            for start in range(0, len(values), 500):
+                chunk = values[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                found.update(self.conn.execute(sql.format(placeholders), chunk).fetchall())
+            return found
+
+        with self.lock:
+            suppressed_urls = query(
+                f"SELECT value, reason FROM suppressions WHERE kind = '{KIND_URL}' AND value IN ({{}})", url_keys)
+            suppressed_domains = query(
+                f"SELECT value, reason FROM suppressions WHERE kind = '{KIND_DOMAIN}' AND value IN ({{}})", domains)
+            contacted_urls = {}
+            contacted_domains = {}
+            if since is not None:
+                contacted_urls = {
+                    key: at for key, at in query(
+                        'SELECT url_key, last_success_at FROM contacts WHERE url_key IN ({})', url_keys
+                    ).items() if at and at >= since
+                }
+                contacted_domains = {
+                    domain: at for domain, at in query(
+                        'SELECT domain, MAX(last_success_at) FROM contacts WHERE domain IN ({}) GROUP BY domain',
+                        domains - SHARED_DOMAINS
+                    ).items() if at and at >= since
+                }
+        return suppressed_urls, suppressed_domains, contacted_urls, contacted_domains
+
+    def filter_urls(self, urls, window_days=CONTACT_WINDOW_DAYS):
+        """URLリストから処理不要なものを除き (処理するURL, スキップ結果のリスト) を返す
+
+        ファイル内の重複（正規化URLが同じ2件目以降）、配信停止リストに載っているURL・ドメイン、
+        window_days 日以内に送信成功したURL・ドメインをスキップする。
+        """
+        keyed = [(url_info, normalize_url(url_info['url']), registrable_domain(url_info['url'])) for url_info in urls]
+        since = time.time() - window_days * 24 * 60 * 60 if window_days else None
+        suppressed_urls, suppressed_domains, contacted_urls, contacted_domains = self._lookup(
+            {key for _, key, _ in keyed}, {domain for _, _, domain in keyed}, since
+        )
+
+        def contacted_on(timestamp):
+            return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+        kept = []
+        skipped_results = []
+        first_rows = {}
+        for url_info, key, domain in keyed:
+            if key in first_rows:
+                reason = f"重複: {first_rows[key] + 2}行目と同じURL"
+            elif key in suppressed_urls:
+                note = suppressed_urls[key]
+                reason = f"配信停止リスト（URL{': ' + note if note else ''}）"
+            elif domain in suppressed_domains:
+                note = suppressed_domains[domain]
+                reason = f"配信停止リスト（{domain}{': ' + note if note else ''}）"
+            elif key in contacted_urls:
+                reason = f"送信済み: {contacted_on(contacted_urls[key])}"
+            elif domain in contacted_domains:
+                reason = f"送信済み（{domain}）: {contacted_on(contacted_domains[domain])}"
+            else:
+                first_rows[key] = url_info['index']
+                kept.append(url_info)
+                continue
+
+            first_rows.setdefault(key, url_info['index'])
+            skipped_results.append({
+                'index': url_info['index'],
+                'url': url_info['url'],
+                'company': url_info['company'],
+                'status': 'skipped',
+                'error': reason,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            })
+
+        if skipped_results:
+            logging.info(f"連絡履歴で除外: {len(skipped_results)}件（残り{len(kept)}件）")
+        return kept, skipped_results
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+def get_contact_index():
+    """プロセス全体で共有するインデックスを返す"""
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = ContactIndex()
+        return _shared_index
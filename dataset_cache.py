@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析済みデータセットキャッシュ
+LOVANTVICTORIA営業支援システム
+
+アップロードされたファイルの解析結果（シートと対象URLリスト）を内容ハッシュを
+キーにFeather（Arrow IPC）形式で保存し、2回目以降はメモリマップで読み込む。
+シートはストリーミング読み込みのチャンクごとに別のファイルへ書き、読み込みも
+チャンク単位で行う（シート全体をメモリに保持しない）。
+同じ内容のファイルを再アップロードした場合は解析自体を省略する。
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+# キャッシュの保存先フォルダ
+DATASET_CACHE_FOLDER = os.path.join('cache', 'datasets')
+
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+def file_content_hash(filepath, chunk_size=1024 * 1024):
+    """ファイル内容のSHA-256ハッシュ（16進）を返す"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _key_lock(key):
+    """同じ内容のファイルを同時に解析しないためのキーごとのロック"""
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _cache_dir(key):
+    return os.path.join(DATASET_CACHE_FOLDER, key[:32])
+
+def cached_metadata(key):
+    """キャッシュ済みならメタデータ（行数・URL数・シートの分割数など）を返す"""
+    meta_path = os.path.join(_cache_dir(key), 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except Exception as e:
+        logging.warning(f"データセットキャッシュのメタデータ読み込みエラー: {str(e)}")
+        return None
+    # シートを1ファイルで保存していた旧形式のキャッシュは作り直す
+    return meta if 'parts' in meta else None
+
+def _write_feather(df, path):
+    """Featherで保存（型が混在する列は文字列型にして保存）"""
+    try:
+        feather.write_feather(df, path)
+    except (pa.ArrowException, ValueError):
+        object_columns = {column: 'string' for column in df.columns if df[column].dtype == object}
+        converted = df.astype(object_columns)
+        converted.columns = [str(column) for column in converted.columns]
+        feather.write_feather(converted, path)
+
+def _read_feather(path):
+    """メモリマップでFeatherを読み込む"""
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def _part_path(cache_dir, part):
+    return os.path.join(cache_dir, f'sheet-{part:05d}.feather')
+
+class DatasetWriter:
+    """ストリーミング読み込みのチャンクを順にキャッシュへ書き込む
+
+    書き込み中は一時フォルダに置き、commit でメタデータを書いてから差し替える
+    （完了するまで読み込み側からは見えない）。書き込みに失敗しても読み込み自体は止めない。
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.rows = 0
+        self.parts = 0
+        self.failed = False
+        self.tmp_dir = f"{_cache_dir(key)}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+
+    def write_chunk(self, chunk):
+        """チャンク（インデックスは通し番号の行番号）を1つのファイルとして保存"""
+        if self.failed:
+            return
+        try:
+            _write_feather(chunk.reset_index(drop=True), _part_path(self.tmp_dir, self.parts))
+            self.parts += 1
+            self.rows += len(chunk)
+        except Exception as e:
+            self.failed = True
+            logging.warning(f"データセットキャッシュ書き込みエラー: {str(e)}")
+
+    def commit(self, urls):
+        """URLリストとメタデータを書き、キャッシュとして公開する（書き込みに失敗していれば破棄）"""
+        if self.failed:
+            self.abort()
+            return False
+        urls_df = pd.DataFrame(urls, columns=['index', 'url', 'company'])
+        urls_df['company'] = urls_df['company'].astype('string')
+        _write_feather(urls_df, os.path.join(self.tmp_dir, 'urls.feather'))
+
+        meta = {'rows': self.rows, 'url_count': len(urls), 'parts': self.parts, 'created_at': time.time()}
+        with open(os.path.join(self.tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        cache_dir = _cache_dir(self.key)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(self.tmp_dir, cache_dir)
+        return True
+
+    def abort(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+def _load_urls(key):
+    """キャッシュからURLリストを読み込む"""
+    urls_df = _read_feather(os.path.join(_cache_dir(key), 'urls.feather'))
+    companies = urls_df['company'].astype(object)
+    companies = companies.where(companies.notna(), None)
+    return [
+        {'index': index, 'url': url, 'company': company}
+        for index, url, company in zip(urls_df['index'].tolist(), urls_df['url'].tolist(), companies.tolist())
+    ]
+
+def iter_cached_sheet(key):
+    """キャッシュからシートをチャンク単位で返す（インデックスは通し番号の行番号）"""
+    meta = cached_metadata(key)
+    if meta is None:
+        raise FileNotFoundError(f"データセットキャッシュがありません: {key}")
+    cache_dir = _cache_dir(key)
+    start = 0
+    for part in range(meta['parts']):
+        chunk = _read_feather(_part_path(cache_dir, part))
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+def load_dataset(filepath, parse_func, key=None):
+    """解析済みの対象URLリストを返す
+
+    キャッシュにあればメモリマップで読み込み、なければ parse_func(filepath, on_chunk) で解析する。
+    parse_func は読み込んだシートのチャンクごとに on_chunk(chunk) を呼び、URLリストを返す関数で、
+    チャンクはそのままキャッシュに書き込む（解析は1回の読み込みで済む）。
+    """
+    key = key or file_content_hash(filepath)
+    with _key_lock(key):
+        if cached_metadata(key):
+            try:
+                started = time.time()
+                urls = _load_urls(key)
+                logging.info(f"データセットキャッシュ読み込み: URL{len(urls)}件 ({time.time() - started:.2f}秒)")
+                return urls
+            except Exception as e:
+                logging.warning(f"データセットキャッシュ読み込みエラー（再解析します）: {str(e)}")
+
+        writer = DatasetWriter(key)
+        try:
+            urls = parse_func(filepath, writer.write_chunk)
+        except Exception:
+            writer.abort()
+            raise
+        try:
+            if writer.commit(urls):
+                logging.info(f"データセットキャッシュ保存: {_cache_dir(key)} ({writer.rows}行, {writer.parts}ファイル)")
+        except Exception as e:
+            writer.abort()
+            logging.warning(f"データセットキャッシュ保存エラー: {str(e)}")
+        return urls
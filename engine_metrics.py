@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理エンジンのメトリクス
+LOVANTVICTORIA営業支援システム
+
+URLごとの段階別処理時間（navigate/detect/fill/selects/submit/confirm/verify）と
+URL全体の処理時間をヒストグラムに、処理結果・送信後の判定結果・ブラウザの起動し直しを件数に集計し、直近の処理速度とあわせて
+Prometheusのテキスト形式で出力する（/metrics から参照）。
+"""
+
+import time
+import threading
+from collections import deque
+
+# 計測する段階（selects は fill の内訳。fast_fill では fill に含まれ記録されない）
+SPAN_NAMES = ['navigate', 'detect', 'fill', 'selects', 'submit', 'confirm', 'verify']
+
+# 処理時間ヒストグラムのバケット上限（秒）
+DURATION_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60]
+
+# 処理速度（URL/分）を計算する直近の時間幅（秒）
+THROUGHPUT_WINDOW = 300
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{key}="{str(value)}"' for key, value in labels)
+    return '{' + inner + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """ラベルごとの累積バケット・合計・件数"""
+
+    def __init__(self, name, help_text, label_name=None, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = list(buckets)
+        self.series = {}
+
+    def observe(self, value, label=None):
+        series = self.series.setdefault(label, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                series['counts'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label, series in sorted(self.series.items(), key=lambda item: str(item[0])):
+            base = [(self.label_name, label)] if self.label_name else []
+            for upper, count in zip(self.buckets, series['counts']):
+                lines.append(f"{self.name}_bucket{_format_labels(base + [('le', _format_value(upper))])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(base + [('le', '+Inf')])} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {round(series['sum'], 3)}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {series['count']}")
+        return lines
+
+class Counter:
+    """ラベルごとの件数"""
+
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.values = {}
+
+    def inc(self, label=None, amount=1):
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            labels = [(self.label_name, label)] if self.label_name else []
+            lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+def render_gauge(name, help_text, values, label_name=None):
+    """ゲージを出力（values は 数値 または {ラベル値: 数値}）"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    if not isinstance(values, dict):
+        values = {None: values}
+    for label, value in values.items():
+        labels = [(label_name, label)] if label_name and label is not None else []
+        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    return lines
+
+class EngineMetrics:
+    """プロセス全体の処理結果を集計する"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.urls = Counter('form_urls_total', '処理したURL数（status別）', 'status')
+        self.timeouts = Counter('form_stage_timeouts_total', '上限時間を超えて打ち切った段階', 'stage')
+        self.outcomes = Counter('form_submit_outcomes_total', '送信クリック後の判定結果', 'outcome')
+        self.respawns = Counter('form_browser_respawns_total', 'セッション喪失からブラウザを起動し直した回数', 'cause')
+        self.url_duration = Histogram('form_url_duration_seconds', '1URLの処理時間')
+        self.stage_duration = Histogram('form_stage_duration_seconds', '段階ごとの処理時間', 'stage')
+        self.recent = deque()
+
+    def observe_result(self, result):
+        """1件の処理結果を集計に加える"""
+        now = time.time()
+        with self.lock:
+            self.urls.inc(result.get('status', 'unknown'))
+            if result.get('timeout_stage'):
+                self.timeouts.inc(result['timeout_stage'])
+            if result.get('outcome'):
+                self.outcomes.inc(result['outcome'])
+            if 'elapsed' not in result:
+                # スキップした行はブラウザで処理していない
+                return
+            self.url_duration.observe(result['elapsed'])
+            for stage, seconds in (result.get('stage_timings') or {}).items():
+                self.stage_duration.observe(seconds, stage)
+            self.recent.append(now)
+            self._trim_recent(now)
+
+    def observe_respawn(self, cause):
+        """セッション喪失からのブラウザの起動し直しを集計に加える"""
+        with self.lock:
+            self.respawns.inc(cause)
+
+    def _trim_recent(self, now):
+        while self.recent and self.recent[0] < now - THROUGHPUT_WINDOW:
+            self.recent.popleft()
+
+    def urls_per_minute(self):
+        """直近 THROUGHPUT_WINDOW 秒にブラウザで処理したURL数を1分あたりに換算"""
+        with self.lock:
+            self._trim_recent(time.time())
+            return round(len(self.recent) * 60 / THROUGHPUT_WINDOW, 2)
+
+    def render(self):
+        """Prometheusのテキスト形式の行リストを返す"""
+        throughput = self.urls_per_minute()
+        with self.lock:
+            lines = []
+            for metric in (self.urls, self.timeouts, self.outcomes, self.respawns, self.url_duration, self.stage_duration):
+                lines.extend(metric.render())
+        lines.extend(render_gauge(
+            'form_urls_per_minute', f'直近{THROUGHPUT_WINDOW}秒の処理速度（URL/分）', throughput
+        ))
+        return lines
+
+ENGINE_METRICS = EngineMetrics()
@@ -6,8 +6,13 @@ LOVANTVICTORIA営業支援システム
 """
 
 import pandas as pd
+import openpyxl
+import codecs
 import time
 import os
+import shutil
+import tempfile
+import threading
 import logging
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -15,8 +20,40 @@ from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from preflight import run_preflight, VERDICT_CANDIDATE
+from job_journal import JobJournal, journal_path_for
+from dataset_cache import file_content_hash, cached_metadata, load_dataset, iter_cached_sheet
+from host_scheduler import HostScheduler
+from resource_blocking import (
+    DEFAULT_BLOCKING_PROFILE, PERFORMANCE_LOG_PREFS, PERF_LOGGING_PREFS, blocked_url_patterns,
+    apply_blocking, reset_network_stats, collect_network_stats, summarize_network
+)
+from contact_index import get_contact_index, CONTACT_WINDOW_DAYS
+from engine_metrics import ENGINE_METRICS, SPAN_NAMES
+from command_stats import CommandRecorder, CommandReport, start_profiler
+from page_matcher import (
+    SUBMIT_BUTTON_TEXTS, CONFIRMATION_BUTTON_TEXTS, SUBMIT_BUTTONS, CONFIRMATION_BUTTONS,
+    extract_page, match_success, match_confirmation
+)
+from submit_outcome import (
+    click_and_wait_for_outcome, OUTCOME_SUCCESS, OUTCOME_CONFIRMATION, OUTCOME_VALIDATION_ERROR,
+    OUTCOME_NO_CHANGE, OUTCOME_TIMEOUT
+)
+from browser_pool import resolve_chromedriver_path, check_browser_ready
+from browser_lifecycle import (
+    BrowserLifecycle, MAX_RETAINED_FAILED_TABS, RESTART_AFTER_URLS, RENDERER_RSS_LIMIT_MB,
+    MAX_SESSION_RESPAWNS, SESSION_RETRIES_PER_URL, kill_browser_processes
+)
+from form_cache import (
+    get_form_layout_cache, lookup_cached_layout, store_layout,
+    resolve_cached_confirmation, store_confirmation
+)
+from wait_engine import (
+    WAIT_BUDGETS, resolve_wait_budgets, wait_for_document_ready,
+    wait_for_form, wait_for_new_window,
+    UrlDeadline, DeadlineExceeded, URL_DEADLINE
+)
 
 # LOVANTVICTORIA会社情報
 COMPANY_INFO = {
@@ -37,6 +74,40 @@ zoomでお話させていただけたらと思います。
 どうぞよろしくお願いいたします。'''
 }
 
+# ジョブ単位で上書き可能な処理オプション（既定値）
+DEFAULT_JOB_OPTIONS = {
+    'workers': 1,  # 並列ワーカー数（ワーカーごとに独立したChromeを起動）
+    'page_load_strategy': 'eager',  # DOMContentLoadedで driver.get から戻る
+    'wait_budgets': None,  # 段階ごとの最大待機時間の上書き（wait_engine.WAIT_BUDGETS参照）
+    'detection_mode': 'snapshot',  # 'snapshot'（1回のスクリプト呼び出し）または 'selectors'（従来方式）
+    'fast_fill': False,  # Trueで入力・選択をスクリプト1回で一括設定（拒否された欄のみキー入力）
+    'form_cache': True,  # ドメイン別フォームレイアウトキャッシュを使う（form_cache.py）
+    'preflight': True,  # ブラウザ起動前にHTTPで到達性とフォーム有無を確認（preflight.py）
+    'resume': False,  # Trueでジャーナルに記録済みの行を飛ばして再開（job_journal.py）
+    'dataset_cache': True,  # 解析済みデータセットを内容ハッシュでキャッシュ（dataset_cache.py）
+    'browser_slots': None,  # ワーカーごとのブラウザ枠番号（デバッグポートに使用、Noneなら0から連番）
+    'max_failed_tabs': MAX_RETAINED_FAILED_TABS,  # 開いたまま残す失敗タブの上限（browser_lifecycle.py）
+    'restart_after_urls': RESTART_AFTER_URLS,  # この件数ごとにブラウザを再起動（0で無効）
+    'renderer_rss_limit_mb': RENDERER_RSS_LIMIT_MB,  # レンダラーの合計RSSの上限（MB、0で無効）
+    'browser_pool': None,  # 起動済みChromeのプール（browser_pool.BrowserPool、Noneなら毎回起動）
+    'url_deadline': URL_DEADLINE,  # 1URLあたりの上限時間（秒）
+    'stage_budgets': None,  # 段階ごとの上限時間の上書き（wait_engine.STAGE_BUDGETS参照）
+    'dedup': True,  # ファイル内の重複・送信済み・配信停止のURLを除外（contact_index.py）
+    'contact_window_days': CONTACT_WINDOW_DAYS,  # この日数以内に送信済みなら再送信しない（0で無効）
+    'blocking_profile': DEFAULT_BLOCKING_PROFILE,  # 画像・フォント・動画・トラッカーのブロック（resource_blocking.py）
+    'command_stats': False,  # WebDriverコマンドの回数・時間をURL・関数ごとに集計（command_stats.py）
+    'profile': False,  # ワーカースレッドを cProfile で計測（command_stats.py）
+}
+
+# 同一ホストで次のURLを開始するまでの最小間隔（秒、host_scheduler.py で適用）
+INTER_URL_INTERVAL = 2
+
+# 並列ワーカーの上限（VMのメモリを考慮）
+MAX_WORKERS = 8
+
+# リモートデバッグポートの基準値（ワーカーIDを加算して使用）
+BASE_DEBUG_PORT = 9222
+
 def setup_logging():
     """ログ設定を初期化"""
     logging.basicConfig(
@@ -48,17 +119,24 @@ def setup_logging():
         ]
     )
 
-def setup_chrome_driver():
-    """Chrome WebDriverを設定 (GCE Ubuntu対応 - GUI表示)"""
+def setup_chrome_driver(debug_port=BASE_DEBUG_PORT, user_data_dir=None, page_load_strategy='eager'):
+    """Chrome WebDriverを設定 (GCE Ubuntu対応 - GUI表示)
+
+    並列実行時はワーカーごとに debug_port と user_data_dir を分けて呼び出す。
+    page_load_strategy='eager' ではサブリソースの読み込み完了を待たずに戻る。
+    """
     try:
         chrome_options = Options()
+        chrome_options.page_load_strategy = page_load_strategy
         
         # GCE Ubuntu環境でGUI表示するための設定
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--remote-debugging-port=9222')
+        chrome_options.add_argument(f'--remote-debugging-port={debug_port}')
+        if user_data_dir:
+            chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--disable-web-security')
         chrome_options.add_argument('--allow-running-insecure-content')
@@ -107,8 +185,12 @@ def setup_chrome_driver():
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
-        # ChromeDriverを自動インストール・設定
-        service = Service(ChromeDriverManager().install())
+        # URLごとのブロック件数・読み込み量を集計するためネットワークイベントを記録
+        chrome_options.set_capability('goog:loggingPrefs', PERFORMANCE_LOG_PREFS)
+        chrome_options.add_experimental_option('perfLoggingPrefs', PERF_LOGGING_PREFS)
+        
+        # ChromeDriverは一度だけ解決してローカルに記録したものを使う（browser_pool.py）
+        service = Service(resolve_chromedriver_path())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # WebDriverであることを隠す
@@ -116,7 +198,6 @@ def setup_chrome_driver():
         
         # ページ読み込みタイムアウト設定（CLAUDE.md要件: 10秒）
         driver.set_page_load_timeout(10)
-        driver.implicitly_wait(10)
         
         logging.info("Chrome WebDriver 初期化成功")
         return driver
@@ -129,20 +210,37 @@ def setup_chrome_driver():
         logging.error("3. Xvfb :99 -screen 0 1920x1080x24 & で仮想ディスプレイ起動")
         raise
 
+# エンコーディング判定に使う先頭バイト数
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+# ストリーミング読み込みの1チャンクあたりの行数
+READ_CHUNK_ROWS = 50000
+
+def sniff_encoding(filepath, sniff_bytes=ENCODING_SNIFF_BYTES):
+    """CSVの先頭バイトからエンコーディングを判定（BOM → UTF-8 → cp932）"""
+    with open(filepath, 'rb') as f:
+        prefix = f.read(sniff_bytes)
+    
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 末尾で途切れたマルチバイト文字はエラーにしない
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # cp932 は shift_jis の上位互換（機種依存文字を含む）
+        return 'cp932'
+
 def read_input_file(filepath):
     """CSVまたはExcelファイルを読み込む"""
     try:
         _, ext = os.path.splitext(filepath)
         
         if ext.lower() == '.csv':
-            # CSVファイルの場合（エンコーディング自動判定）
-            try:
-                df = pd.read_csv(filepath, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    df = pd.read_csv(filepath, encoding='shift_jis')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(filepath, encoding='cp932')
+            # CSVファイルの場合（先頭バイトでエンコーディングを判定して1回だけ読む）
+            encoding = sniff_encoding(filepath)
+            logging.info(f"エンコーディング判定: {encoding}")
+            df = pd.read_csv(filepath, encoding=encoding)
         else:
             # Excelファイルの場合
             df = pd.read_excel(filepath)
@@ -153,64 +251,308 @@ def read_input_file(filepath):
         logging.error(f"ファイル読み込みエラー: {str(e)}")
         raise
 
+def select_url_column(columns):
+    """URL列を選択（contact_url → E-mail → url の順、なければNone）"""
+    for column in ('contact_url', 'E-mail', 'url'):
+        if column in columns:
+            return column
+    return None
+
+def select_company_column(columns):
+    """会社名の列を選択（company → 会社名 の順、なければNone）"""
+    for column in ('company', '会社名'):
+        if column in columns:
+            return column
+    return None
+
+def extract_url_records(df, url_column):
+    """データフレームから対象URLのレコードを列単位の処理で抽出"""
+    # 列単位でURLを正規化（前後の空白除去）し、httpから始まるものだけを抽出
+    url_series = df[url_column].astype(str).str.strip()
+    valid_mask = url_series.str.lower().str.startswith('http') & (url_series != 'nan')
+    
+    # 会社名は company → 会社名 → 行番号 の順で採用
+    company_column = select_company_column(df.columns)
+    if company_column:
+        companies = df[company_column]
+    else:
+        companies = pd.Series('行' + (df.index + 1).astype(str), index=df.index)
+    
+    valid_index = df.index[valid_mask]
+    return [
+        {'index': idx, 'url': url, 'company': company}
+        for idx, url, company in zip(
+            valid_index.tolist(),
+            url_series[valid_mask].tolist(),
+            companies[valid_mask].tolist()
+        )
+    ]
+
 def get_target_urls(df):
     """対象URLを抽出 (httpから始まるURLのみ)"""
-    urls = []
-    
     # contact_url列を優先、なければE-mail列を使用
-    url_column = None
-    if 'contact_url' in df.columns:
-        url_column = 'contact_url'
-        logging.info("対象列: contact_url")
-    elif 'E-mail' in df.columns:
-        url_column = 'E-mail'  
-        logging.info("対象列: E-mail")
-    elif 'url' in df.columns:
-        url_column = 'url'
-        logging.info("対象列: url")
-    else:
+    url_column = select_url_column(df.columns)
+    if url_column is None:
         available_columns = list(df.columns)
         logging.error(f"利用可能な列: {available_columns}")
         raise ValueError("contact_url、E-mail、url列のいずれかが必要です")
+    logging.info(f"対象列: {url_column}")
     
-    total_rows = 0
-    valid_urls = 0
-    
-    for idx, row in df.iterrows():
-        total_rows += 1
-        url = str(row[url_column]).strip()
-        
-        # httpから始まるURLのみを対象とする
-        if url and url != 'nan' and url.lower().startswith('http'):
-            valid_urls += 1
-            urls.append({
-                'index': idx,
-                'url': url,
-                'company': row.get('company', row.get('会社名', f'行{idx+1}'))
-            })
-            logging.debug(f"有効URL: {url} ({row.get('company', row.get('会社名', '不明'))})")
-        else:
-            logging.debug(f"無効URL (行{idx+1}): {url}")
+    urls = extract_url_records(df, url_column)
     
-    logging.info(f"全行数: {total_rows}, 有効URL数: {valid_urls}")
+    logging.info(f"全行数: {len(df)}, 有効URL数: {len(urls)}")
     logging.info(f"対象URL例: {urls[:3] if urls else '無し'}")
     
     return urls
 
-def find_form_fields(driver):
-    """フォーム入力欄を検出 - CLAUDE.md要件に準拠"""
-    fields = {}
+def parse_input_file(filepath, on_chunk=None, stats=None):
+    """入力ファイルを少しずつ読み込み、対象URLのリストを返す（シート全体は保持しない）
+
+    on_chunk を渡すと、全列を読み込んだシートのチャンクごとに on_chunk(chunk) を呼ぶ。
+    stats は iter_url_records と同じ。
+    """
+    stats = {} if stats is None else stats
+    urls = list(iter_url_records(filepath, stats, on_chunk=on_chunk))
+    logging.info(f"全行数: {stats['total_rows']}, 有効URL数: {len(urls)}")
+    logging.info(f"対象URL例: {urls[:3] if urls else '無し'}")
+    return urls
+
+def load_input_dataset(filepath, use_cache=True, content_hash=None, stats=None):
+    """対象URLのリストを返す（キャッシュがあればメモリマップで読み込み、なければ読み込みながらキャッシュする）
+
+    stats（dict）を渡すと、ファイルを読み込んだ場合に行数などを記録する（キャッシュから読んだ場合は空のまま）。
+    """
+    if not use_cache:
+        return parse_input_file(filepath, stats=stats)
+    return load_dataset(filepath, lambda path, on_chunk: parse_input_file(path, on_chunk, stats), content_hash)
+
+def iter_input_sheet(filepath, use_cache=True, content_hash=None):
+    """結果ファイルの組み立て用に、入力シートをチャンク単位で返す（キャッシュがあればキャッシュから）"""
+    if use_cache:
+        key = content_hash or file_content_hash(filepath)
+        if cached_metadata(key):
+            return iter_cached_sheet(key)
+    return iter_sheet_chunks(filepath)
+
+def _iter_csv_chunks(filepath, chunksize, all_columns=False):
+    """CSVをチャンク単位で読み込む（インデックスは通し番号）
+
+    all_columns が偽なら、URL列と会社名の列だけを読み込む。値は元の文字列のまま読む。
+    """
+    encoding = sniff_encoding(filepath)
+    usecols = None
+    if not all_columns:
+        columns = pd.read_csv(filepath, encoding=encoding, nrows=0).columns
+        usecols = [column for column in (select_url_column(columns), select_company_column(columns)) if column]
+    reader = pd.read_csv(
+        filepath, encoding=encoding, chunksize=chunksize,
+        usecols=usecols or None, dtype=str, keep_default_na=False
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+def _dedup_columns(header):
+    """見出し行を pd.read_excel と同じ規則で列名にする
+
+    空の見出しは 'Unnamed: 列番号'、重複した列名は name, name.1, name.2 … に付け替える
+    （名前のある列を先に、空の見出しの列を後に処理する）。
+    """
+    columns = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+    unnamed = [i for i, name in enumerate(header) if name is None]
+    counts = {}
+    for i in [i for i in range(len(columns)) if i not in unnamed] + unnamed:
+        base = name = columns[i]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[base] = count + 1
+            name = f'{base}.{count}'
+            count = count + 1 if name in columns else counts.get(name, 0)
+        columns[i] = name
+        counts[name] = count + 1
+    return columns
+
+def _iter_excel_chunks(filepath, chunksize):
+    """Excelをopenpyxlの読み取り専用モードで行ごとに読み、チャンク単位のデータフレームにする
+
+    pd.read_excel と同じ行番号になるよう、末尾の空行だけを除外する。
+    """
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _dedup_columns(header)
+        
+        buffer = []
+        pending_blank = []
+        start = 0
+        for row in rows:
+            if all(value is None for value in row):
+                pending_blank.append(row)
+                continue
+            buffer.extend(pending_blank)
+            pending_blank = []
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+def iter_sheet_chunks(filepath, chunksize=READ_CHUNK_ROWS, all_columns=True):
+    """入力ファイルをチャンク単位のデータフレームで返す（インデックスは通し番号の行番号）
+
+    all_columns が偽なら、CSVはURL列と会社名の列だけを読み込む。
+    """
+    _, ext = os.path.splitext(filepath)
+    if ext.lower() == '.csv':
+        return _iter_csv_chunks(filepath, chunksize, all_columns)
+    if ext.lower() == '.xlsx':
+        return _iter_excel_chunks(filepath, chunksize)
+    # 旧形式(.xls)は読み取り専用モードに対応していないため一括で読み込む
+    return iter([read_input_file(filepath)])
+
+def iter_url_records(filepath, stats=None, chunksize=READ_CHUNK_ROWS, on_chunk=None):
+    """入力ファイルを少しずつ読み込み、対象URLのレコードを遅延して返す
+
+    シート全体をメモリに保持しない。stats（dict）を渡すと、読み込んだ行数を
+    'total_rows' に、選択したURL列を 'url_column' に記録する。
+    on_chunk を渡すと全列を読み込み、チャンクごとに on_chunk(chunk) を呼ぶ。
+    """
+    chunks = iter_sheet_chunks(filepath, chunksize, all_columns=on_chunk is not None)
     
-    # フィールド検出パターン（優先度順）
-    field_patterns = {
-        'name': ['name', 'お名前', '氏名', '名前', 'your-name', 'customer-name', 'fullname', 'contact-name'],
-        'company': ['company', '会社名', '会社', 'organization', 'corp', 'your-company', 'corp-name'],
-        'email': ['email', 'mail', 'メール', 'e-mail', 'your-email', 'address', 'mailaddress'],
-        'phone': ['phone', 'tel', '電話', '電話番号', 'your-phone', 'telephone', 'contact-phone'],
-        'message': ['message', 'content', 'body', 'inquiry', 'comment', 'お問い合わせ', 'your-message', 'textarea', '内容', 'details']
+    if stats is not None:
+        stats.setdefault('total_rows', 0)
+    
+    for chunk in chunks:
+        url_column = select_url_column(chunk.columns)
+        if url_column is None:
+            logging.error(f"利用可能な列: {list(chunk.columns)}")
+            raise ValueError("contact_url、E-mail、url列のいずれかが必要です")
+        if stats is not None:
+            stats['total_rows'] += len(chunk)
+            stats['url_column'] = url_column
+        if on_chunk is not None:
+            on_chunk(chunk)
+        for record in extract_url_records(chunk, url_column):
+            yield record
+
+# フィールド検出パターン（優先度順）
+FIELD_PATTERNS = {
+    'name': ['name', 'お名前', '氏名', '名前', 'your-name', 'customer-name', 'fullname', 'contact-name'],
+    'company': ['company', '会社名', '会社', 'organization', 'corp', 'your-company', 'corp-name'],
+    'email': ['email', 'mail', 'メール', 'e-mail', 'your-email', 'address', 'mailaddress'],
+    'phone': ['phone', 'tel', '電話', '電話番号', 'your-phone', 'telephone', 'contact-phone'],
+    'message': ['message', 'content', 'body', 'inquiry', 'comment', 'お問い合わせ', 'your-message', 'textarea', '内容', 'details']
+}
+
+# スナップショット分類で照合する属性（優先度順）
+SNAPSHOT_ATTRIBUTES = ['name', 'id', 'placeholder', 'label']
+
+# テキスト入力として扱わないinputのtype
+NON_TEXT_INPUT_TYPES = {'hidden', 'submit', 'button', 'reset', 'image', 'checkbox', 'radio', 'file'}
+
+# ページ内の全入力要素と属性を1回のスクリプト呼び出しで取得する
+_FIELD_SNAPSHOT_SCRIPT = """
+var controls = document.querySelectorAll('input, textarea, select');
+var elements = [];
+var infos = [];
+for (var i = 0; i < controls.length; i++) {
+    var el = controls[i];
+    var label = '';
+    if (el.labels) {
+        for (var j = 0; j < el.labels.length; j++) {
+            label += ' ' + (el.labels[j].innerText || '');
+        }
     }
+    label = (label + ' ' + (el.getAttribute('aria-label') || '')).trim();
+    var style = window.getComputedStyle(el);
+    elements.push(el);
+    infos.push({
+        tag: el.tagName.toLowerCase(),
+        type: (el.getAttribute('type') || '').toLowerCase(),
+        name: el.getAttribute('name') || '',
+        id: el.id || '',
+        placeholder: el.getAttribute('placeholder') || '',
+        label: label,
+        visible: el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none',
+        disabled: !!el.disabled,
+        readonly: !!el.readOnly
+    });
+}
+return [elements, infos];
+"""
+
+def snapshot_form_fields(driver):
+    """全てのinput/textarea/selectを1回のスクリプト呼び出しで収集し (要素リスト, 属性リスト) を返す"""
+    elements, infos = driver.execute_script(_FIELD_SNAPSHOT_SCRIPT)
+    return elements, infos
+
+def classify_form_fields(infos):
+    """スナップショットをパターン表で分類し {フィールド種別: 要素インデックス} を返す
+
+    優先度は従来のセレクタ検索と同じく 属性（name→id→placeholder→label）→ パターン → 文書順。
+    非表示・無効・読み取り専用の要素と、別の種別に割り当て済みの要素は対象外。
+    """
+    assigned = {}
+    used = set()
+    
+    for field_type, patterns in FIELD_PATTERNS.items():
+        allowed_tags = ('input', 'textarea') if field_type == 'message' else ('input',)
+        candidates = [
+            idx for idx, info in enumerate(infos)
+            if info['tag'] in allowed_tags
+            and info['type'] not in NON_TEXT_INPUT_TYPES
+            and info['visible'] and not info['disabled'] and not info['readonly']
+            and idx not in used
+        ]
+        
+        match = None
+        for attribute in SNAPSHOT_ATTRIBUTES:
+            for pattern in patterns:
+                pattern = pattern.lower()
+                for idx in candidates:
+                    if pattern in infos[idx][attribute].lower():
+                        match = idx
+                        break
+                if match is not None:
+                    break
+            if match is not None:
+                break
+        
+        if match is not None:
+            assigned[field_type] = match
+            used.add(match)
+    
+    return assigned
+
+def find_form_fields(driver, mode='snapshot'):
+    """フォーム入力欄を検出 - CLAUDE.md要件に準拠
+
+    mode='snapshot' はDOMを1回で取得してPython側で分類し、
+    mode='selectors' は従来どおりパターンごとにfind_elementで検索する。
+    """
+    if mode == 'snapshot':
+        try:
+            elements, infos = snapshot_form_fields(driver)
+            indexes = classify_form_fields(infos)
+            logging.debug(f"スナップショット検出: 要素数={len(infos)}, 分類結果={indexes}")
+            return {field_type: elements[idx] for field_type, idx in indexes.items()}
+        except WebDriverException as e:
+            logging.warning(f"スナップショット検出エラー（セレクタ検索に切り替え）: {str(e)}")
+    
+    return find_form_fields_by_selectors(driver)
+
+def find_form_fields_by_selectors(driver):
+    """パターンごとにCSSセレクタで検索してフォーム入力欄を検出（従来方式）"""
+    fields = {}
     
-    for field_type, patterns in field_patterns.items():
+    for field_type, patterns in FIELD_PATTERNS.items():
         element = None
         
         # name属性で検索
@@ -257,42 +599,124 @@ def find_form_fields(driver):
     
     return fields
 
+# 検出フィールドに入力する値（入力順）
+FORM_FIELD_VALUES = {
+    'name': COMPANY_INFO['full_name'],
+    'company': COMPANY_INFO['company_name'],
+    'email': COMPANY_INFO['email'],
+    'phone': COMPANY_INFO['phone'],
+    'message': COMPANY_INFO['message']
+}
+
+# プルダウンで選択しない（プレースホルダー扱いの）選択肢
+SELECT_PLACEHOLDER_TEXTS = ['選択してください', 'Please select', '--']
+
 def fill_form_fields(driver, fields):
     """フォーム欄に情報を入力"""
     try:
         # 各フィールドに値を入力
-        if 'name' in fields:
-            fields['name'].clear()
-            fields['name'].send_keys(COMPANY_INFO['full_name'])
-            time.sleep(0.5)
-        
-        if 'company' in fields:
-            fields['company'].clear()
-            fields['company'].send_keys(COMPANY_INFO['company_name'])
-            time.sleep(0.5)
-        
-        if 'email' in fields:
-            fields['email'].clear()
-            fields['email'].send_keys(COMPANY_INFO['email'])
-            time.sleep(0.5)
-        
-        if 'phone' in fields:
-            fields['phone'].clear()
-            fields['phone'].send_keys(COMPANY_INFO['phone'])
-            time.sleep(0.5)
-        
-        if 'message' in fields:
-            fields['message'].clear()
-            fields['message'].send_keys(COMPANY_INFO['message'])
-            time.sleep(1)
+        for field_type, value in FORM_FIELD_VALUES.items():
+            if field_type in fields:
+                fields[field_type].clear()
+                fields[field_type].send_keys(value)
         
         return True
     except Exception as e:
         logging.error(f"フォーム入力エラー: {str(e)}")
         return False
 
+# 入力・プルダウン・ラジオボタンを1回のスクリプト呼び出しで設定する
+# （ネイティブのvalueセッターを使い、フレームワークが監視するinput/changeイベントを発火）
+_FAST_FILL_SCRIPT = """
+var entries = arguments[0];
+var placeholders = arguments[1];
+var report = {rejected: [], selects: [], radios: []};
+
+function fire(el, type) {
+    el.dispatchEvent(new Event(type, {bubbles: true}));
+}
+function isVisible(el) {
+    var style = window.getComputedStyle(el);
+    return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+for (var i = 0; i < entries.length; i++) {
+    var el = entries[i][0], value = entries[i][1], key = entries[i][2];
+    try {
+        var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        el.focus();
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+        fire(el, 'input');
+        fire(el, 'change');
+        el.blur();
+        if (el.value !== value || (el.checkValidity && !el.checkValidity())) {
+            report.rejected.push(key);
+        }
+    } catch (e) {
+        report.rejected.push(key);
+    }
+}
+
+var selects = document.querySelectorAll('select');
+for (var s = 0; s < selects.length; s++) {
+    var select = selects[s];
+    if (select.disabled || select.options.length <= 1) { continue; }
+    var chosen = 1;
+    for (var o = 1; o < select.options.length; o++) {
+        var text = (select.options[o].text || '').trim();
+        if (text && placeholders.indexOf(text) < 0) { chosen = o; break; }
+    }
+    select.selectedIndex = chosen;
+    fire(select, 'input');
+    fire(select, 'change');
+    report.selects.push((select.options[chosen].text || '').trim());
+}
+
+var radios = document.querySelectorAll('input[type="radio"]');
+var groups = {};
+for (var r = 0; r < radios.length; r++) {
+    var radio = radios[r];
+    if (!radio.name || groups[radio.name] || radio.disabled || !isVisible(radio)) { continue; }
+    if (!radio.checked) { radio.click(); }
+    groups[radio.name] = true;
+    report.radios.push(radio.name);
+}
+return report;
+"""
+
+def fast_fill_form(driver, fields):
+    """入力欄・プルダウン・ラジオボタンを1回のスクリプト呼び出しでまとめて設定
+
+    値が反映されない、または入力検証で拒否されたフィールドだけ send_keys で入力し直す。
+    """
+    try:
+        entries = [
+            [fields[field_type], value, field_type]
+            for field_type, value in FORM_FIELD_VALUES.items()
+            if field_type in fields
+        ]
+        report = driver.execute_script(_FAST_FILL_SCRIPT, entries, SELECT_PLACEHOLDER_TEXTS)
+        
+        for option_text in report['selects']:
+            logging.info(f"プルダウン選択: {option_text}")
+        for name in report['radios']:
+            logging.info(f"ラジオボタン選択: {name}")
+        
+        rejected = report['rejected']
+        if rejected:
+            logging.info(f"一括入力が拒否されたフィールド（キー入力で再入力）: {rejected}")
+            return fill_form_fields(driver, {field_type: fields[field_type] for field_type in rejected})
+        
+        return True
+    except Exception as e:
+        logging.error(f"一括入力エラー: {str(e)}")
+        return False
+
 def handle_select_elements(driver):
-    """プルダウンとラジオボタンを処理 - CLAUDE.md要件に準拠"""
+    """プルダウンとラジオボタンを処理 - CLAUDE.md要件に準拠
+
+    選択・クリックはWebDriverのコマンドが戻った時点で反映されているため、要素ごとに待機しない。
+    """
     try:
         # プルダウン（select）の処理 - 一番上の選択肢を選択
         selects = driver.find_elements(By.TAG_NAME, 'select')
@@ -306,7 +730,7 @@ def handle_select_elements(driver):
                     selected = False
                     for idx in range(1, len(options)):
                         option_text = options[idx].text.strip()
-                        if option_text and option_text not in ['選択してください', 'Please select', '--']:
+                        if option_text and option_text not in SELECT_PLACEHOLDER_TEXTS:
                             select_obj.select_by_index(idx)
                             logging.info(f"プルダウン選択: {option_text}")
                             selected = True
@@ -316,8 +740,6 @@ def handle_select_elements(driver):
                         # それでも選択されない場合は2番目の選択肢を選択
                         select_obj.select_by_index(1)
                         logging.info(f"プルダウン選択（デフォルト）: {options[1].text}")
-                
-                time.sleep(0.5)
             except Exception as e:
                 logging.warning(f"プルダウン{i+1}処理エラー: {str(e)}")
         
@@ -332,15 +754,136 @@ def handle_select_elements(driver):
                         radio.click()
                         radio_groups[name] = True
                         logging.info(f"ラジオボタン選択: {name}")
-                        time.sleep(0.5)
                 except Exception as e:
                     logging.warning(f"ラジオボタン処理エラー ({name}): {str(e)}")
         
     except Exception as e:
         logging.error(f"選択要素処理エラー: {str(e)}")
 
-def find_submit_button(driver):
-    """送信ボタンを検出 - CLAUDE.md要件に準拠"""
+# クリック候補（button / input / a）と表示状態を1回のスクリプト呼び出しで取得する
+_CLICK_CANDIDATES_SCRIPT = """
+var nodes = document.querySelectorAll('button, input, a');
+var elements = [];
+var infos = [];
+for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i];
+    var tag = el.tagName.toLowerCase();
+    var type = (el.getAttribute('type') || '').toLowerCase();
+    if (tag === 'input' && ['submit', 'button', 'image'].indexOf(type) < 0) {
+        continue;
+    }
+    var style = window.getComputedStyle(el);
+    elements.push(el);
+    infos.push({
+        tag: tag,
+        type: type,
+        text: (el.innerText || '').trim(),
+        value: el.getAttribute('value') || '',
+        visible: el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none',
+        enabled: !el.disabled
+    });
+}
+return [elements, infos];
+"""
+
+def collect_click_candidates(driver):
+    """クリック候補を1回のスクリプト呼び出しで収集し (要素リスト, 属性リスト) を返す"""
+    elements, infos = driver.execute_script(_CLICK_CANDIDATES_SCRIPT)
+    return elements, infos
+
+def _text_position(haystack, table):
+    """haystack に含まれるテキストのうち最も優先度の高いものの順位を返す（該当なしはNone）"""
+    return table.first(haystack.strip().lower())
+
+def rank_submit_candidates(infos):
+    """送信ボタン候補を従来の優先順位で並べたインデックスのリストを返す
+
+    type="submit" の input → button、value一致の input、テキスト一致の button、
+    テキスト一致のリンクの順。テキスト一致は SUBMIT_BUTTON_TEXTS の順、同順位は文書順。
+    """
+    ranked = []
+    for idx, info in enumerate(infos):
+        if not info['visible']:
+            continue
+        tag = info['tag']
+        clickable = info['enabled']
+        
+        if clickable and tag == 'input' and info['type'] == 'submit':
+            ranked.append(((0, 0), idx))
+        elif clickable and tag == 'button' and info['type'] == 'submit':
+            ranked.append(((1, 0), idx))
+        elif clickable and tag == 'input':
+            position = _text_position(info['value'], SUBMIT_BUTTONS)
+            if position is not None:
+                ranked.append(((2, position), idx))
+        elif clickable and tag == 'button':
+            position = _text_position(info['text'], SUBMIT_BUTTONS)
+            if position is not None:
+                ranked.append(((3, position), idx))
+        elif tag == 'a':
+            position = _text_position(info['text'], SUBMIT_BUTTONS)
+            if position is not None:
+                ranked.append(((4, position), idx))
+    
+    ranked.sort()
+    return [idx for _, idx in ranked]
+
+def rank_confirmation_candidates(infos):
+    """確認画面の送信ボタン候補を従来の優先順位で並べたインデックスのリストを返す
+
+    type="submit" の input / button を最優先し、以降は CONFIRMATION_BUTTON_TEXTS の順に
+    button → input の value → リンクで一致したもの。同順位は文書順。
+    """
+    ranked = []
+    for idx, info in enumerate(infos):
+        if not info['visible']:
+            continue
+        tag = info['tag']
+        clickable = info['enabled']
+        
+        if clickable and tag in ('input', 'button') and info['type'] == 'submit':
+            ranked.append(((0, 0, 0), idx))
+        elif clickable and tag == 'button':
+            position = _text_position(info['text'], CONFIRMATION_BUTTONS)
+            if position is not None:
+                ranked.append(((1, position, 0), idx))
+        elif clickable and tag == 'input' and info['type'] in ('submit', 'button'):
+            position = _text_position(info['value'], CONFIRMATION_BUTTONS)
+            if position is not None:
+                ranked.append(((1, position, 1), idx))
+        elif tag == 'a':
+            position = _text_position(info['text'], CONFIRMATION_BUTTONS)
+            if position is not None:
+                ranked.append(((1, position, 2), idx))
+    
+    ranked.sort()
+    return [idx for _, idx in ranked]
+
+def _candidate_label(info):
+    """ログ表示用のボタン名"""
+    return info['text'] or info['value'] or f"<{info['tag']}>"
+
+def find_submit_button(driver, mode='snapshot'):
+    """送信ボタンを検出 - CLAUDE.md要件に準拠
+
+    mode='snapshot' は候補を1回のスクリプト呼び出しで取得して順位付けし、
+    mode='selectors' は従来どおり要素ごとに状態を問い合わせる。
+    """
+    if mode == 'snapshot':
+        try:
+            elements, infos = collect_click_candidates(driver)
+            ranked = rank_submit_candidates(infos)
+            if not ranked:
+                return None
+            logging.info(f"送信ボタン候補: {_candidate_label(infos[ranked[0]])} (候補数: {len(ranked)})")
+            return elements[ranked[0]]
+        except WebDriverException as e:
+            logging.warning(f"送信ボタン一括検出エラー（セレクタ検索に切り替え）: {str(e)}")
+    
+    return find_submit_button_by_selectors(driver)
+
+def find_submit_button_by_selectors(driver):
+    """送信ボタンを要素ごとの問い合わせで検出（従来方式）"""
     # type="submit"を最優先で検索
     submit_selectors = [
         'input[type="submit"]',
@@ -348,7 +891,7 @@ def find_submit_button(driver):
     ]
     
     # value/textによる検索パターン
-    button_texts = ['送信', 'Submit', '確認', '次へ', 'send', 'contact', 'submit']
+    button_texts = SUBMIT_BUTTON_TEXTS
     
     # まずtype="submit"で検索
     for selector in submit_selectors:
@@ -396,117 +939,138 @@ def find_submit_button(driver):
     
     return None
 
-def handle_confirmation_page(driver):
-    """確認画面の処理 - CLAUDE.md要件に準拠"""
+def find_confirmation_button(driver, mode='snapshot'):
+    """確認画面の送信ボタンを検出（mode の意味は find_submit_button と同じ）"""
+    if mode == 'snapshot':
+        try:
+            elements, infos = collect_click_candidates(driver)
+            ranked = rank_confirmation_candidates(infos)
+            if not ranked:
+                return None
+            logging.info(f"確認ボタン候補: {_candidate_label(infos[ranked[0]])} (候補数: {len(ranked)})")
+            return elements[ranked[0]]
+        except WebDriverException as e:
+            logging.warning(f"確認ボタン一括検出エラー（セレクタ検索に切り替え）: {str(e)}")
+    
+    return find_confirmation_button_by_selectors(driver)
+
+def find_confirmation_button_by_selectors(driver):
+    """確認画面の送信ボタンを要素ごとの問い合わせで検出（従来方式）"""
+    # type="submit"を最優先で検索
     try:
-        # 確認画面のボタンテキスト（優先度順）
-        confirmation_texts = ['送信', '確定', '送る', 'Submit', 'OK', 'はい', 'send', 'confirm']
-        
-        # type="submit"を最優先で検索
+        submit_elements = driver.find_elements(By.CSS_SELECTOR, 'input[type="submit"], button[type="submit"]')
+        for element in submit_elements:
+            if element.is_displayed() and element.is_enabled():
+                return element
+    except Exception:
+        pass
+    
+    # テキストベースで検索
+    for text in CONFIRMATION_BUTTON_TEXTS:
         try:
-            submit_elements = driver.find_elements(By.CSS_SELECTOR, 'input[type="submit"], button[type="submit"]')
-            for element in submit_elements:
-                if element.is_displayed() and element.is_enabled():
-                    element.click()
-                    time.sleep(3)  # 送信後の待機時間を延長
-                    return True
-        except Exception:
-            pass
+            # ボタンタグから検索
+            buttons = driver.find_elements(By.TAG_NAME, 'button')
+            for button in buttons:
+                button_text = button.text.strip().lower()
+                if text.lower() in button_text and button.is_displayed() and button.is_enabled():
+                    logging.info(f"確認ボタン候補: {button.text}")
+                    return button
+            
+            # input要素のvalue属性から検索
+            inputs = driver.find_elements(By.CSS_SELECTOR, 'input[type="submit"], input[type="button"]')
+            for input_elem in inputs:
+                value = input_elem.get_attribute('value') or ''
+                if text.lower() in value.lower() and input_elem.is_displayed() and input_elem.is_enabled():
+                    logging.info(f"確認ボタン候補: {value}")
+                    return input_elem
+            
+            # aタグ（リンクボタン）からも検索
+            links = driver.find_elements(By.TAG_NAME, 'a')
+            for link in links:
+                link_text = link.text.strip().lower()
+                if text.lower() in link_text and link.is_displayed():
+                    logging.info(f"確認リンク候補: {link.text}")
+                    return link
+        except Exception as e:
+            logging.debug(f"確認ボタン検索エラー ({text}): {str(e)}")
+            continue
+    
+    return None
+
+def handle_confirmation_page(driver, timeout=WAIT_BUDGETS['confirmation'], mode='snapshot',
+                             layout_cache=None, cache_key=None, no_change_timeout=None):
+    """確認画面の処理 - CLAUDE.md要件に準拠（クリック後は送信結果を判定できるまで最大timeout秒待機）
+
+    layout_cache と cache_key を渡すと、キャッシュ済みの確認ボタンを優先し、
+    新たに検出したボタンはキャッシュに記録する。
+    戻り値はクリック後の送信結果（submit_outcome.wait_for_outcome の戻り値）。
+    確認ボタンが見つからない・クリックできなければ None。
+    """
+    try:
+        button = None
+        if layout_cache and cache_key:
+            button = resolve_cached_confirmation(driver, layout_cache, cache_key)
+            if button:
+                logging.info("キャッシュ済みの確認ボタンを使用")
         
-        # テキストベースで検索
-        for text in confirmation_texts:
-            try:
-                # ボタンタグから検索
-                buttons = driver.find_elements(By.TAG_NAME, 'button')
-                for button in buttons:
-                    button_text = button.text.strip().lower()
-                    if text.lower() in button_text and button.is_displayed() and button.is_enabled():
-                        logging.info(f"確認ボタンクリック: {button.text}")
-                        button.click()
-                        time.sleep(3)
-                        return True
-                
-                # input要素のvalue属性から検索
-                inputs = driver.find_elements(By.CSS_SELECTOR, 'input[type="submit"], input[type="button"]')
-                for input_elem in inputs:
-                    value = input_elem.get_attribute('value') or ''
-                    if text.lower() in value.lower() and input_elem.is_displayed() and input_elem.is_enabled():
-                        logging.info(f"確認ボタンクリック: {value}")
-                        input_elem.click()
-                        time.sleep(3)
-                        return True
-                        
-                # aタグ（リンクボタン）からも検索
-                links = driver.find_elements(By.TAG_NAME, 'a')
-                for link in links:
-                    link_text = link.text.strip().lower()
-                    if text.lower() in link_text and link.is_displayed():
-                        logging.info(f"確認リンククリック: {link.text}")
-                        link.click()
-                        time.sleep(3)
-                        return True
-            except Exception as e:
-                logging.debug(f"確認ボタン検索エラー ({text}): {str(e)}")
-                continue
+        if not button:
+            button = find_confirmation_button(driver, mode)
+            if not button:
+                return None
+            if layout_cache and cache_key:
+                store_confirmation(driver, layout_cache, cache_key, button)
         
-        return False
+        return click_and_wait_for_outcome(driver, button, timeout, no_change_timeout)
     except Exception as e:
         logging.error(f"確認画面処理エラー: {str(e)}")
-        return False
+        return None
+
+def detect_success(driver):
+    """現在のページが送信成功を示していれば検出理由を返す（待機なし）
+
+    URL・本文・タイトルを1回のスクリプト呼び出しで取得し、コンパイル済みのパターン表で
+    URL → 成功メッセージ → タイトルの順に判定する（page_matcher.py）。
+    """
+    return match_success(extract_page(driver))
+
+def check_success(driver, outcome):
+    """送信成功を判定 - CLAUDE.md要件に準拠
 
-def check_success(driver):
-    """送信成功を判定 - CLAUDE.md要件に準拠（5秒待機後判定）"""
+    送信結果の判定（outcome）が success ならそのまま成功とし、上限時間内に判定できなかった
+    場合だけ現在のページをもう一度確認する（待機なし）。
+    """
     try:
-        # 5秒待機してから判定
-        time.sleep(5)
-        
-        # URL確認（ありがとうページ）
-        current_url = driver.current_url.lower()
-        success_url_patterns = ['thanks', 'complete', 'success', 'finish', 'done', 'thankyou', 'sent']
-        
-        for pattern in success_url_patterns:
-            if pattern in current_url:
-                logging.info(f"成功URL検出: {current_url} (パターン: {pattern})")
+        if outcome['kind'] == OUTCOME_SUCCESS:
+            logging.info(outcome['reason'])
+            return True
+        if outcome['kind'] == OUTCOME_TIMEOUT:
+            reason = detect_success(driver)
+            if reason:
+                logging.info(reason)
                 return True
         
-        # ページ内容確認（成功メッセージ）
-        success_messages = [
-            '送信しました', 'ありがとう', '受け付けました', '完了', '送信完了',
-            'thank you', 'success', 'submitted', 'received', 'sent successfully',
-            'お問い合わせありがとう', 'メッセージを送信', '正常に送信'
-        ]
-        
-        try:
-            page_text = driver.find_element(By.TAG_NAME, 'body').text.lower()
-            for msg in success_messages:
-                if msg.lower() in page_text:
-                    logging.info(f"成功メッセージ検出: {msg}")
-                    return True
-        except Exception as e:
-            logging.debug(f"ページテキスト取得エラー: {str(e)}")
-        
-        # ページタイトルでも確認
-        try:
-            title = driver.title.lower()
-            title_success_patterns = ['thanks', 'thank you', 'complete', 'success', '完了', 'ありがとう']
-            for pattern in title_success_patterns:
-                if pattern in title:
-                    logging.info(f"成功タイトル検出: {title}")
-                    return True
-        except Exception as e:
-            logging.debug(f"タイトル取得エラー: {str(e)}")
-        
-        logging.info(f"成功判定: 失敗 - URL: {current_url}")
+        logging.info(f"成功判定: 失敗 ({outcome['kind']}: {outcome['reason']}) - URL: {outcome['page']['url']}")
         return False
         
     except Exception as e:
         logging.error(f"成功判定エラー: {str(e)}")
         return False
 
-def process_single_url(driver, url_info):
-    """単一URLを処理"""
+def process_single_url(driver, url_info, options=None, layout_cache=None, journal=None):
+    """単一URLを処理（各段階は条件待機で、予算内に条件を満たした時点で次へ進む）
+
+    layout_cache（form_cache.FormLayoutCache）を渡すと、キャッシュ済みのセレクタを
+    優先して使い、無効なら全検出に切り替えてキャッシュを更新する。
+    journal（job_journal.JobJournal）を渡すと、送信ボタンのクリック直前に「送信中」を記録する。
+    URL全体と段階ごと（navigate/detect/fill/submit/confirm/verify）に上限時間があり、
+    超過したらそのURLを打ち切って超過した段階を timeout_stage に記録する。
+    """
     url = url_info['url']
     company = url_info['company']
+    options = resolve_job_options(options)
+    budgets = resolve_wait_budgets(options['wait_budgets'])
+    deadline = UrlDeadline(driver, options['stage_budgets'], options['url_deadline'])
+    started = time.time()
     
     result = {
         'url': url,
@@ -520,11 +1084,30 @@ def process_single_url(driver, url_info):
         logging.info(f"処理開始: {company} - {url}")
         
         # ページアクセス
-        driver.get(url)
-        time.sleep(3)  # ページ読み込み待機
+        with deadline.stage('navigate'):
+            driver.get(url)
+            wait_for_document_ready(driver, deadline.budget(budgets['page_load']))
+            if not wait_for_form(driver, deadline.budget(budgets['form'])):
+                logging.debug(f"フォーム要素の出現待機がタイムアウト: {url}")
         
-        # フォーム欄を検出
-        fields = find_form_fields(driver)
+        with deadline.stage('detect'):
+            # キャッシュ済みレイアウトを適用
+            fields = None
+            submit_button = None
+            cache_key = None
+            if layout_cache:
+                try:
+                    lookup = lookup_cached_layout(driver, layout_cache, url)
+                    cache_key = lookup['key']
+                    result['form_cache'] = lookup['status']
+                    fields = lookup['fields']
+                    submit_button = lookup['submit']
+                except WebDriverException as e:
+                    logging.warning(f"フォームレイアウトキャッシュ参照エラー: {str(e)}")
+            
+            # フォーム欄を検出
+            if not fields:
+                fields = find_form_fields(driver, options['detection_mode'])
         if not fields:
             result['error'] = 'フォーム欄が見つかりません'
             logging.warning(f"フォーム欄未検出: {url}")
@@ -532,79 +1115,186 @@ def process_single_url(driver, url_info):
         
         logging.info(f"検出フィールド数: {len(fields)}")
         
-        # フォーム入力
-        if not fill_form_fields(driver, fields):
+        with deadline.stage('fill'):
+            if options['fast_fill']:
+                # フォーム入力と選択要素の処理を一括で実行
+                filled = fast_fill_form(driver, fields)
+            else:
+                # フォーム入力
+                filled = fill_form_fields(driver, fields)
+                if filled:
+                    # 選択要素の処理（fill の内訳として selects の時間も記録）
+                    deadline.check()
+                    with deadline.span('selects'):
+                        handle_select_elements(driver)
+        if not filled:
             result['error'] = 'フォーム入力に失敗しました'
             return result
         
-        # 選択要素の処理
-        handle_select_elements(driver)
-        
-        # 送信ボタンを検出・クリック
-        submit_button = find_submit_button(driver)
-        if not submit_button:
-            result['error'] = '送信ボタンが見つかりません'
-            logging.warning(f"送信ボタン未検出: {url}")
-            return result
-        
-        logging.info(f"送信ボタンクリック: {submit_button.text if hasattr(submit_button, 'text') else 'N/A'}")
-        submit_button.click()
-        time.sleep(3)  # 送信後の待機
-        
-        # 確認画面の処理（より包括的に検出）
-        page_source = driver.page_source.lower()
-        current_url = driver.current_url.lower()
-        
-        # 確認画面検出パターン
-        confirmation_patterns = ['確認', 'confirm', 'preview', 'check', '内容確認', 'verification']
-        is_confirmation_page = any(pattern in page_source or pattern in current_url for pattern in confirmation_patterns)
+        with deadline.stage('submit'):
+            # 送信ボタンを検出・クリック
+            if not submit_button:
+                submit_button = find_submit_button(driver, options['detection_mode'])
+                if not submit_button:
+                    result['error'] = '送信ボタンが見つかりません'
+                    logging.warning(f"送信ボタン未検出: {url}")
+                    return result
+                
+                # 全検出した結果をキャッシュに保存
+                if cache_key:
+                    try:
+                        store_layout(driver, layout_cache, cache_key, fields, submit_button)
+                    except WebDriverException as e:
+                        logging.warning(f"フォームレイアウトキャッシュ保存エラー: {str(e)}")
+            
+            logging.info("送信ボタンクリック")
+            if journal:
+                # クリック後に中断しても、再開時にこの行を再送信しないよう先に記録する
+                journal.mark_in_flight(url_info)
+            outcome = click_and_wait_for_outcome(driver, submit_button, deadline.budget(budgets['after_submit']),
+                                                 budgets['no_change'])
+            logging.info(f"送信後の判定: {outcome['kind']} ({outcome['reason']})")
         
-        if is_confirmation_page:
-            logging.info("確認画面を検出 - 確認ボタンを探します")
-            if handle_confirmation_page(driver):
-                logging.info("確認画面で送信ボタンをクリックしました")
-            else:
-                logging.warning("確認画面で送信ボタンが見つかりませんでした")
+        with deadline.stage('confirm'):
+            # 確認画面の処理。判定が付かないまま変化した場合は従来どおり抽出に確認画面の表示があれば扱う
+            if outcome['kind'] == OUTCOME_TIMEOUT and outcome['changed'] and match_confirmation(outcome['page']):
+                outcome = dict(outcome, kind=OUTCOME_CONFIRMATION, reason=match_confirmation(outcome['page']))
+            
+            if outcome['kind'] == OUTCOME_CONFIRMATION:
+                logging.info(f"確認画面を検出（{outcome['reason']}） - 確認ボタンを探します")
+                confirmed = handle_confirmation_page(driver, deadline.budget(budgets['confirmation']),
+                                                     options['detection_mode'], layout_cache, cache_key,
+                                                     budgets['no_change'])
+                if confirmed:
+                    logging.info(f"確認画面で送信ボタンをクリックしました（{confirmed['kind']}）")
+                    outcome = confirmed
+                else:
+                    logging.warning("確認画面で送信ボタンが見つかりませんでした")
+                    # 確認ボタンのないページ（「確認」を含むありがとうページなど）は従来どおり成功表示で判定する
+                    success = match_success(outcome['page'])
+                    if success:
+                        outcome = dict(outcome, kind=OUTCOME_SUCCESS, reason=success)
         
-        # 成功判定（5秒待機を含む）
-        if check_success(driver):
+        # 成功判定（成功表示はクリック直後から監視済み）
+        with deadline.stage('verify'):
+            result['outcome'] = outcome['kind']
+            succeeded = check_success(driver, outcome)
+        if succeeded:
             result['status'] = 'success'
             result['error'] = '送信成功'
             logging.info(f"✅ 送信成功: {company} - {url}")
+        elif outcome['kind'] == OUTCOME_VALIDATION_ERROR:
+            result['error'] = f"入力エラーで送信できませんでした（{outcome['reason']}）"
+            logging.warning(f"❌ 入力エラー: {company} - {url} ({outcome['reason']})")
+        elif outcome['kind'] == OUTCOME_NO_CHANGE:
+            result['error'] = '送信ボタンのクリック後にページが変化しませんでした'
+            logging.warning(f"❌ 送信後の変化なし: {company} - {url}")
         else:
             result['error'] = '送信結果の確認ができませんでした'
             logging.warning(f"❌ 送信結果不明: {company} - {url}")
     
+    except DeadlineExceeded as e:
+        result['error'] = f'時間超過: {str(e)}'
+        result['timeout_stage'] = e.stage
+        logging.error(f"時間超過で打ち切り: {url} ({str(e)})")
+        # 読み込み中のページを止めて次のURLへ（WebDriverは終了させない）
+        try:
+            driver.execute_script('window.stop();')
+        except WebDriverException:
+            pass
     except TimeoutException:
         result['error'] = 'ページの読み込みがタイムアウトしました'
         logging.error(f"タイムアウト: {url}")
     except Exception as e:
         result['error'] = f'エラー: {str(e)}'
         logging.error(f"処理エラー {url}: {str(e)}")
+    finally:
+        deadline.restore()
     
+    result['elapsed'] = round(time.time() - started, 2)
+    result['stage_timings'] = dict(deadline.timings)
+    logging.info(f"URL処理時間: {result['elapsed']}秒 - {url} {deadline.timings}")
     return result
 
-def save_results(df, results, output_filepath):
-    """結果をファイルに保存"""
+# 結果ファイルに書き出す列（結果のキー → 出力列名, 未処理行の既定値）
+RESULT_COLUMNS = {
+    'status': ('processing_status', 'not_processed'),
+    'error': ('processing_error', ''),
+    'timestamp': ('processing_timestamp', ''),
+    'preflight': ('preflight_status', ''),
+    'timeout_stage': ('timeout_stage', ''),
+    'blocked_requests': ('blocked_requests', 0),
+    'bytes_saved': ('bytes_saved_estimate', 0),
+    'bytes_loaded': ('bytes_loaded', 0),
+    'outcome': ('submit_outcome', ''),
+    'elapsed': ('elapsed_seconds', '')
+}
+
+# 段階ごとの処理時間の列（result['stage_timings'] の段階 → 出力列名）
+SPAN_COLUMNS = {span: f'{span}_seconds' for span in SPAN_NAMES}
+
+def _results_frame(results):
+    """処理結果のリストを、行番号（index）をインデックスにした出力列のデータフレームにする"""
+    output_columns = {key: column for key, (column, _) in RESULT_COLUMNS.items()}
+    output_columns.update(SPAN_COLUMNS)
+    results_df = pd.DataFrame(results, columns=['index'] + list(RESULT_COLUMNS))
+    spans_df = pd.DataFrame([result.get('stage_timings') or {} for result in results], columns=list(SPAN_COLUMNS))
+    results_df = pd.concat([results_df, spans_df], axis=1)
+    return (
+        results_df
+        .drop_duplicates('index', keep='last')
+        .set_index('index')
+        .rename(columns=output_columns)
+    )
+
+def merge_results(df, results):
+    """処理結果を index 列で元のデータフレームに1回で結合して返す
+
+    results は処理結果のリスト、または _results_frame で変換済みのデータフレーム。
+    """
+    results_df = results if isinstance(results, pd.DataFrame) else _results_frame(results)
+    merged = df.drop(columns=list(results_df.columns), errors='ignore').join(results_df)
+    for column, default in RESULT_COLUMNS.values():
+        merged[column] = merged[column].fillna(default)
+        if isinstance(default, int):
+            # 欠損を含む列は結合時に float になるため、件数・バイト数の列は整数に戻す
+            merged[column] = merged[column].astype('int64')
+    for column in SPAN_COLUMNS.values():
+        merged[column] = merged[column].fillna('')
+    return merged
+
+def _write_excel_chunks(merged_chunks, output_filepath):
+    """結合済みのチャンクをopenpyxlの書き込み専用モードで1行ずつ書き出す"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    for position, merged in enumerate(merged_chunks):
+        if position == 0:
+            sheet.append([str(column) for column in merged.columns])
+        values = merged.astype(object).where(merged.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(output_filepath)
+
+def save_results(chunks, results, output_filepath):
+    """結果をファイルに保存
+
+    chunks は入力シートのデータフレーム、またはチャンク単位のデータフレームを返すイテラブル
+    （iter_input_sheet）。チャンクごとに結果を結合して書き出し、シート全体をメモリに保持しない。
+    """
     try:
-        # 結果を元のデータフレームに追加
-        df['processing_status'] = 'not_processed'
-        df['processing_error'] = ''
-        df['processing_timestamp'] = ''
-        
-        for result in results:
-            idx = result.get('index', -1)
-            if idx >= 0 and idx < len(df):
-                df.loc[idx, 'processing_status'] = result['status']
-                df.loc[idx, 'processing_error'] = result['error']
-                df.loc[idx, 'processing_timestamp'] = result['timestamp']
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        results_df = _results_frame(results)
+        merged_chunks = (merge_results(chunk, results_df) for chunk in chunks)
         
         # ファイル保存
         _, ext = os.path.splitext(output_filepath)
         if ext.lower() == '.csv':
-            df.to_csv(output_filepath, index=False, encoding='utf-8-sig')
+            with open(output_filepath, 'w', encoding='utf-8-sig', newline='') as f:
+                for position, merged in enumerate(merged_chunks):
+                    merged.to_csv(f, index=False, header=position == 0)
         else:
-            df.to_excel(output_filepath, index=False)
+            _write_excel_chunks(merged_chunks, output_filepath)
         
         logging.info(f"結果保存完了: {output_filepath}")
         return True
@@ -612,159 +1302,562 @@ def save_results(df, results, output_filepath):
         logging.error(f"結果保存エラー: {str(e)}")
         return False
 
-def process_urls(input_filepath, status_dict, callback_func, driver_callback=None):
-    """メイン処理関数 - 1行ずつブラウザでURL処理"""
-    driver = None
-    results = []
+def resolve_job_options(options=None):
+    """既定のオプションにジョブ固有の指定を重ねて返す"""
+    resolved = dict(DEFAULT_JOB_OPTIONS)
+    if options:
+        resolved.update({key: value for key, value in options.items() if value is not None})
+    resolved['workers'] = max(1, min(int(resolved['workers']), MAX_WORKERS))
+    return resolved
+
+def open_new_tab(driver, timeout=WAIT_BUDGETS['new_tab']):
+    """新しいタブを開いて切り替え、そのハンドルを返す"""
+    # 現在のタブハンドル数を記録
+    original_handles = driver.window_handles
+    original_count = len(original_handles)
+    logging.info(f"現在のタブ数: {original_count}")
     
+    # 新しいタブを開く（JavaScriptで確実に開く）
+    driver.execute_script("window.open('about:blank', '_blank');")
+    
+    # 新しいタブが開かれるまで待機（最大timeout秒）
+    if not wait_for_new_window(driver, original_handles, timeout):
+        raise Exception("新しいタブの作成に失敗しました")
+    
+    # 新しいタブのハンドルを特定
+    new_tab_handle = list(set(driver.window_handles) - set(original_handles))[0]
+    
+    # 新しいタブに切り替え
+    driver.switch_to.window(new_tab_handle)
+    logging.info(f"新しいタブに切り替え成功 (ハンドル: {new_tab_handle})")
+    return new_tab_handle
+
+def process_url_in_new_tab(driver, url_info, options=None, layout_cache=None, lifecycle=None, journal=None):
+    """新しいタブで1件のURLを処理（成功時はタブを閉じ、失敗時は残す）
+
+    lifecycle（BrowserLifecycle）を渡すと、残す失敗タブの数を上限内に保つ。
+    journal は process_single_url と同じ。
+    """
     try:
-        logging.info("=== 自動フォーム送信処理開始 ===")
+        job_options = resolve_job_options(options)
+        budgets = resolve_wait_budgets(job_options['wait_budgets'])
+        tab_handle = open_new_tab(driver, budgets['new_tab'])
+        logging.info(f"新しいタブで処理開始: {url_info['url']}")
         
-        # ファイル読み込み
-        df = read_input_file(input_filepath)
-        urls = get_target_urls(df)
+        # 不要なリソースのブロックはタブごとに設定し、前のURLのネットワーク記録は読み捨てる
+        apply_blocking(driver, blocked_url_patterns(job_options['blocking_profile']))
+        reset_network_stats(driver)
         
-        if not urls:
-            return {'success': False, 'error': '処理対象のURLが見つかりません'}
+        # URL処理
+        result = process_single_url(driver, url_info, options, layout_cache, journal)
+        result.update(collect_network_stats(driver))
+        result['index'] = url_info['index']
+        if 'preflight' in url_info:
+            result['preflight'] = url_info['preflight']
         
-        status_dict['total_urls'] = len(urls)
-        logging.info(f"処理対象URL数: {len(urls)}")
+        if result['status'] == 'success':
+            logging.info(f"✅ 成功: {url_info['company']} - タブを閉じます")
+            
+            # 成功した場合はタブを閉じる
+            driver.close()
+            # メインタブ（最初のタブ）に戻る
+            if driver.window_handles:
+                driver.switch_to.window(driver.window_handles[0])
+        else:
+            logging.warning(f"❌ 失敗: {url_info['company']} - {result['error']} - タブを開いたまま残します")
+            
+            # 失敗した場合はタブを開いたまま残す
+            if lifecycle:
+                # 上限を超えた古いタブは状態を保存して閉じ、メインタブに戻る
+                lifecycle.retain(tab_handle, result)
+            elif len(driver.window_handles) > 1:
+                # メインタブ（最初のタブ）に戻る
+                driver.switch_to.window(driver.window_handles[0])
         
-        # WebDriver設定とテスト
-        logging.info("Chrome WebDriver を初期化中...")
-        driver = setup_chrome_driver()
+        return result
         
-        # WebDriverのコールバック実行（アプリから参照できるよう）
-        if driver_callback:
-            driver_callback(driver)
+    except Exception as e:
+        logging.error(f"URL処理エラー {url_info['url']}: {str(e)}")
+        result = {
+            'index': url_info['index'],
+            'url': url_info['url'],
+            'company': url_info['company'],
+            'status': 'failed',
+            'error': f'処理エラー: {str(e)}',
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if 'preflight' in url_info:
+            result['preflight'] = url_info['preflight']
         
-        # Google アクセステスト
+        # エラー時は現在のタブを閉じてメインタブに戻る
         try:
-            logging.info("ブラウザ動作テスト中...")
-            driver.get('https://www.google.com')
-            time.sleep(2)
-            logging.info("ブラウザ動作テスト成功")
-        except Exception as e:
-            logging.error(f"ブラウザ動作テスト失敗: {str(e)}")
-            raise
+            if len(driver.window_handles) > 1:
+                driver.close()
+                driver.switch_to.window(driver.window_handles[0])
+        except Exception as close_error:
+            logging.warning(f"タブクローズエラー: {str(close_error)}")
+            # メインタブに強制的に戻る（セッションが失われていればワーカー側で起動し直す）
+            try:
+                if driver.window_handles:
+                    driver.switch_to.window(driver.window_handles[0])
+            except Exception as switch_error:
+                logging.warning(f"メインタブへの切り替えエラー: {str(switch_error)}")
+        
+        return result
+
+def summarize_form_cache(results):
+    """結果リストからフォームレイアウトキャッシュのヒット/ミス数を集計"""
+    stats = {'hits': 0, 'misses': 0, 'stale': 0}
+    for result in results:
+        status = result.get('form_cache')
+        if status == 'hit':
+            stats['hits'] += 1
+        elif status == 'miss':
+            stats['misses'] += 1
+        elif status == 'stale':
+            stats['stale'] += 1
+    return stats
+
+def _record_result(shared, result, persist=True):
+    """ワーカーの処理結果を共有の結果リストとカウンタへ反映し、ジャーナルに追記"""
+    status_dict = shared['status_dict']
+    with shared['lock']:
+        if persist:
+            shared['journal'].append(result)
+            if shared['contact_index']:
+                shared['contact_index'].record(result)
+            ENGINE_METRICS.observe_result(result)
+        shared['results'].append(result)
+        if result['status'] == 'success':
+            status_dict['success'] += 1
+        elif result['status'] == 'skipped':
+            status_dict['skipped'] = status_dict.get('skipped', 0) + 1
+        else:
+            status_dict['failed'] += 1
+        status_dict['processed'] = len(shared['results'])
+
+def _report_progress(shared, current_url):
+    """現在の進捗をコールバックに通知（共有ロック取得済みで呼ぶ）"""
+    status_dict = shared['status_dict']
+    status_dict['current_url'] = current_url
+    shared['callback_func'](
+        current_url,
+        len(shared['results']),
+        status_dict['success'],
+        status_dict['failed'],
+        shared['total'],
+        shared['results']
+    )
+
+def launch_browser(slot, page_load_strategy='eager'):
+    """ブラウザ枠用のChromeを起動して動作確認し、(driver, user_data_dir) を返す
+
+    動作確認はローカルページで行い、外部サイトにはアクセスしない。
+    """
+    # 枠ごとに独立したプロファイルを使用
+    user_data_dir = tempfile.mkdtemp(prefix=f'form_browser{slot}_')
+    driver = None
+    try:
+        logging.info(f"[枠{slot}] Chrome WebDriver を初期化中...")
+        driver = setup_chrome_driver(
+            debug_port=BASE_DEBUG_PORT + slot,
+            user_data_dir=user_data_dir,
+            page_load_strategy=page_load_strategy
+        )
+        if not check_browser_ready(driver):
+            raise Exception('ブラウザ動作確認に失敗しました')
+        driver.set_page_load_timeout(10)
+        logging.info(f"[枠{slot}] ブラウザ動作確認成功")
+        return driver, user_data_dir
+    except Exception:
+        if driver:
+            driver.quit()
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+        raise
+
+def _start_worker_browser(worker_id, slot, options, driver_callback=None):
+    """ワーカー用のChromeを (driver, user_data_dir) で用意（プールに起動済みがあれば使う）"""
+    pool = options['browser_pool']
+    browser = None
+    if pool:
+        # プールが起動中なら完了を待つ（同じ枠のポートで二重に起動しないため）
+        browser = pool.acquire(slot, options['page_load_strategy'], wait=60)
+        if browser:
+            logging.info(f"[worker{worker_id}] プールの起動済みブラウザを使用 (枠{slot})")
+    if browser is None:
+        browser = launch_browser(slot, options['page_load_strategy'])
+    
+    # WebDriverのコールバック実行（アプリから参照できるよう）
+    if driver_callback:
+        driver_callback(browser[0])
+    return browser
+
+def _relaunch_worker_browser(worker_id, slot, options, driver, user_data_dir, driver_callback=None, dead=False):
+    """ワーカーのChromeを終了して同じ枠で起動し直し、(driver, user_data_dir) を返す
+
+    dead（セッションが失われた）なら、user_data_dir を使って残っているChromeのプロセスも終了させる。
+    """
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.warning(f"[worker{worker_id}] WebDriver終了エラー（無視）: {str(e)}")
+    if dead:
+        killed = kill_browser_processes(user_data_dir)
+        if killed:
+            logging.info(f"[worker{worker_id}] 残っていたChromeのプロセスを終了: {killed}件")
+    shutil.rmtree(user_data_dir, ignore_errors=True)
+    driver, user_data_dir = launch_browser(slot, options['page_load_strategy'])
+    if driver_callback:
+        driver_callback(driver)
+    return driver, user_data_dir
+
+def _record_respawn(shared, worker_id, cause, url):
+    """セッション喪失からの起動し直しをジョブの状態とメトリクスに記録"""
+    status_dict = shared['status_dict']
+    with shared['lock']:
+        status_dict['browser_respawns'] = status_dict.get('browser_respawns', 0) + 1
+        causes = status_dict.setdefault('respawn_causes', {})
+        causes[cause] = causes.get(cause, 0) + 1
+        status_dict.setdefault('respawn_log', []).append({
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'worker': worker_id,
+            'cause': cause,
+            'url': url
+        })
+    ENGINE_METRICS.observe_respawn(cause)
+
+def _run_worker(worker_id, scheduler, shared, driver_callback=None):
+    """スケジューラからURLを受け取って処理するワーカー（1ワーカー = 1 Chrome）
+
+    同じホストの間隔調整はスケジューラが行うため、ワーカー自身は待機しない。
+
+    一定件数の処理後やレンダラーのメモリ使用量が上限を超えたときは、
+    キューの処理を続けたままブラウザだけを再起動する。
+    Chromeやchromedriverが異常終了してセッションが失われたときは、残ったプロセスを
+    終了させてブラウザを起動し直し、処理中だったURLをスケジューラに戻して続ける。
+    """
+    status_dict = shared['status_dict']
+    options = shared['options']
+    driver = None
+    user_data_dir = None
+    # ジョブマネージャーが割り当てたブラウザ枠（同時実行ジョブ間でポートが重ならないように）
+    slots = options['browser_slots']
+    slot = slots[worker_id] if slots and worker_id < len(slots) else worker_id
+    command_report = shared['command_report']
+    recorder = None
+    profiler = start_profiler() if options['profile'] else None
+    respawns = 0
+    
+    try:
+        driver, user_data_dir = _start_worker_browser(worker_id, slot, options, driver_callback)
+        if options['command_stats']:
+            recorder = CommandRecorder(driver)
+        lifecycle = BrowserLifecycle(
+            driver,
+            max_failed_tabs=options['max_failed_tabs'],
+            restart_after_urls=options['restart_after_urls'],
+            rss_limit_mb=options['renderer_rss_limit_mb'],
+            label=f'[worker{worker_id}] '
+        )
+        
+        with shared['lock']:
+            shared['started_workers'] += 1
         
-        # 各URLを1行ずつ新しいタブで処理
-        for i, url_info in enumerate(urls):
-            if not status_dict['is_running']:
-                logging.info("処理停止要求を受信")
+        while True:
+            # 処理できるホストのURLが空くまで待機（停止要求か全件配布済みならNone）
+            url_info = scheduler.acquire(lambda: not status_dict['is_running'])
+            if url_info is None:
+                if not status_dict['is_running']:
+                    logging.info(f"[worker{worker_id}] 処理停止要求を受信")
                 break
             
-            logging.info(f"=== 処理中 {i+1}/{len(urls)}: {url_info['company']} ===")
-            
             # ステータス更新
-            status_dict['current_url'] = url_info['url']
-            callback_func(
-                url_info['url'],
-                i,
-                status_dict['success'],
-                status_dict['failed'],
-                len(urls),
-                results
-            )
+            with shared['lock']:
+                processed = len(shared['results'])
+                logging.info(f"=== [worker{worker_id}] 処理中 {processed+1}/{shared['total']}: {url_info['company']} ===")
+                _report_progress(shared, url_info['url'])
             
-            # 新しいタブでURL処理
+            if recorder:
+                recorder.begin()
             try:
-                # 現在のタブハンドル数を記録
-                original_handles = driver.window_handles
-                original_count = len(original_handles)
-                logging.info(f"現在のタブ数: {original_count}")
-                
-                # 新しいタブを開く（JavaScriptで確実に開く）
-                driver.execute_script("window.open('about:blank', '_blank');")
-                
-                # 新しいタブが開かれるまで待機（最大5秒）
-                new_tab_handle = None
-                for attempt in range(10):
-                    time.sleep(0.5)
-                    current_handles = driver.window_handles
-                    if len(current_handles) > original_count:
-                        # 新しいタブのハンドルを特定
-                        new_tab_handle = list(set(current_handles) - set(original_handles))[0]
-                        break
-                    logging.debug(f"新しいタブ待機中... 試行{attempt+1}")
-                
-                if new_tab_handle:
-                    # 新しいタブに切り替え
-                    driver.switch_to.window(new_tab_handle)
-                    logging.info(f"新しいタブに切り替え成功 (ハンドル: {new_tab_handle})")
-                    logging.info(f"新しいタブで処理開始: {url_info['url']}")
-                else:
-                    raise Exception("新しいタブの作成に失敗しました")
-                
-                # URL処理
-                result = process_single_url(driver, url_info)
-                result['index'] = url_info['index']
-                results.append(result)
+                result = process_url_in_new_tab(driver, url_info, options, shared['layout_cache'], lifecycle,
+                                                shared['journal'])
+            finally:
+                scheduler.release(url_info)
+            if recorder:
+                usage = recorder.end()
+                result['webdriver_commands'] = usage['commands']
+                result['webdriver_seconds'] = round(usage['seconds'], 2)
+                command_report.add_url(result, usage)
+            if not status_dict['is_running'] and result['status'] != 'success':
+                # 停止要求で中断された結果は記録せず、再開時に再処理する
+                # （送信ボタンをクリック済みなら「送信中」の記録が残り、再開時に要確認として扱う）
+                logging.info(f"[worker{worker_id}] 停止により中断: {url_info['url']}（記録しません）")
+                break
+            
+            # 失敗したURLではセッションが生きているか確認し、失われていればブラウザを起動し直す
+            cause = lifecycle.session_failure() if result['status'] != 'success' else None
+            if cause:
+                respawns += 1
+                logging.error(f"[worker{worker_id}] ブラウザのセッションが失われました（{cause}）: {url_info['url']}")
+                _record_respawn(shared, worker_id, cause, url_info['url'])
                 
-                # 結果集計と対応
-                if result['status'] == 'success':
-                    status_dict['success'] += 1
-                    logging.info(f"✅ 成功: {url_info['company']} - タブを閉じます")
-                    
-                    # 成功した場合はタブを閉じる
-                    driver.close()
-                    # メインタブ（最初のタブ）に戻る
-                    if driver.window_handles:
-                        driver.switch_to.window(driver.window_handles[0])
+                # 処理中だったURLは、起動し直す前に戻すか記録する（起動に失敗しても失われないように）
+                retries = url_info.get('session_retries', 0)
+                clicked = shared['journal'].is_in_flight(url_info['index'])
+                if clicked:
+                    # 送信ボタンのクリック後に落ちた場合は、二重送信を避けるため再処理しない
+                    result['error'] = f"{result['error']}（ブラウザ異常終了: {cause}。送信ボタンのクリック後のため再送信しません）"
+                    _record_result(shared, result)
+                    with shared['lock']:
+                        _report_progress(shared, status_dict['current_url'])
+                elif retries < SESSION_RETRIES_PER_URL:
+                    # 記録せず、同じホストの先頭に戻して再処理する（このワーカーが止まれば他のワーカーが処理する）
+                    scheduler.requeue(dict(url_info, session_retries=retries + 1))
                 else:
-                    status_dict['failed'] += 1
-                    logging.warning(f"❌ 失敗: {url_info['company']} - {result['error']} - タブを開いたまま残します")
-                    
-                    # 失敗した場合はタブを開いたまま残す
-                    # メインタブ（最初のタブ）に戻る
-                    if len(driver.window_handles) > 1:
-                        driver.switch_to.window(driver.window_handles[0])
+                    # 同じURLで繰り返し落ちる場合は失敗として記録する
+                    result['error'] = f"{result['error']}（ブラウザ異常終了: {cause}）"
+                    _record_result(shared, result)
+                    with shared['lock']:
+                        _report_progress(shared, status_dict['current_url'])
                 
-                status_dict['processed'] = i + 1
-                
-                # 次のURL処理まで2秒間隔で待機
-                if i < len(urls) - 1:
-                    logging.info("2秒待機中...")
-                    time.sleep(2)
-                    
-            except Exception as e:
-                logging.error(f"URL処理エラー {url_info['url']}: {str(e)}")
-                result = {
-                    'index': url_info['index'],
-                    'url': url_info['url'],
-                    'company': url_info['company'],
-                    'status': 'failed',
-                    'error': f'処理エラー: {str(e)}',
-                    'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-                }
-                results.append(result)
-                status_dict['failed'] += 1
-                status_dict['processed'] = i + 1
-                
-                # エラー時は現在のタブを閉じてメインタブに戻る
+                if respawns > MAX_SESSION_RESPAWNS:
+                    kill_browser_processes(user_data_dir)
+                    raise Exception(f'ブラウザの異常終了が{respawns}回続いたためワーカーを停止します')
+                lifecycle.discard_all()
+                driver, user_data_dir = _relaunch_worker_browser(
+                    worker_id, slot, options, driver, user_data_dir, driver_callback, dead=True
+                )
+                lifecycle.attach(driver)
+                if recorder:
+                    recorder.attach(driver)
+                logging.info(f"[worker{worker_id}] ブラウザを起動し直しました（{respawns}回目）")
+                continue
+            
+            _record_result(shared, result)
+            # 完了した結果をすぐに配信できるよう通知
+            with shared['lock']:
+                _report_progress(shared, status_dict['current_url'])
+            
+            # 必要ならブラウザを再起動（残りのURLがあるときだけ）
+            lifecycle.url_done()
+            reason = lifecycle.restart_reason()
+            if reason and status_dict['is_running'] and scheduler.has_pending():
+                logging.info(f"[worker{worker_id}] ブラウザを再起動します（{reason}）")
+                lifecycle.release_all()
+                driver, user_data_dir = _relaunch_worker_browser(
+                    worker_id, slot, options, driver, user_data_dir, driver_callback
+                )
+                lifecycle.attach(driver)
+                if recorder:
+                    recorder.attach(driver)
+                lifecycle.restarts += 1
+                with shared['lock']:
+                    status_dict['browser_restarts'] = status_dict.get('browser_restarts', 0) + 1
+    
+    except Exception as e:
+        logging.error(f"[worker{worker_id}] ワーカーエラー: {str(e)}", exc_info=True)
+        with shared['lock']:
+            shared['errors'].append(str(e))
+    
+    finally:
+        if profiler:
+            profiler.disable()
+            command_report.add_profile(profiler)
+        if recorder:
+            recorder.detach()
+        if driver and options['browser_pool']:
+            # 次のジョブで使えるようプールに戻す（応答しなければプール側で起動し直す）
+            options['browser_pool'].release(slot, driver, user_data_dir, options['page_load_strategy'])
+        else:
+            if driver:
                 try:
-                    if len(driver.window_handles) > 1:
-                        driver.close()
-                        driver.switch_to.window(driver.window_handles[0])
-                except Exception as close_error:
-                    logging.warning(f"タブクローズエラー: {str(close_error)}")
-                    # メインタブに強制的に戻る
-                    if driver.window_handles:
-                        driver.switch_to.window(driver.window_handles[0])
+                    driver.quit()
+                    logging.info(f"[worker{worker_id}] WebDriver終了完了")
+                except Exception as e:
+                    logging.error(f"[worker{worker_id}] WebDriver終了エラー: {str(e)}")
+            if user_data_dir:
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+
+def interrupted_result(url_info):
+    """送信ボタンのクリック後に中断され、結果が記録されなかった行の結果（再送信しない）"""
+    return {
+        'index': url_info['index'],
+        'url': url_info['url'],
+        'company': url_info['company'],
+        'status': 'skipped',
+        'error': '要確認: 送信ボタンのクリック後に中断されました（送信済みの可能性があるため再送信しません）',
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def apply_preflight(urls):
+    """URLを事前チェックし (ブラウザで処理する候補, スキップ結果のリスト) を返す"""
+    candidates = []
+    skipped_results = []
+    verdicts = run_preflight([url_info['url'] for url_info in urls])
+    
+    for url_info, verdict in zip(urls, verdicts):
+        if verdict['verdict'] == VERDICT_CANDIDATE:
+            candidates.append(dict(url_info, preflight=verdict['verdict']))
+        else:
+            logging.info(f"事前チェックでスキップ: {url_info['url']} ({verdict['verdict']}: {verdict['reason']})")
+            skipped_results.append({
+                'index': url_info['index'],
+                'url': url_info['url'],
+                'company': url_info['company'],
+                'status': 'skipped',
+                'error': f"事前チェック: {verdict['reason']}",
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'preflight': verdict['verdict']
+            })
+    
+    return candidates, skipped_results
+
+def process_urls(input_filepath, status_dict, callback_func, driver_callback=None, options=None):
+    """メイン処理関数 - ホスト別スケジューラのURLをワーカーごとのブラウザで処理
+
+    options['workers'] で並列ワーカー数を指定（既定は1 = 従来の逐次処理）。
+    options['preflight'] が有効なら、HTTP事前チェックで候補と判定したURLだけをブラウザで処理する。
+    options['resume'] が有効なら、ジャーナルに記録済みの行を飛ばして続きから処理する。
+    結果は1件ごとにジャーナルへ追記し、結果ファイルはジャーナルから組み立てる。
+    """
+    options = resolve_job_options(options)
+    journal = None
+    
+    try:
+        logging.info("=== 自動フォーム送信処理開始 ===")
+        
+        # ファイル読み込み（アップロード時に解析済みならキャッシュから読み込む。対象URLだけを保持する）
+        content_hash = file_content_hash(input_filepath)
+        urls = load_input_dataset(input_filepath, options['dataset_cache'], content_hash)
+        
+        if not urls:
+            return {'success': False, 'error': '処理対象のURLが見つかりません'}
+        
+        status_dict['total_urls'] = len(urls)
+        status_dict['skipped'] = 0
+        logging.info(f"処理対象URL数: {len(urls)}")
+        
+        # 処理結果ジャーナル（再開時は記録済みの行を除外）
+        journal = JobJournal(journal_path_for(input_filepath, content_hash))
+        previous_results = []
+        pending_urls = urls
+        if options['resume']:
+            previous_results = journal.load_results()
+            # 送信ボタンのクリック後に結果を記録できなかった行は、再送信せず要確認として記録する
+            for url_info in journal.load_in_flight():
+                result = interrupted_result(url_info)
+                journal.append(result)
+                previous_results.append(result)
+                logging.warning(f"送信中に中断された行（要確認）: {url_info['index'] + 2}行目 {url_info['url']}")
+            processed_indexes = {result['index'] for result in previous_results}
+            pending_urls = [url_info for url_info in urls if url_info['index'] not in processed_indexes]
+            logging.info(f"ジャーナルから再開: 記録済み{len(previous_results)}件, 残り{len(pending_urls)}件")
+        else:
+            journal.reset()
+        
+        # 重複・送信済み・配信停止のURLを除外
+        contact_index = get_contact_index() if options['dedup'] else None
+        skipped_results = []
+        if contact_index and pending_urls:
+            pending_urls, skipped_results = contact_index.filter_urls(
+                pending_urls, options['contact_window_days']
+            )
+        
+        # ブラウザ起動前のHTTP事前チェック
+        browser_urls = pending_urls
+        if options['preflight'] and pending_urls:
+            logging.info("=== HTTP事前チェック中 ===")
+            browser_urls, preflight_skipped = apply_preflight(pending_urls)
+            skipped_results.extend(preflight_skipped)
+        
+        # 全ワーカーで共有するスケジューラ（同じホストは同時に1件・INTER_URL_INTERVAL秒間隔）
+        scheduler = HostScheduler(browser_urls, INTER_URL_INTERVAL)
+        
+        shared = {
+            'status_dict': status_dict,
+            'callback_func': callback_func,
+            'options': options,
+            'layout_cache': get_form_layout_cache() if options['form_cache'] else None,
+            'journal': journal,
+            'contact_index': contact_index,
+            'command_report': CommandReport() if options['command_stats'] or options['profile'] else None,
+            'results': [],
+            'total': len(urls),
+            'lock': threading.Lock(),
+            'started_workers': 0,
+            'errors': []
+        }
+        
+        for result in previous_results:
+            _record_result(shared, result, persist=False)
+        for result in skipped_results:
+            _record_result(shared, result)
+        if shared['results']:
+            # 再開分・事前チェックでスキップした分を先に反映
+            with shared['lock']:
+                _report_progress(shared, '')
+        
+        workers = min(options['workers'], len(browser_urls))
+        logging.info(f"ワーカー数: {workers}")
+        
+        if workers == 0:
+            logging.info("ブラウザで処理する候補URLがありません")
+        elif workers == 1:
+            _run_worker(0, scheduler, shared, driver_callback)
+        else:
+            threads = []
+            for worker_id in range(workers):
+                thread = threading.Thread(
+                    target=_run_worker,
+                    args=(worker_id, scheduler, shared, driver_callback),
+                    name=f'form-worker-{worker_id}'
+                )
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        
+        if workers and shared['started_workers'] == 0:
+            error = shared['errors'][0] if shared['errors'] else 'ワーカーを起動できませんでした'
+            return {'success': False, 'error': error}
+        
+        # 結果ファイルはジャーナルから組み立てる
+        results = journal.load_results()
+        
+        # フォームレイアウトキャッシュ・ネットワークの集計と保存
+        cache_stats = summarize_form_cache(results)
+        network_stats = summarize_network(results)
+        logging.info(f"ネットワーク集計: {network_stats}")
+        if shared['layout_cache']:
+            shared['layout_cache'].save()
+            logging.info(f"フォームレイアウトキャッシュ: {cache_stats}")
         
         # 結果保存
         name, ext = os.path.splitext(input_filepath)
         output_filepath = f"{name}_result{ext}"
         
+        # WebDriverコマンドの集計・プロファイルを結果ファイルと並べて保存
+        reports = {}
+        if shared['command_report']:
+            reports = shared['command_report'].save(f"{name}_result")
+            logging.info(f"計測レポート: {reports}")
+        
         logging.info("=== 処理結果の保存中 ===")
-        if save_results(df, results, output_filepath):
+        sheet_chunks = iter_input_sheet(input_filepath, options['dataset_cache'], content_hash)
+        if save_results(sheet_chunks, results, output_filepath):
             logging.info(f"結果保存成功: {output_filepath}")
             return {
                 'success': True,
                 'output_file': output_filepath,
                 'total': len(urls),
                 'success_count': status_dict['success'],
-                'failed_count': status_dict['failed']
+                'failed_count': status_dict['failed'],
+                'skipped_count': status_dict['skipped'],
+                'form_cache': cache_stats,
+                'network': network_stats,
+                'reports': reports
             }
         else:
             return {'success': False, 'error': '結果保存に失敗しました'}
@@ -775,9 +1868,5 @@ def process_urls(input_filepath, status_dict, callback_func, driver_callback=Non
     
     finally:
         logging.info("=== 処理終了・リソース解放 ===")
-        if driver:
-            try:
-                driver.quit()
-                logging.info("WebDriver終了完了")
-            except Exception as e:
-                logging.error(f"WebDriver終了エラー: {str(e)}")
\ No newline at end of file
+        if journal:
+            journal.close()
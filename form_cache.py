@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フォームレイアウトキャッシュ
+LOVANTVICTORIA営業支援システム
+
+ドメインとページ指紋（フォーム要素の構成から算出）をキーに、各入力欄・送信ボタン・
+確認ボタンのCSSセレクタをディスクに保存する。次回以降はキャッシュ済みの
+セレクタを1回のスクリプト呼び出しで解決し、全検出を省略する。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# キャッシュファイルの保存先
+FORM_CACHE_PATH = os.path.join('cache', 'form_layouts.json')
+
+# 保持するエントリ数の上限（超えたら最も古く使われたものから削除）
+FORM_CACHE_MAX_ENTRIES = 5000
+
+# エントリの有効期限（秒）
+FORM_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# 何件更新するごとにディスクへ書き出すか
+FORM_CACHE_AUTOSAVE_EVERY = 50
+
+# ページ指紋を計算し、指紋に一致するキャッシュ済みレイアウトがあればセレクタを解決する
+_PROBE_LAYOUT_SCRIPT = """
+var layouts = arguments[0] || {};
+function fnv(str, seed) {
+    var h = seed >>> 0;
+    for (var i = 0; i < str.length; i++) {
+        h ^= str.charCodeAt(i);
+        h = Math.imul(h, 16777619) >>> 0;
+    }
+    return ('0000000' + h.toString(16)).slice(-8);
+}
+function isVisible(el) {
+    var style = window.getComputedStyle(el);
+    return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+function resolve(selector) {
+    try {
+        var el = document.querySelector(selector);
+        return el && isVisible(el) ? el : null;
+    } catch (e) {
+        return null;
+    }
+}
+var controls = document.querySelectorAll('input, textarea, select');
+var parts = [location.pathname];
+for (var i = 0; i < controls.length; i++) {
+    var c = controls[i];
+    parts.push(c.tagName.toLowerCase() + ':' + (c.getAttribute('type') || '') + ':' +
+               (c.getAttribute('name') || '') + ':' + (c.id || ''));
+}
+var signature = parts.join('|');
+var fingerprint = fnv(signature, 2166136261) + fnv(signature, 1540483477);
+var layout = layouts[fingerprint];
+var resolved = null;
+if (layout) {
+    resolved = {fields: {}, submit: null, stale: []};
+    for (var key in layout.fields) {
+        var el = resolve(layout.fields[key]);
+        if (el) { resolved.fields[key] = el; } else { resolved.stale.push(key); }
+    }
+    if (layout.submit) {
+        resolved.submit = resolve(layout.submit);
+        if (!resolved.submit) { resolved.stale.push('submit'); }
+    }
+}
+return {fingerprint: fingerprint, resolved: resolved};
+"""
+
+# 要素ごとに一意なCSSセレクタを生成する（id → name → 要素パスの順）
+_SELECTORS_FOR_ELEMENTS_SCRIPT = """
+function selectorFor(el) {
+    if (el.id) {
+        var byId = '#' + CSS.escape(el.id);
+        if (document.querySelectorAll(byId).length === 1) { return byId; }
+    }
+    var tag = el.tagName.toLowerCase();
+    var name = el.getAttribute('name');
+    if (name) {
+        var byName = tag + '[name="' + CSS.escape(name) + '"]';
+        if (document.querySelectorAll(byName).length === 1) { return byName; }
+    }
+    var path = [];
+    var node = el;
+    while (node && node.nodeType === 1 && node !== document.documentElement) {
+        var index = 1;
+        var sibling = node;
+        while ((sibling = sibling.previousElementSibling)) {
+            if (sibling.tagName === node.tagName) { index++; }
+        }
+        path.unshift(node.tagName.toLowerCase() + ':nth-of-type(' + index + ')');
+        node = node.parentElement;
+    }
+    return 'html > ' + path.join(' > ');
+}
+return arguments[0].map(selectorFor);
+"""
+
+# 単一のセレクタを解決する（表示されていなければnull）
+_RESOLVE_SELECTOR_SCRIPT = """
+try {
+    var el = document.querySelector(arguments[0]);
+    if (!el) { return null; }
+    var style = window.getComputedStyle(el);
+    return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none' ? el : null;
+} catch (e) {
+    return null;
+}
+"""
+
+def url_domain(url):
+    """キャッシュキーに使うドメイン（小文字・www.なし）"""
+    domain = urlparse(url).netloc.lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+class FormLayoutCache:
+    """ドメイン＋ページ指紋をキーにしたLRU/TTL付きのレイアウトキャッシュ"""
+
+    def __init__(self, path=FORM_CACHE_PATH, max_entries=FORM_CACHE_MAX_ENTRIES,
+                 ttl_seconds=FORM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.dirty = 0
+        self.load()
+
+    def load(self):
+        """ディスクからキャッシュを読み込む（期限切れは読み込まない）"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+            now = time.time()
+            with self.lock:
+                for key, entry in stored:
+                    if now - entry['updated_at'] <= self.ttl_seconds:
+                        self.entries[key] = entry
+            logging.info(f"フォームレイアウトキャッシュ読み込み: {len(self.entries)}件")
+        except Exception as e:
+            logging.warning(f"フォームレイアウトキャッシュ読み込みエラー（空で開始）: {str(e)}")
+
+    def save(self):
+        """キャッシュをディスクに書き出す（一時ファイル経由で置き換え）"""
+        try:
+            with self.lock:
+                snapshot = list(self.entries.items())
+                self.dirty = 0
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"フォームレイアウトキャッシュ保存エラー: {str(e)}")
+
+    @staticmethod
+    def make_key(domain, fingerprint):
+        return f"{domain}|{fingerprint}"
+
+    def domain_layouts(self, domain):
+        """ドメインの有効なレイアウトを {指紋: レイアウト} で返す"""
+        prefix = f"{domain}|"
+        now = time.time()
+        layouts = {}
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                entry = self.entries[key]
+                if now - entry['updated_at'] > self.ttl_seconds:
+                    del self.entries[key]
+                    continue
+                layouts[key[len(prefix):]] = entry['layout']
+        return layouts
+
+    def get(self, key):
+        """レイアウトを取得し、最近使ったものとして扱う"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['updated_at'] > self.ttl_seconds:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry['layout']
+
+    def put(self, key, layout):
+        """レイアウトを保存し、上限を超えた古いエントリを削除"""
+        with self.lock:
+            self.entries[key] = {'layout': layout, 'updated_at': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty += 1
+            autosave = self.dirty >= FORM_CACHE_AUTOSAVE_EVERY
+        if autosave:
+            self.save()
+
+    def invalidate(self, key):
+        """古くなったレイアウトを削除"""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.dirty += 1
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_form_layout_cache():
+    """プロセス全体で共有するキャッシュを返す（初回呼び出し時にディスクから読み込む）"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = FormLayoutCache()
+        return _shared_cache
+
+def lookup_cached_layout(driver, cache, url):
+    """現在のページにキャッシュ済みレイアウトを適用する
+
+    戻り値の status は 'hit'（全セレクタ解決）/ 'miss'（未登録）/ 'stale'（解決できず削除）。
+    hit の場合のみ fields と submit に要素が入る。
+    """
+    domain = url_domain(url)
+    probe = driver.execute_script(_PROBE_LAYOUT_SCRIPT, cache.domain_layouts(domain))
+    key = cache.make_key(domain, probe['fingerprint'])
+    resolved = probe['resolved']
+    lookup = {'key': key, 'status': 'miss', 'fields': None, 'submit': None}
+
+    if resolved is None:
+        return lookup
+    if resolved['stale'] or not resolved['fields'] or resolved['submit'] is None:
+        logging.info(f"キャッシュ済みセレクタが無効: {key} ({resolved['stale']})")
+        cache.invalidate(key)
+        lookup['status'] = 'stale'
+        return lookup
+
+    cache.get(key)
+    lookup.update({'status': 'hit', 'fields': resolved['fields'], 'submit': resolved['submit']})
+    logging.info(f"フォームレイアウトキャッシュ適用: {key}")
+    return lookup
+
+def store_layout(driver, cache, key, fields, submit_button):
+    """検出した入力欄と送信ボタンのセレクタをキャッシュに保存"""
+    field_types = list(fields.keys())
+    selectors = driver.execute_script(
+        _SELECTORS_FOR_ELEMENTS_SCRIPT,
+        [fields[field_type] for field_type in field_types] + [submit_button]
+    )
+    layout = {
+        'fields': dict(zip(field_types, selectors[:-1])),
+        'submit': selectors[-1],
+        'confirmation': None
+    }
+    previous = cache.get(key)
+    if previous:
+        layout['confirmation'] = previous.get('confirmation')
+    cache.put(key, layout)
+
+def resolve_cached_confirmation(driver, cache, key):
+    """キャッシュ済みの確認ボタンを解決（なければNone）"""
+    layout = cache.get(key)
+    if not layout or not layout.get('confirmation'):
+        return None
+    return driver.execute_script(_RESOLVE_SELECTOR_SCRIPT, layout['confirmation'])
+
+def store_confirmation(driver, cache, key, button):
+    """確認ボタンのセレクタをレイアウトに追記"""
+    layout = cache.get(key)
+    if not layout:
+        return
+    selector = driver.execute_script(_SELECTORS_FOR_ELEMENTS_SCRIPT, [button])[0]
+    cache.put(key, dict(layout, confirmation=selector))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ホスト別スケジューラ
+LOVANTVICTORIA営業支援システム
+
+ワーカーに渡すURLをホストごとのキューに分け、ホスト間で順番に取り出す。
+同じホストのURLは同時に1件までとし、ホストごとのトークンバケットで
+開始間隔（既定は2秒に1件）を守る。別のホストのURLは待たずに処理できる。
+"""
+
+import time
+import logging
+import threading
+from collections import deque, OrderedDict
+from form_cache import url_domain
+
+# ホストごとに同時に処理するURL数
+PER_HOST_CONCURRENCY = 1
+
+# トークンバケットの容量（連続して開始できる件数）
+HOST_BURST = 1
+
+# 処理可能なURLがないときの最大待機時間（停止要求の確認間隔を兼ねる）
+IDLE_WAIT = 0.5
+
+class _HostState:
+    """1ホスト分の待ち行列とトークンバケット"""
+
+    def __init__(self, burst):
+        self.pending = deque()
+        self.in_flight = 0
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def refill(self, now, rate, burst):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def ready_at(self, now, rate):
+        """次のトークンが貯まる時刻"""
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / rate
+
+class HostScheduler:
+    """ホストごとの同時実行数と開始間隔を守りながら、ホスト間でURLを順に配る"""
+
+    def __init__(self, urls, interval, per_host_concurrency=PER_HOST_CONCURRENCY, burst=HOST_BURST):
+        # interval 秒ごとに1トークン（= 同じホストの開始間隔）
+        self.rate = 1.0 / interval if interval > 0 else float('inf')
+        self.burst = burst
+        self.per_host_concurrency = per_host_concurrency
+        self.hosts = OrderedDict()
+        self.remaining = 0
+        self.condition = threading.Condition()
+        for url_info in urls:
+            self._enqueue(url_info)
+        logging.info(f"ホスト別スケジューラ: {self.remaining}件 / {len(self.hosts)}ホスト")
+
+    def _enqueue(self, url_info, front=False):
+        host = url_domain(url_info['url'])
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = _HostState(self.burst)
+        if front:
+            state.pending.appendleft(url_info)
+        else:
+            state.pending.append(url_info)
+        self.remaining += 1
+
+    def has_pending(self):
+        """まだ配っていないURLがあるか"""
+        with self.condition:
+            return self.remaining > 0
+
+    def acquire(self, should_stop=None):
+        """次に処理するURLを返す（全て配り終えたか、停止要求があればNone）
+
+        どのホストも同時実行数か開始間隔の制限中なら、最も早く空くまで待機する。
+        """
+        with self.condition:
+            while True:
+                if should_stop and should_stop():
+                    return None
+                if self.remaining == 0:
+                    return None
+
+                now = time.time()
+                next_ready = None
+                for host, state in self.hosts.items():
+                    if not state.pending or state.in_flight >= self.per_host_concurrency:
+                        continue
+                    if self.rate != float('inf'):
+                        state.refill(now, self.rate, self.burst)
+                        ready_at = state.ready_at(now, self.rate)
+                        if ready_at > now:
+                            next_ready = ready_at if next_ready is None else min(next_ready, ready_at)
+                            continue
+                        state.tokens -= 1
+                    state.in_flight += 1
+                    self.remaining -= 1
+                    # 取り出したホストは末尾に回し、ホスト間で順番に配る
+                    self.hosts.move_to_end(host)
+                    return state.pending.popleft()
+
+                timeout = IDLE_WAIT if next_ready is None else min(IDLE_WAIT, max(0, next_ready - now))
+                self.condition.wait(timeout)
+
+    def release(self, url_info):
+        """URLの処理が終わったことを通知（同じホストの次のURLを配れるようにする）"""
+        with self.condition:
+            state = self.hosts.get(url_domain(url_info['url']))
+            if state:
+                state.in_flight = max(0, state.in_flight - 1)
+            self.condition.notify_all()
+
+    def requeue(self, url_info):
+        """処理しきれなかったURLを同じホストの先頭に戻す"""
+        with self.condition:
+            self._enqueue(url_info, front=True)
+            self.condition.notify_all()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理結果ジャーナル
+LOVANTVICTORIA営業支援システム
+
+各URLの処理結果を完了時点でSQLiteに追記し、プロセスが落ちても進捗を失わないようにする。
+ジャーナルは入力ファイルの内容ハッシュで識別するため、同じファイルを再アップロードしても
+中断した処理を再開できる。最終的な結果ファイルはジャーナルから組み立てる。
+送信ボタンをクリックする直前には「送信中」を記録し、結果が記録されないまま中断した行は
+再開時に再送信せず、要確認として記録する（同じフォームに二重に送信しないため）。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dataset_cache import file_content_hash
+
+# ジャーナルの保存先フォルダ
+JOURNAL_FOLDER = 'journals'
+
+def journal_path_for(input_filepath, content_hash=None):
+    """入力ファイルに対応するジャーナルのパス（content_hash を渡すと再計算しない）"""
+    content_hash = content_hash or file_content_hash(input_filepath)
+    return os.path.join(JOURNAL_FOLDER, f"{content_hash[:32]}.sqlite3")
+
+class JobJournal:
+    """URLごとの処理結果を追記専用で記録するジャーナル"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL + synchronous=FULL でコミットごとにディスクへ同期
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' row_index INTEGER NOT NULL,'
+            ' url TEXT,'
+            ' status TEXT,'
+            ' recorded_at REAL NOT NULL,'
+            ' payload TEXT NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS in_flight ('
+            ' row_index INTEGER PRIMARY KEY,'
+            ' url TEXT,'
+            ' company TEXT,'
+            ' marked_at REAL NOT NULL)'
+        )
+
+    def append(self, result):
+        """1件の処理結果を追記（その行の「送信中」の記録は同じトランザクションで消す）"""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute(
+                    'INSERT INTO results (row_index, url, status, recorded_at, payload) VALUES (?, ?, ?, ?, ?)',
+                    (int(result['index']), result.get('url'), result.get('status'), time.time(),
+                     json.dumps(result, ensure_ascii=False, default=str))
+                )
+                self.conn.execute('DELETE FROM in_flight WHERE row_index = ?', (int(result['index']),))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def mark_in_flight(self, url_info):
+        """送信ボタンをクリックする直前に「送信中」を記録"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO in_flight (row_index, url, company, marked_at) VALUES (?, ?, ?, ?)',
+                (int(url_info['index']), url_info.get('url'), url_info.get('company'), time.time())
+            )
+
+    def is_in_flight(self, row_index):
+        """その行が「送信中」のまま（クリック後に結果が記録されていない）か"""
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM in_flight WHERE row_index = ?', (int(row_index),)).fetchone()
+        return row is not None
+
+    def load_in_flight(self):
+        """「送信中」のまま結果が記録されていない行を {'index', 'url', 'company'} のリストで返す"""
+        with self.lock:
+            rows = self.conn.execute('SELECT row_index, url, company FROM in_flight ORDER BY row_index').fetchall()
+        return [{'index': row_index, 'url': url, 'company': company} for row_index, url, company in rows]
+
+    def load_results(self):
+        """記録済みの結果を行ごとに最新の1件へまとめて返す（記録順）"""
+        with self.lock:
+            rows = self.conn.execute('SELECT row_index, payload FROM results ORDER BY seq').fetchall()
+        latest = {}
+        for row_index, payload in rows:
+            latest.pop(row_index, None)
+            latest[row_index] = json.loads(payload)
+        return list(latest.values())
+
+    def processed_indexes(self):
+        """記録済みの行インデックスの集合"""
+        with self.lock:
+            rows = self.conn.execute('SELECT DISTINCT row_index FROM results').fetchall()
+        return {row_index for (row_index,) in rows}
+
+    def reset(self):
+        """新規ジョブとして記録を消去"""
+        with self.lock:
+            self.conn.execute('DELETE FROM results')
+            self.conn.execute('DELETE FROM in_flight')
+        logging.info(f"ジャーナルを初期化: {self.path}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョブマネージャー
+LOVANTVICTORIA営業支援システム
+
+アップロードごとの処理をジョブIDで管理する。ジョブはキューに積まれ、
+ブラウザ予算（同時に起動できるChromeの数）の範囲で複数を並行して実行する。
+処理状況・結果・出力ファイルはジョブごとに保持する。
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataset_cache import file_content_hash
+
+# 同時に起動できるChromeの総数（全ジョブのワーカー数の合計）
+BROWSER_BUDGET = int(os.environ.get('FORM_BROWSER_BUDGET', 4))
+
+# 実行待ちとして受け付けるジョブ数の上限
+MAX_QUEUED_JOBS = 10
+
+# 終了したジョブを保持する件数（古いものから破棄）
+MAX_FINISHED_JOBS = 50
+
+# ジョブの状態
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_STOPPED = 'stopped'
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+class JobRejected(Exception):
+    """ジョブを受け付けられない（キュー満杯・同じファイルを処理中など）"""
+
+class Job:
+    """1件のアップロードに対する処理ジョブ"""
+
+    def __init__(self, filepath, options, content_hash):
+        self.id = uuid.uuid4().hex[:12]
+        self.filepath = filepath
+        self.options = dict(options)
+        self.content_hash = content_hash
+        self.workers = int(self.options.get('workers', 1))
+        self.slots = []
+        self.drivers = []
+        self.thread = None
+        # 進捗が変わるたびに増える版数（SSEの待ち合わせに使う）
+        self.version = 0
+        self.changed = threading.Condition()
+        self.status = {
+            'job_id': self.id,
+            'state': JOB_QUEUED,
+            'filename': os.path.basename(filepath),
+            'is_running': False,
+            'current_url': '',
+            'total_urls': 0,
+            'processed': 0,
+            'success': 0,
+            'failed': 0,
+            'skipped': 0,
+            'results': [],
+            'output_file': None,
+            'form_cache': None,
+            'browser_restarts': 0,
+            'browser_respawns': 0,
+            'respawn_causes': {},
+            'respawn_log': [],
+            'network': None,
+            'reports': {},
+            'error': None,
+            'workers': self.workers,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': None,
+            'finished_at': None
+        }
+
+    @property
+    def state(self):
+        return self.status['state']
+
+    def summary(self):
+        """一覧表示用の状態（結果リストを除く）"""
+        return {key: value for key, value in self.status.items() if key != 'results'}
+
+    def snapshot(self, since=0):
+        """状態と since 件目以降の結果を返す（cursor は次回の since に渡す値）
+
+        結果リストは追記のみなので、件数を先に確定させてからその範囲だけを切り出す。
+        """
+        results = self.status['results']
+        cursor = len(results)
+        since = max(0, min(since, cursor))
+        snapshot = self.summary()
+        snapshot.update({'results': results[since:cursor], 'since': since, 'cursor': cursor})
+        return snapshot
+
+    def notify(self):
+        """進捗の変化を待機中のストリームに通知"""
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """版数が version から変わるまで最大 timeout 秒待ち、現在の版数を返す"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+class JobManager:
+    """ジョブをキューに積み、ブラウザ予算の範囲で並行実行する"""
+
+    def __init__(self, run_func, browser_budget=BROWSER_BUDGET, max_queued=MAX_QUEUED_JOBS,
+                 max_finished=MAX_FINISHED_JOBS, browser_pool=None):
+        # run_func(filepath, status_dict, callback_func, driver_callback, options) -> 結果dict
+        self.run_func = run_func
+        self.browser_pool = browser_pool
+        self.browser_budget = max(1, int(browser_budget))
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.pending = deque()
+        self.free_slots = set(range(self.browser_budget))
+        self.lock = threading.Lock()
+
+    def submit(self, filepath, options):
+        """ジョブを登録してキューに積み、ジョブを返す"""
+        options = dict(options)
+        # 1ジョブのワーカー数は予算を超えない
+        options['workers'] = max(1, min(int(options.get('workers', 1)), self.browser_budget))
+        content_hash = file_content_hash(filepath)
+
+        with self.lock:
+            if len(self.pending) >= self.max_queued:
+                raise JobRejected(f'実行待ちのジョブが上限（{self.max_queued}件）に達しています')
+            # 処理記録（ジャーナル）は内容ハッシュ単位なので、同じ内容のファイルは同時に処理しない
+            for other in self.jobs.values():
+                if other.content_hash == content_hash and other.state in ACTIVE_STATES:
+                    raise JobRejected(f'同じ内容のファイルを処理中です（ジョブ {other.id}）')
+
+            job = Job(filepath, options, content_hash)
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self._trim_finished()
+            logging.info(f"ジョブ登録: {job.id} {job.status['filename']} (ワーカー数: {job.workers})")
+
+        self._dispatch()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """登録順のジョブ一覧（結果リストを除く状態）"""
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.summary() for job in jobs]
+
+    def browsers_in_use(self):
+        with self.lock:
+            return self.browser_budget - len(self.free_slots)
+
+    def queue_stats(self):
+        """メトリクス用の集計（状態別のジョブ数・実行待ちのジョブ数・実行中ジョブの未処理URL数）"""
+        with self.lock:
+            jobs = list(self.jobs.values())
+            queued = len(self.pending)
+        states = dict.fromkeys((JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED, JOB_STOPPED), 0)
+        pending_urls = 0
+        for job in jobs:
+            states[job.state] = states.get(job.state, 0) + 1
+            if job.state == JOB_RUNNING:
+                pending_urls += max(0, job.status['total_urls'] - job.status['processed'])
+        return {'states': states, 'queued': queued, 'pending_urls': pending_urls}
+
+    def stop(self, job_id):
+        """ジョブを停止（実行待ちならキューから外す）。対象がなければFalse"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job.state == JOB_QUEUED:
+                self.pending.remove(job)
+                self._finish(job, JOB_STOPPED)
+                logging.info(f"実行待ちジョブを取り消し: {job.id}")
+                return True
+            if job.state != JOB_RUNNING:
+                return True
+            job.status['is_running'] = False
+            drivers = list(job.drivers)
+            thread = job.thread
+
+        logging.info(f"ジョブ停止要求: {job.id}")
+        # WebDriverを強制終了して処理中のURLを中断
+        for driver in drivers:
+            try:
+                logging.info(f"[{job.id}] WebDriverを強制終了中...")
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"[{job.id}] WebDriver終了エラー（無視）: {str(e)}")
+
+        # スレッドの終了を少し待機（最大3秒）
+        if thread and thread.is_alive():
+            thread.join(timeout=3)
+            if thread.is_alive():
+                logging.warning(f"[{job.id}] スレッドが終了しませんでしたが、処理を続行します")
+        return True
+
+    def stop_all(self):
+        with self.lock:
+            job_ids = [job.id for job in self.jobs.values() if job.state in ACTIVE_STATES]
+        for job_id in job_ids:
+            self.stop(job_id)
+
+    def _dispatch(self):
+        """予算に空きがあれば、先頭から順に実行待ちのジョブを開始する"""
+        with self.lock:
+            # 先頭のジョブが入らない間は後続も開始しない（大きいジョブを待たせ続けないため）
+            while self.pending and self.pending[0].workers <= len(self.free_slots):
+                job = self.pending.popleft()
+                job.slots = sorted(self.free_slots)[:job.workers]
+                self.free_slots.difference_update(job.slots)
+                job.status.update({
+                    'state': JOB_RUNNING,
+                    'is_running': True,
+                    'started_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                })
+                job.notify()
+                job.thread = threading.Thread(target=self._run_job, args=(job,), name=f'job-{job.id}')
+                job.thread.daemon = True
+                job.thread.start()
+                logging.info(f"ジョブ開始: {job.id} (ブラウザ枠: {job.slots})")
+
+    def _run_job(self, job):
+        """ジョブを実行し、終了後に予算を返して次のジョブを開始する"""
+        state = JOB_FAILED
+        try:
+            options = dict(job.options, browser_slots=job.slots, browser_pool=self.browser_pool)
+
+            def update_status(current_url, processed, success, failed, total, results):
+                job.status.update({
+                    'current_url': current_url,
+                    'processed': processed,
+                    'success': success,
+                    'failed': failed,
+                    'total_urls': total,
+                    'results': results
+                })
+                job.notify()
+
+            result = self.run_func(job.filepath, job.status, update_status,
+                                   driver_callback=job.drivers.append, options=options)
+
+            job.status['output_file'] = result.get('output_file')
+            job.status['form_cache'] = result.get('form_cache')
+            job.status['network'] = result.get('network')
+            job.status['reports'] = result.get('reports') or {}
+            if not job.status['is_running']:
+                state = JOB_STOPPED
+            elif result.get('success'):
+                state = JOB_COMPLETED
+            else:
+                job.status['error'] = result.get('error')
+            logging.info(f"ジョブ終了: {job.id} 成功={job.status['success']}, 失敗={job.status['failed']}")
+
+        except Exception as e:
+            logging.error(f"ジョブ実行エラー {job.id}: {str(e)}")
+            job.status['error'] = str(e)
+
+        finally:
+            with self.lock:
+                self._finish(job, state)
+                self.free_slots.update(job.slots)
+            self._dispatch()
+
+    def _finish(self, job, state):
+        """ジョブを終了状態にする（ロック取得済みで呼ぶ）"""
+        job.drivers.clear()
+        job.status.update({
+            'state': state,
+            'is_running': False,
+            'current_url': '',
+            'finished_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        job.notify()
+
+    def _trim_finished(self):
+        """古い終了済みジョブを破棄（ロック取得済みで呼ぶ）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.state not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ページ判定用のパターン照合
+LOVANTVICTORIA営業支援システム
+
+成功URL・成功メッセージ・成功タイトル・確認画面・ボタンテキストのパターン表を1か所にまとめ、
+小文字化・重複除去を済ませた照合用の表として保持する。ページの判定は page_source 全体ではなく、
+1回のスクリプト呼び出しで取得するコンパクトな抽出（URL・タイトル・本文の表示テキスト・
+ボタンの値・フォームの送信先）に対して行う。
+"""
+
+# 送信ボタンのテキスト（優先度順）
+SUBMIT_BUTTON_TEXTS = ['送信', 'Submit', '確認', '次へ', 'send', 'contact', 'submit']
+
+# 確認画面のボタンテキスト（優先度順）
+CONFIRMATION_BUTTON_TEXTS = ['送信', '確定', '送る', 'Submit', 'OK', 'はい', 'send', 'confirm']
+
+# 送信成功を示すURLのパターン（ありがとうページ）
+SUCCESS_URL_PATTERNS = ['thanks', 'complete', 'success', 'finish', 'done', 'thankyou', 'sent']
+
+# 送信成功を示す本文のメッセージ
+SUCCESS_MESSAGES = [
+    '送信しました', 'ありがとう', '受け付けました', '完了', '送信完了',
+    'thank you', 'success', 'submitted', 'received', 'sent successfully',
+    'お問い合わせありがとう', 'メッセージを送信', '正常に送信'
+]
+
+# 送信成功を示すタイトルのパターン
+SUCCESS_TITLE_PATTERNS = ['thanks', 'thank you', 'complete', 'success', '完了', 'ありがとう']
+
+# 確認画面を示すパターン（URLとページの抽出テキストで照合）
+CONFIRMATION_PATTERNS = ['確認', 'confirm', 'preview', 'check', '内容確認', 'verification']
+
+# 入力エラーを示す本文のメッセージ（送信前のページになかったものだけを数える）
+VALIDATION_ERROR_MESSAGES = [
+    '入力してください', '入力されていません', '選択してください', '必須項目です', '正しく入力',
+    '入力内容に誤り', '入力に誤り', 'エラーがあります', '不正な値', '形式が正しくありません',
+    'is required', 'please fill', 'please enter', 'is invalid'
+]
+
+# 抽出する本文テキストの上限（文字数）
+PAGE_TEXT_LIMIT = 50000
+
+class PatternTable:
+    """優先度順のパターン表（小文字化・重複除去を済ませておき、照合は小文字化済みのテキストで行う）
+
+    正規表現（選択・トライ構造・先読み）にまとめる方式も計測したが、数KBの抽出テキストでは
+    CPython の部分文字列検索の方が速かったため、パターンを優先度順に検索する
+    （benchmarks/bench_page_matcher.py）。
+    """
+
+    def __init__(self, patterns):
+        entries = {}
+        for position, pattern in enumerate(patterns):
+            entries.setdefault(pattern.lower(), position)
+        # (小文字化したパターン, 元の表での順位) を優先度順に保持
+        self.entries = tuple(entries.items())
+
+    def first(self, text):
+        """text（小文字化済み）に含まれるパターンのうち最も優先度の高いものの順位（なければNone）"""
+        for pattern, position in self.entries:
+            if pattern in text:
+                return position
+        return None
+
+    def search(self, text):
+        """text（小文字化済み）に含まれる最も優先度の高いパターン（なければNone）"""
+        for pattern, _ in self.entries:
+            if pattern in text:
+                return pattern
+        return None
+
+SUBMIT_BUTTONS = PatternTable(SUBMIT_BUTTON_TEXTS)
+CONFIRMATION_BUTTONS = PatternTable(CONFIRMATION_BUTTON_TEXTS)
+SUCCESS_URLS = PatternTable(SUCCESS_URL_PATTERNS)
+SUCCESS_MESSAGE_TABLE = PatternTable(SUCCESS_MESSAGES)
+SUCCESS_TITLES = PatternTable(SUCCESS_TITLE_PATTERNS)
+CONFIRMATION_TABLE = PatternTable(CONFIRMATION_PATTERNS)
+VALIDATION_ERRORS = PatternTable(VALIDATION_ERROR_MESSAGES)
+
+# 判定に使う項目を取得するJavaScriptの関数（他のスクリプトにも埋め込んで使う）
+PAGE_EXTRACT_FUNCTION = """
+function(limit) {
+var controls = [];
+var nodes = document.querySelectorAll('input[type="submit"], input[type="button"], input[type="image"], form');
+for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i];
+    controls.push(el.tagName === 'FORM' ? (el.getAttribute('action') || '') : (el.getAttribute('value') || ''));
+}
+var text = document.body ? (document.body.innerText || '') : '';
+return {
+    url: location.href,
+    title: document.title || '',
+    text: text.length > limit ? text.slice(0, limit) : text,
+    controls: controls.join(' ')
+};
+}
+"""
+
+# 判定に使う項目を1回のスクリプト呼び出しで取得する
+_PAGE_EXTRACT_SCRIPT = f"return ({PAGE_EXTRACT_FUNCTION})(arguments[0]);"
+
+def extract_page(driver, limit=PAGE_TEXT_LIMIT):
+    """判定用のコンパクトな抽出を返す（すべて小文字化済み）"""
+    page = driver.execute_script(_PAGE_EXTRACT_SCRIPT, limit)
+    return normalize_page(page)
+
+def normalize_page(page):
+    """スクリプトが返した抽出を判定用に小文字化する"""
+    return {key: (page.get(key) or '').lower() for key in ('url', 'title', 'text', 'controls')}
+
+def match_success(page):
+    """抽出したページが送信成功を示していれば検出理由を返す（URL → 本文 → タイトルの順）"""
+    position = SUCCESS_URLS.first(page['url'])
+    if position is not None:
+        return f"成功URL検出: {page['url']} (パターン: {SUCCESS_URL_PATTERNS[position]})"
+    position = SUCCESS_MESSAGE_TABLE.first(page['text'])
+    if position is not None:
+        return f"成功メッセージ検出: {SUCCESS_MESSAGES[position]}"
+    if SUCCESS_TITLES.search(page['title']):
+        return f"成功タイトル検出: {page['title']}"
+    return None
+
+def match_confirmation(page):
+    """抽出したページが確認画面らしければ一致したパターンを返す"""
+    for key in ('url', 'title', 'text', 'controls'):
+        pattern = CONFIRMATION_TABLE.search(page[key])
+        if pattern:
+            return pattern
+    return None
+
+def match_validation_error(page, before=None):
+    """抽出したページに入力エラーのメッセージがあれば返す（before のページにもあったものは除く）"""
+    for pattern, _ in VALIDATION_ERRORS.entries:
+        if pattern in page['text'] and not (before and pattern in before['text']):
+            return pattern
+    return None
+
+def classify_page(page):
+    """抽出したページを判定し {'success': 検出理由, 'confirmation': 一致したパターン} を返す"""
+    return {'success': match_success(page), 'confirmation': match_confirmation(page)}
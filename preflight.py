@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP事前チェック
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動する前に全URLを非同期HTTPで並行取得し、BeautifulSoupで解析して
+「到達不可（unreachable）」「フォームなし（no_form）」「候補（candidate）」に分類する。
+Seleniumでの処理は候補のURLだけに絞る。
+"""
+
+import time
+import asyncio
+import logging
+from urllib.parse import urlparse
+import aiohttp
+from bs4 import BeautifulSoup
+
+# 判定結果
+VERDICT_CANDIDATE = 'candidate'
+VERDICT_NO_FORM = 'no_form'
+VERDICT_UNREACHABLE = 'unreachable'
+
+# 全体の同時接続数と、同一ホストへの同時接続数
+PREFLIGHT_CONCURRENCY = 20
+PREFLIGHT_LIMIT_PER_HOST = 2
+
+# 1URLあたりのタイムアウト（秒）と読み込む最大バイト数
+PREFLIGHT_TIMEOUT = 10
+PREFLIGHT_MAX_BYTES = 2 * 1024 * 1024
+
+# ブラウザに近いリクエストヘッダー
+PREFLIGHT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.8,en;q=0.6'
+}
+
+# ボット対策などでHTTPでは判定できないステータス（ブラウザに任せる）
+INCONCLUSIVE_STATUS_CODES = {401, 403, 429, 503}
+
+# これ以下の本文テキスト量でscriptがあれば、JavaScriptで描画されるページとみなす
+SCRIPT_RENDERED_TEXT_LENGTH = 200
+
+def classify_html(html):
+    """HTMLを解析し (判定, 理由) を返す"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    if soup.find('form') or soup.find('textarea'):
+        return VERDICT_CANDIDATE, 'フォームあり'
+
+    visible_inputs = [
+        tag for tag in soup.find_all('input')
+        if (tag.get('type') or 'text').lower() not in ('hidden', 'submit', 'button', 'image')
+    ]
+    if visible_inputs:
+        return VERDICT_CANDIDATE, '入力欄あり'
+
+    if soup.find('iframe'):
+        # 外部フォームサービスの埋め込みはブラウザで確認する
+        return VERDICT_CANDIDATE, 'iframeあり'
+
+    body = soup.body or soup
+    if soup.find('script') and len(body.get_text(strip=True)) < SCRIPT_RENDERED_TEXT_LENGTH:
+        return VERDICT_CANDIDATE, 'JavaScript描画の可能性'
+
+    return VERDICT_NO_FORM, 'フォームなし'
+
+def _is_redirect_to_top(url, final_url):
+    """下層ページからトップページへリダイレクトされたか"""
+    original_path = urlparse(url).path.rstrip('/')
+    final_path = urlparse(final_url).path.rstrip('/')
+    return bool(original_path) and not final_path
+
+async def _read_body(response, limit=PREFLIGHT_MAX_BYTES):
+    """本文を終端か limit バイトまで読み込む
+
+    content.read(n) はバッファ済みの分だけを返すため、チャンク分割された応答では
+    最初のチャンクしか読めないことがある。終端まで繰り返し読み込む。
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return b''.join(chunks)[:limit]
+
+async def _check_url(session, semaphore, url):
+    """1件のURLを取得して判定"""
+    verdict = {
+        'url': url,
+        'verdict': VERDICT_UNREACHABLE,
+        'reason': '',
+        'status_code': None,
+        'final_url': ''
+    }
+    async with semaphore:
+        started = time.time()
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                verdict['status_code'] = response.status
+                verdict['final_url'] = str(response.url)
+
+                if response.status in INCONCLUSIVE_STATUS_CODES:
+                    verdict['verdict'] = VERDICT_CANDIDATE
+                    verdict['reason'] = f'HTTP {response.status}（ブラウザで確認）'
+                elif response.status >= 400:
+                    verdict['reason'] = f'HTTP {response.status}'
+                elif 'html' not in response.headers.get('Content-Type', 'text/html').lower():
+                    verdict['verdict'] = VERDICT_NO_FORM
+                    verdict['reason'] = f"HTMLではありません ({response.headers.get('Content-Type')})"
+                else:
+                    html = await _read_body(response)
+                    verdict['verdict'], verdict['reason'] = classify_html(html)
+                    if (verdict['verdict'] == VERDICT_NO_FORM
+                            and _is_redirect_to_top(url, verdict['final_url'])):
+                        verdict['reason'] = 'トップページへリダイレクト'
+
+        except aiohttp.ClientSSLError as e:
+            # 中間証明書の不足などはChromeでは開けることがあるためブラウザに任せる
+            verdict['verdict'] = VERDICT_CANDIDATE
+            verdict['reason'] = f'SSLエラー（ブラウザで確認）: {e.__class__.__name__}'
+        except asyncio.TimeoutError:
+            verdict['reason'] = 'タイムアウト'
+        except aiohttp.ClientError as e:
+            verdict['reason'] = f'接続エラー: {e.__class__.__name__}'
+        except Exception as e:
+            # 判定できない場合はブラウザに任せる
+            verdict['verdict'] = VERDICT_CANDIDATE
+            verdict['reason'] = f'事前チェックエラー: {str(e)}'
+
+        logging.debug(f"事前チェック {url}: {verdict['verdict']} ({verdict['reason']}) {time.time() - started:.2f}秒")
+    return verdict
+
+async def _run_preflight(urls, concurrency, timeout):
+    """接続プールを共有して全URLを並行チェック"""
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=PREFLIGHT_LIMIT_PER_HOST,
+        ttl_dns_cache=300
+    )
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers=PREFLIGHT_HEADERS) as session:
+        return await asyncio.gather(*(_check_url(session, semaphore, url) for url in urls))
+
+def run_preflight(urls, concurrency=PREFLIGHT_CONCURRENCY, timeout=PREFLIGHT_TIMEOUT):
+    """URLリストを事前チェックし、同じ順序で判定結果のリストを返す"""
+    started = time.time()
+    verdicts = asyncio.run(_run_preflight(urls, concurrency, timeout))
+
+    counts = {}
+    for verdict in verdicts:
+        counts[verdict['verdict']] = counts.get(verdict['verdict'], 0) + 1
+    logging.info(f"事前チェック完了: {len(urls)}件 {time.time() - started:.1f}秒 {counts}")
+    return verdicts
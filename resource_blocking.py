@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ネットワークリソースのブロック
+LOVANTVICTORIA営業支援システム
+
+フォーム処理に不要な画像・フォント・動画・音声と、解析タグやチャットウィジェットなどの
+トラッカーへのリクエストを、Chrome DevTools Protocol（Network.setBlockedURLs）で
+タブごとにブロックする。パフォーマンスログからURLごとのブロック件数・読み込み量を集計し、
+ブロックで節約できたバイト数をリソース種別ごとの平均サイズから推定する。
+"""
+
+import json
+import logging
+
+# 種別ごとにブロックする拡張子
+BLOCKED_EXTENSIONS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'bmp', 'ico', 'svg'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'media': ['mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a', 'mov', 'm3u8']
+}
+
+# ブロックするトラッカー・ウィジェットのドメイン
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'facebook.net', 'connect.facebook.net', 'analytics.twitter.com',
+    'static.ads-twitter.com', 'bat.bing.com', 'clarity.ms', 'hotjar.com', 'mouseflow.com',
+    'yjtag.yahoo.co.jp', 's.yimg.jp', 'b.yjtag.jp', 'ptengine.jp', 'ptengine.com',
+    'widget.intercom.io', 'static.zdassets.com', 'zopim.com', 'embed.tawk.to', 'channel.io',
+    'karte.io', 'tr.line.me', 'cdn.treasuredata.com', 'youtube.com', 'ytimg.com', 'vimeo.com'
+]
+
+# ブロックプロファイル（ジョブオプション blocking_profile で選択）
+BLOCKING_PROFILES = {
+    'none': {'types': [], 'trackers': False},
+    'trackers': {'types': [], 'trackers': True},
+    'standard': {'types': ['image', 'font', 'media'], 'trackers': True}
+}
+
+DEFAULT_BLOCKING_PROFILE = 'standard'
+
+# 節約量の推定に使う種別ごとの平均転送量（バイト）
+AVERAGE_RESOURCE_BYTES = {
+    'Image': 45 * 1024,
+    'Font': 35 * 1024,
+    'Media': 400 * 1024,
+    'Script': 30 * 1024,
+    'XHR': 5 * 1024,
+    'Fetch': 5 * 1024,
+    'Other': 10 * 1024
+}
+
+# setup_chrome_driver で設定するパフォーマンスログ（ネットワークイベントのみ）
+PERFORMANCE_LOG_PREFS = {'performance': 'ALL'}
+PERF_LOGGING_PREFS = {'enableNetwork': True, 'enablePage': False}
+
+def blocked_url_patterns(profile=DEFAULT_BLOCKING_PROFILE):
+    """プロファイルからsetBlockedURLsに渡すパターンのリストを作る（未知のプロファイルは空）"""
+    settings = BLOCKING_PROFILES.get(profile or 'none')
+    if settings is None:
+        logging.warning(f"不明なブロックプロファイル: {profile}（ブロックしません）")
+        return []
+    patterns = []
+    for resource_type in settings['types']:
+        for extension in BLOCKED_EXTENSIONS[resource_type]:
+            # クエリ付きURL（?v=1 など）にも一致させる
+            patterns.extend([f'*.{extension}', f'*.{extension}?*'])
+    if settings['trackers']:
+        for domain in TRACKER_DOMAINS:
+            # ドメイン本体とサブドメインだけに一致させる（notgoogle-analytics.com などには一致させない）
+            patterns.extend([f'*://{domain}/*', f'*://*.{domain}/*'])
+    return patterns
+
+def apply_blocking(driver, patterns):
+    """現在のタブにブロックパターンを設定（タブごとに呼ぶ）"""
+    if not patterns:
+        return False
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        return True
+    except Exception as e:
+        logging.debug(f"リソースブロックの設定に失敗: {str(e)}")
+        return False
+
+def _drain_performance_log(driver):
+    try:
+        return driver.get_log('performance')
+    except Exception as e:
+        logging.debug(f"パフォーマンスログの取得に失敗: {str(e)}")
+        return []
+
+def reset_network_stats(driver):
+    """前のURLまでのネットワークイベントを読み捨てる"""
+    _drain_performance_log(driver)
+
+def collect_network_stats(driver):
+    """前回のリセット以降のネットワーク集計を返す
+
+    blocked_requests: ブロックしたリクエスト数, bytes_saved: ブロックで節約した推定バイト数,
+    requests / bytes_loaded: 実際に読み込んだリクエスト数と転送バイト数
+    """
+    stats = {'blocked_requests': 0, 'bytes_saved': 0, 'requests': 0, 'bytes_loaded': 0}
+    for entry in _drain_performance_log(driver):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+            stats['blocked_requests'] += 1
+            stats['bytes_saved'] += AVERAGE_RESOURCE_BYTES.get(params.get('type'), AVERAGE_RESOURCE_BYTES['Other'])
+        elif method == 'Network.loadingFinished':
+            stats['requests'] += 1
+            stats['bytes_loaded'] += int(params.get('encodedDataLength') or 0)
+    return stats
+
+def summarize_network(results):
+    """結果リストからジョブ全体のネットワーク集計を作る"""
+    totals = {'blocked_requests': 0, 'bytes_saved': 0, 'requests': 0, 'bytes_loaded': 0}
+    for result in results:
+        for key in totals:
+            totals[key] += int(result.get(key) or 0)
+    return totals
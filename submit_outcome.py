@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+送信結果の早期判定
+LOVANTVICTORIA営業支援システム
+
+送信ボタン（確認画面の送信ボタン）のクリック直前に変化検出を仕込み、クリック直後から
+ページ遷移・URL変化・DOM変化・入力エラーの表示を監視する。結果（送信成功・確認画面・
+入力エラー・変化なし）が判明した時点で戻り、判明しなければ上限時間で打ち切る。
+変化の状態とページの抽出は1回のスクリプト呼び出しでまとめて取得する。
+"""
+
+import time
+import logging
+from selenium.common.exceptions import WebDriverException
+
+from page_matcher import (
+    PAGE_EXTRACT_FUNCTION, PAGE_TEXT_LIMIT, normalize_page,
+    match_success, match_confirmation, match_validation_error
+)
+from wait_engine import WAIT_BUDGETS, POLL_INTERVAL, arm_change_detector
+
+# 入力エラーの表示とみなす要素（表示されているものだけを数える）
+VALIDATION_ERROR_SELECTORS = [
+    '[aria-invalid="true"]', '.wpcf7-not-valid-tip', '.wpcf7-not-valid', '.error', '.errors',
+    '.error-message', '.error_message', '.err', '.is-error', '.has-error', '.invalid-feedback',
+    '.field-error', '.form-error', '.mw_wp_form .error', '.hs-error-msgs', '.parsley-errors-list li'
+]
+
+# 判定結果
+OUTCOME_SUCCESS = 'success'                    # 送信成功の表示
+OUTCOME_CONFIRMATION = 'confirmation'          # 確認画面
+OUTCOME_VALIDATION_ERROR = 'validation_error'  # 入力エラー
+OUTCOME_NO_CHANGE = 'no_change'                # クリックしても何も変化しない
+OUTCOME_TIMEOUT = 'timeout'                    # 変化はあったが上限時間内に判定できない
+
+# 変化の状態・入力エラーの表示・ページの抽出を1回で取得するスクリプト
+_OUTCOME_PROBE_SCRIPT = f"""
+var page = ({PAGE_EXTRACT_FUNCTION})(arguments[0]);
+var errors = [];
+var nodes = document.querySelectorAll(arguments[1]);
+for (var i = 0; i < nodes.length && errors.length < 20; i++) {{
+    var el = nodes[i];
+    if (el.getClientRects().length === 0) {{ continue; }}
+    errors.push(((el.innerText || el.getAttribute('name') || el.id || '') + '').trim().slice(0, 80));
+}}
+page.errors = errors;
+page.marker = window.__formAutoMarker === true;
+page.mutations = window.__formAutoMutations || 0;
+page.quiet_ms = window.__formAutoLastMutation ? Date.now() - window.__formAutoLastMutation : 0;
+page.invalid = window.__formAutoInvalid || 0;
+page.pending = window.__formAutoSubmitted === true || window.__formAutoUnloading === true;
+page.ready = document.readyState;
+return page;
+"""
+
+def probe_page(driver, limit=PAGE_TEXT_LIMIT):
+    """変化の状態とページの抽出（page_matcher と同じ小文字化済みの項目）を返す"""
+    state = driver.execute_script(_OUTCOME_PROBE_SCRIPT, limit, ', '.join(VALIDATION_ERROR_SELECTORS))
+    page = normalize_page(state)
+    page.update({key: state.get(key) for key in ('marker', 'mutations', 'quiet_ms', 'invalid', 'pending', 'ready')})
+    page['errors'] = list(state.get('errors') or [])
+    return page
+
+def arm_outcome_detector(driver):
+    """クリック前に変化検出を仕込み、比較用のクリック前のページを返す"""
+    arm_change_detector(driver)
+    return probe_page(driver)
+
+def _outcome(kind, reason, page):
+    return {'kind': kind, 'reason': reason, 'page': page}
+
+def _error_reason(errors):
+    texts = [text for text in errors if text]
+    return f"入力エラー表示: {texts[0]}" if texts else f"入力エラー表示: {len(errors)}件"
+
+def classify_outcome(page, before, quiet_period):
+    """1回の観測から送信結果を判定する（判定できなければNone）
+
+    別のドキュメントに遷移した・URLが変わった場合は、そのページを成功 → 入力エラー →
+    確認画面の順に判定する。ただし確認画面の表示があるページは成功とみなさない
+    （「入力→確認→完了」のステップ表示や「送信完了後…」の案内を含む確認画面があるため）。
+    同じドキュメントのままなら、クリック前になかった表示（成功メッセージ・入力エラー・
+    確認画面）だけを結果とみなす。
+    """
+    success = match_success(page)
+    if not page['marker'] or page['url'] != before['url']:
+        confirmation = match_confirmation(page)
+        if success and not confirmation:
+            return _outcome(OUTCOME_SUCCESS, success, page)
+        if page['errors']:
+            return _outcome(OUTCOME_VALIDATION_ERROR, _error_reason(page['errors']), page)
+        message = match_validation_error(page)
+        if message and not match_validation_error(before):
+            return _outcome(OUTCOME_VALIDATION_ERROR, f"入力エラーメッセージ: {message}", page)
+        if confirmation:
+            return _outcome(OUTCOME_CONFIRMATION, confirmation, page)
+        return None
+
+    if page['invalid']:
+        return _outcome(OUTCOME_VALIDATION_ERROR, f"ブラウザの入力チェック: {page['invalid']}件", page)
+    if not page['mutations']:
+        return None
+    if len(page['errors']) > len(before['errors']):
+        return _outcome(OUTCOME_VALIDATION_ERROR, _error_reason(page['errors'][len(before['errors']):]), page)
+    if success and not match_success(before):
+        return _outcome(OUTCOME_SUCCESS, success, page)
+    message = match_validation_error(page, before)
+    if message:
+        return _outcome(OUTCOME_VALIDATION_ERROR, f"入力エラーメッセージ: {message}", page)
+    # Ajax で差し替わる確認画面は、DOM変化が落ち着いてから判定する
+    if page['quiet_ms'] >= quiet_period * 1000 and not match_confirmation(before):
+        confirmation = match_confirmation(page)
+        if confirmation:
+            return _outcome(OUTCOME_CONFIRMATION, confirmation, page)
+    return None
+
+def _has_changed(page, before):
+    """クリック後に何らかの変化（遷移の開始を含む）があったか"""
+    return (not page['marker'] or page['url'] != before['url'] or page['mutations'] > 0
+            or page['invalid'] > 0 or page['pending'])
+
+def wait_for_outcome(driver, before, timeout, no_change_timeout=None, quiet_period=None):
+    """クリック後の送信結果を判定できるまで待機する
+
+    before は arm_outcome_detector の戻り値。戻り値は {'kind': 判定結果, 'reason': 判定理由,
+    'page': 最後に観測したページ, 'changed': クリック後に変化があったか}。kind は success / confirmation / validation_error /
+    no_change（no_change_timeout 秒間まったく変化がない） / timeout（上限時間内に判定できない）。
+    """
+    if no_change_timeout is None:
+        no_change_timeout = WAIT_BUDGETS['no_change']
+    if quiet_period is None:
+        quiet_period = WAIT_BUDGETS['mutation_quiet']
+    started = time.time()
+    deadline = started + timeout
+    last = before
+    outcome = None
+
+    while True:
+        try:
+            page = probe_page(driver)
+        except WebDriverException:
+            # 遷移中はスクリプトが失敗することがある
+            page = None
+
+        if page is not None:
+            last = page
+            outcome = classify_outcome(page, before, quiet_period)
+            if outcome:
+                break
+            if not _has_changed(page, before) and time.time() - started >= no_change_timeout:
+                outcome = _outcome(OUTCOME_NO_CHANGE, f"{no_change_timeout}秒間ページが変化しません", page)
+                break
+        if time.time() >= deadline:
+            break
+        time.sleep(POLL_INTERVAL)
+
+    if outcome is None:
+        outcome = _outcome(OUTCOME_TIMEOUT, f"{timeout:.0f}秒以内に結果を判定できません", last)
+    outcome['changed'] = last is not before and _has_changed(last, before)
+    logging.debug(f"送信結果の判定: {time.time() - started:.2f}秒 ({outcome['kind']}: {outcome['reason']})")
+    return outcome
+
+def click_and_wait_for_outcome(driver, element, timeout, no_change_timeout=None):
+    """要素をクリックし、送信結果を判定できるまで待機（戻り値は wait_for_outcome と同じ）"""
+    before = arm_outcome_detector(driver)
+    element.click()
+    return wait_for_outcome(driver, before, timeout, no_change_timeout)
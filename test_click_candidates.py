@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+送信ボタン・確認ボタン候補の順位付けのテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、collect_click_candidates と同じ形の属性リストで順位を確認する。
+"""
+
+from form_automation import rank_submit_candidates, rank_confirmation_candidates
+
+def _info(tag, type='', text='', value='', visible=True, enabled=True):
+    """collect_click_candidates が返す1要素分の属性"""
+    return {'tag': tag, 'type': type, 'text': text, 'value': value, 'visible': visible, 'enabled': enabled}
+
+def test_submit_candidates_follow_legacy_order():
+    """submit の input → submit の button → value一致の input → テキスト一致の button → リンクの順"""
+    infos = [
+        _info('a', text='送信'),
+        _info('button', text='確認画面へ'),
+        _info('input', type='button', value='送信する'),
+        _info('button', type='submit', text='Go'),
+        _info('input', type='submit', value='Go')
+    ]
+
+    assert rank_submit_candidates(infos) == [4, 3, 2, 1, 0]
+
+def test_submit_text_priority_then_document_order():
+    """同じ種類の中では SUBMIT_BUTTON_TEXTS の順、同順位は文書順（大文字小文字・前後の空白は無視）"""
+    infos = [
+        _info('button', text='次へ'),
+        _info('button', text='  SUBMIT  '),
+        _info('button', text='送信する'),
+        _info('button', text='送信'),
+        _info('button', text='戻る')
+    ]
+
+    assert rank_submit_candidates(infos) == [2, 3, 1, 0]
+
+def test_submit_skips_hidden_and_disabled():
+    """非表示の候補と、無効な input / button は除外する"""
+    infos = [
+        _info('input', type='submit', value='送信', visible=False),
+        _info('input', type='submit', value='送信', enabled=False),
+        _info('button', type='submit', text='送信', enabled=False),
+        _info('a', text='Contact us')
+    ]
+
+    assert rank_submit_candidates(infos) == [3]
+
+def test_confirmation_submit_first_then_text_priority():
+    """type="submit" を最優先し、以降はテキストの優先順 → button / input / リンクの順"""
+    infos = [
+        _info('a', text='送信'),
+        _info('input', type='button', value='送信'),
+        _info('button', type='button', text='確定する'),
+        _info('button', type='button', text='送信'),
+        _info('input', type='submit', value='送信'),
+        _info('button', type='button', text='戻る')
+    ]
+
+    assert rank_confirmation_candidates(infos) == [4, 3, 1, 0, 2]
+
+def test_confirmation_skips_hidden_disabled_and_unmatched():
+    """非表示・無効の候補と、どのテキストにも一致しない候補は除外する"""
+    infos = [
+        _info('button', type='submit', text='送信', visible=False),
+        _info('button', type='button', text='送信', enabled=False),
+        _info('input', type='image', value='送信'),
+        _info('a', text='トップへ戻る'),
+        _info('a', text='OK')
+    ]
+
+    assert rank_confirmation_candidates(infos) == [4]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+連絡履歴インデックスのテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+import time
+
+from contact_index import ContactIndex, registrable_domain, normalize_url, KIND_URL, KIND_DOMAIN
+
+def test_registrable_domain_uses_public_suffix_list():
+    """公開サフィックスリスト（私的サフィックスを含む）で登録ドメインを判定する"""
+    assert registrable_domain('https://contact.example.co.jp/form/') == 'example.co.jp'
+    assert registrable_domain('https://www.example.com/contact') == 'example.com'
+    assert registrable_domain('https://foo.github.io/contact/') == 'foo.github.io'
+    assert registrable_domain('https://x.city.chiyoda.tokyo.jp/') == 'city.chiyoda.tokyo.jp'
+    assert registrable_domain('http://127.0.0.1:8080/contact/') == '127.0.0.1'
+
+def test_normalize_url_ignores_cosmetic_differences():
+    """スキーム・www.・既定ポート・フラグメント・末尾のスラッシュ・トラッキング用パラメータの違いを無視する"""
+    expected = 'example.co.jp/contact?a=1&b=2'
+    assert normalize_url('https://www.Example.co.jp:443/contact/?b=2&a=1&utm_source=mail#form') == expected
+    assert normalize_url('http://example.co.jp/contact?a=1&gclid=xyz&b=2') == expected
+    assert normalize_url('example.co.jp/contact?b=2&a=1') == expected
+    assert normalize_url('http://example.co.jp:8080/contact') == 'example.co.jp:8080/contact'
+
+def _urls(*urls):
+    return [{'index': i, 'url': url, 'company': f'会社{i}'} for i, url in enumerate(urls)]
+
+def test_shared_hosts_are_deduplicated_by_url(tmp_path):
+    """フォーム作成サービスでは、送信済みのフォーム以外の会社を除外しない"""
+    index = ContactIndex(str(tmp_path / 'contact_index.sqlite3'))
+    try:
+        for url in ('https://form.run/@company-a', 'https://share.hsforms.com/1abc',
+                    'https://forms.office.com/r/aaa', 'https://tayori.com/form/aaa',
+                    'https://www.formzu.net/fgen.ex?ID=P1', 'https://form.jotform.com/111',
+                    'https://foo.github.io/contact/', 'https://www.company-owned.co.jp/contact/'):
+            index.record({'url': url, 'status': 'success'})
+
+        kept, skipped = index.filter_urls(_urls(
+            'https://form.run/@company-b',
+            'https://share.hsforms.com/2def',
+            'https://forms.office.com/r/bbb',
+            'https://tayori.com/form/bbb',
+            'https://www.formzu.net/fgen.ex?ID=P2',
+            'https://form.jotform.com/222',
+            'https://bar.github.io/contact/',
+            'https://form.run/@company-a',
+            'https://recruit.company-owned.co.jp/entry/'
+        ))
+    finally:
+        index.close()
+
+    assert [url_info['index'] for url_info in kept] == [0, 1, 2, 3, 4, 5, 6]
+    assert [result['index'] for result in skipped] == [7, 8]
+
+def _index(tmp_path):
+    return ContactIndex(str(tmp_path / 'contact_index.sqlite3'))
+
+def test_duplicates_within_file_are_skipped(tmp_path):
+    """ファイル内で正規化URLが同じ2件目以降は、最初の行を示してスキップする"""
+    index = _index(tmp_path)
+    try:
+        kept, skipped = index.filter_urls(_urls(
+            'https://www.example.com/contact/', 'http://example.com/contact?utm_medium=mail', 'https://example.com/about/'
+        ))
+    finally:
+        index.close()
+
+    assert [url_info['index'] for url_info in kept] == [0, 2]
+    assert [(result['index'], result['error']) for result in skipped] == [(1, '重複: 2行目と同じURL')]
+
+def test_suppressions_by_url_and_domain(tmp_path):
+    """配信停止リストのURLとドメイン（サブドメインを含む）はスキップし、削除すれば処理する"""
+    index = _index(tmp_path)
+    try:
+        domain = index.add_suppression('https://recruit.optout.co.jp/', KIND_DOMAIN, '配信停止の依頼')
+        index.add_suppression('https://www.example.com/contact/', KIND_URL)
+        urls = _urls('https://www.optout.co.jp/contact/', 'https://example.com/contact', 'https://example.com/form/')
+
+        kept, skipped = index.filter_urls(urls)
+        assert [url_info['index'] for url_info in kept] == [2]
+        assert [result['error'] for result in skipped] == [
+            '配信停止リスト（optout.co.jp: 配信停止の依頼）', '配信停止リスト（URL）'
+        ]
+
+        assert domain == 'optout.co.jp'
+        assert index.remove_suppression(domain)
+        kept, skipped = index.filter_urls(urls)
+        assert [url_info['index'] for url_info in kept] == [0, 2]
+    finally:
+        index.close()
+
+def test_contact_window(tmp_path):
+    """期間内に送信成功したURL・ドメインだけをスキップする（失敗・期間外・期間0は対象外）"""
+    index = _index(tmp_path)
+    try:
+        index.record({'url': 'https://www.sent.co.jp/contact/', 'status': 'success'})
+        index.record({'url': 'https://failed.co.jp/contact/', 'status': 'failed'})
+        index.record({'url': 'https://old.co.jp/contact/', 'status': 'success'})
+        index.conn.execute('UPDATE contacts SET last_success_at = ? WHERE domain = ?',
+                           (time.time() - 100 * 24 * 60 * 60, 'old.co.jp'))
+        urls = _urls('https://sent.co.jp/contact', 'https://sent.co.jp/other-form/',
+                     'https://failed.co.jp/contact/', 'https://old.co.jp/contact/')
+
+        kept, skipped = index.filter_urls(urls, window_days=90)
+        assert [url_info['index'] for url_info in kept] == [2, 3]
+        assert [result['error'].split(':')[0] for result in skipped] == ['送信済み', '送信済み（sent.co.jp）']
+
+        kept, skipped = index.filter_urls(urls, window_days=0)
+        assert len(kept) == 4 and skipped == []
+    finally:
+        index.close()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析済みデータセットキャッシュのテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import dataset_cache
+from dataset_cache import load_dataset, iter_cached_sheet, cached_metadata, file_content_hash
+from form_automation import parse_input_file, iter_url_records
+
+@pytest.fixture
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / 'cache'
+    monkeypatch.setattr(dataset_cache, 'DATASET_CACHE_FOLDER', str(folder))
+    return folder
+
+def _counting_parser(calls, chunksize=2):
+    """parse_input_file を小さなチャンクで呼び、呼ばれた回数を数える"""
+    def parse(filepath, on_chunk):
+        calls.append(filepath)
+        return list(iter_url_records(filepath, chunksize=chunksize, on_chunk=on_chunk))
+    return parse
+
+def _write_csv(path, rows):
+    pd.DataFrame(rows, columns=['company', 'contact_url', 'zip']).to_csv(path, index=False, encoding='cp932')
+
+ROWS = [
+    ['会社A', 'http://a.example/', '00123'],
+    ['会社B', '', '1000001'],
+    [None, 'http://c.example/', ''],
+    ['会社D', 'http://d.example/', '5300001'],
+    ['会社E', 'なし', '']
+]
+
+def test_round_trip_hits_cache_until_content_changes(tmp_path, cache_folder):
+    """2回目はキャッシュから読み（解析しない）、内容が変われば解析し直す"""
+    path = str(tmp_path / 'list.csv')
+    _write_csv(path, ROWS)
+    calls = []
+
+    urls = load_dataset(path, _counting_parser(calls))
+    cached_urls = load_dataset(path, _counting_parser(calls))
+
+    assert len(calls) == 1
+    assert cached_urls == urls == parse_input_file(path)
+    assert [url_info['index'] for url_info in urls] == [0, 2, 3]
+    meta = cached_metadata(file_content_hash(path))
+    assert (meta['rows'], meta['url_count'], meta['parts']) == (5, 3, 3)
+
+    chunks = list(iter_cached_sheet(file_content_hash(path)))
+    sheet = pd.concat(chunks)
+    assert sheet.index.tolist() == [0, 1, 2, 3, 4]
+    assert sheet['zip'].tolist() == ['00123', '1000001', '', '5300001', '']
+
+    _write_csv(path, ROWS + [['会社F', 'http://f.example/', '']])
+    changed_urls = load_dataset(path, _counting_parser(calls))
+
+    assert len(calls) == 2
+    assert [url_info['index'] for url_info in changed_urls] == [0, 2, 3, 5]
+
+def test_legacy_single_file_cache_is_rebuilt(tmp_path, cache_folder):
+    """シートを1ファイルで保存していた旧形式のキャッシュは使わずに作り直す"""
+    path = str(tmp_path / 'list.csv')
+    _write_csv(path, ROWS)
+    key = file_content_hash(path)
+    legacy_dir = cache_folder / key[:32]
+    legacy_dir.mkdir(parents=True)
+    (legacy_dir / 'meta.json').write_text(json.dumps({'rows': 5, 'url_count': 3}), encoding='utf-8')
+    calls = []
+
+    assert cached_metadata(key) is None
+    load_dataset(path, _counting_parser(calls))
+
+    assert len(calls) == 1
+    assert cached_metadata(key)['parts'] == 3
+
+def test_failed_parse_leaves_no_cache(tmp_path, cache_folder):
+    """解析に失敗したら書きかけのキャッシュを残さない"""
+    path = str(tmp_path / 'no_url.csv')
+    pd.DataFrame({'company': ['会社A'], 'name': ['山田']}).to_csv(path, index=False)
+
+    with pytest.raises(ValueError):
+        load_dataset(path, _counting_parser([]))
+
+    assert cached_metadata(file_content_hash(path)) is None
+    assert not cache_folder.exists() or os.listdir(cache_folder) == []
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フォーム入力欄のスナップショット分類のテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、snapshot_form_fields と同じ形の属性リストを classify_form_fields に渡す。
+"""
+
+from form_automation import classify_form_fields
+
+def _info(tag='input', type='text', name='', id='', placeholder='', label='',
+          visible=True, disabled=False, readonly=False):
+    """snapshot_form_fields が返す1要素分の属性"""
+    return {'tag': tag, 'type': type, 'name': name, 'id': id, 'placeholder': placeholder, 'label': label,
+            'visible': visible, 'disabled': disabled, 'readonly': readonly}
+
+def test_contact_form_7_fields():
+    """Contact Form 7 の標準的なフォームを name 属性で分類する"""
+    infos = [
+        _info(type='hidden', name='_wpcf7'),
+        _info(name='your-name'),
+        _info(name='your-company'),
+        _info(type='email', name='your-email'),
+        _info(type='tel', name='your-tel'),
+        _info(tag='select', name='your-subject'),
+        _info(tag='textarea', type='', name='your-message'),
+        _info(type='submit', name='submit')
+    ]
+
+    assert classify_form_fields(infos) == {'name': 1, 'company': 2, 'email': 3, 'phone': 4, 'message': 6}
+
+def test_label_only_japanese_form():
+    """name 属性が意味を持たないフォームはラベルのテキストで分類する"""
+    infos = [
+        _info(name='f1', label='お名前'),
+        _info(name='f2', label='会社名'),
+        _info(name='f3', label='メールアドレス'),
+        _info(name='f4', label='電話番号'),
+        _info(tag='textarea', type='', name='f5', label='お問い合わせ内容')
+    ]
+
+    assert classify_form_fields(infos) == {'name': 0, 'company': 1, 'email': 2, 'phone': 3, 'message': 4}
+
+def test_attribute_priority_before_document_order():
+    """属性は name → id → placeholder → label の順で、先にある要素より優先度の高い属性の一致を採る"""
+    infos = [
+        _info(name='field-1', label='お名前'),
+        _info(name='field-2', placeholder='山田太郎', id='fullname'),
+        _info(name='name_kana')
+    ]
+
+    assert classify_form_fields(infos)['name'] == 2
+
+def test_unusable_and_assigned_elements_are_skipped():
+    """非表示・無効・読み取り専用・テキスト以外の入力と、割り当て済みの要素は対象外"""
+    infos = [
+        _info(type='hidden', name='name'),
+        _info(name='name', visible=False),
+        _info(name='name', disabled=True),
+        _info(name='name', readonly=True),
+        _info(type='checkbox', name='name'),
+        _info(name='company-name'),
+        _info(name='corp'),
+        _info(name='message')
+    ]
+
+    assigned = classify_form_fields(infos)
+
+    assert assigned['name'] == 5
+    assert assigned['company'] == 6
+    assert assigned['message'] == 7
+    assert 'email' not in assigned
+
+def test_textarea_is_assigned_only_to_message():
+    """textarea はメッセージ欄にだけ割り当てる（name 属性が 'name' でも名前欄にしない）"""
+    infos = [_info(tag='textarea', type='', name='name'), _info(tag='textarea', type='', name='comment')]
+
+    assert classify_form_fields(infos) == {'message': 1}
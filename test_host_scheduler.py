@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ホスト別スケジューラのテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+import time
+import threading
+
+import pytest
+
+import host_scheduler
+from host_scheduler import HostScheduler
+
+@pytest.fixture(autouse=True)
+def short_idle_wait(monkeypatch):
+    monkeypatch.setattr(host_scheduler, 'IDLE_WAIT', 0.01)
+
+def _urls(*urls):
+    return [{'index': i, 'url': url, 'company': f'会社{i}'} for i, url in enumerate(urls)]
+
+def _stop_after(checks):
+    """checks 回目の確認で停止を要求する should_stop"""
+    calls = []
+    def should_stop():
+        calls.append(None)
+        return len(calls) >= checks
+    return should_stop
+
+def test_round_robin_with_one_url_per_host_in_flight():
+    """ホスト間で順番に配り、同じホストの次のURLは処理が終わるまで配らない"""
+    scheduler = HostScheduler(_urls(
+        'http://a.example/1', 'http://a.example/2', 'http://b.example/1', 'http://c.example/1'
+    ), 0)
+
+    first = [scheduler.acquire()['url'] for _ in range(3)]
+    blocked = scheduler.acquire(_stop_after(3))
+    scheduler.release({'url': 'http://a.example/1'})
+    last = scheduler.acquire()
+
+    assert first == ['http://a.example/1', 'http://b.example/1', 'http://c.example/1']
+    assert blocked is None
+    assert last['url'] == 'http://a.example/2'
+    assert not scheduler.has_pending()
+    assert scheduler.acquire() is None
+
+def test_interval_between_urls_on_same_host():
+    """同じホストは開始間隔を空け、その間も別のホストのURLは待たずに配る"""
+    interval = 0.3
+    scheduler = HostScheduler(_urls('http://a.example/1', 'http://a.example/2', 'http://b.example/1'), interval)
+
+    started = time.time()
+    first = scheduler.acquire()
+    scheduler.release(first)
+    second = scheduler.acquire()
+    second_at = time.time() - started
+    scheduler.release(second)
+    third = scheduler.acquire()
+    third_at = time.time() - started
+
+    assert [first['url'], second['url'], third['url']] == [
+        'http://a.example/1', 'http://b.example/1', 'http://a.example/2'
+    ]
+    assert second_at < interval / 2
+    assert third_at >= interval * 0.9
+
+def test_requeue_puts_url_back_at_front_of_its_host():
+    """処理しきれなかったURLは同じホストの先頭に戻り、次に配られる"""
+    scheduler = HostScheduler(_urls('http://a.example/1', 'http://a.example/2'), 0)
+
+    first = scheduler.acquire()
+    scheduler.requeue(dict(first, session_retries=1))
+    scheduler.release(first)
+
+    assert scheduler.acquire() == dict(first, session_retries=1)
+
+def test_waiting_worker_wakes_on_release():
+    """他のワーカーの処理終了で、待機中のワーカーがすぐに次のURLを受け取る"""
+    scheduler = HostScheduler(_urls('http://a.example/1', 'http://a.example/2'), 0)
+    first = scheduler.acquire()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(scheduler.acquire()))
+    waiter.start()
+
+    time.sleep(0.05)
+    assert received == []
+    scheduler.release(first)
+    waiter.join(1)
+
+    assert [url_info['url'] for url_info in received] == ['http://a.example/2']
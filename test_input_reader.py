@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入力ファイルのストリーミング読み込みのテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+import openpyxl
+import pandas as pd
+
+from form_automation import iter_url_records, iter_sheet_chunks, sniff_encoding
+
+CSV_TEXT = 'company,contact_url,備考\n株式会社テスト,https://example.co.jp/contact/,①機種依存文字\n髙橋商店,なし,\n'
+
+def test_sniff_shift_jis_csv_as_cp932(tmp_path):
+    """Shift_JIS（機種依存文字を含むCP932）のCSVを cp932 と判定して読む"""
+    path = tmp_path / 'sjis.csv'
+    path.write_bytes(CSV_TEXT.encode('cp932'))
+
+    stats = {}
+    records = list(iter_url_records(str(path), stats))
+
+    assert sniff_encoding(str(path)) == 'cp932'
+    assert records == [{'index': 0, 'url': 'https://example.co.jp/contact/', 'company': '株式会社テスト'}]
+    assert stats == {'total_rows': 2, 'url_column': 'contact_url'}
+    assert next(iter_sheet_chunks(str(path)))['備考'].tolist() == ['①機種依存文字', '']
+
+def test_sniff_utf8_bom_csv(tmp_path):
+    """BOM付きUTF-8のCSVは BOM を列名に残さずに読む"""
+    path = tmp_path / 'bom.csv'
+    path.write_bytes(CSV_TEXT.encode('utf-8-sig'))
+
+    assert sniff_encoding(str(path)) == 'utf-8-sig'
+    assert list(next(iter_sheet_chunks(str(path))).columns) == ['company', 'contact_url', '備考']
+    assert [record['company'] for record in iter_url_records(str(path))] == ['株式会社テスト']
+
+def test_sniff_utf8_with_multibyte_char_cut_at_prefix_end(tmp_path):
+    """判定に使う先頭バイトの末尾でマルチバイト文字が途切れても UTF-8 と判定する"""
+    path = tmp_path / 'utf8.csv'
+    path.write_bytes(CSV_TEXT.encode('utf-8'))
+    cut = CSV_TEXT.encode('utf-8').index('株'.encode('utf-8')) + 1
+
+    assert sniff_encoding(str(path), sniff_bytes=cut) == 'utf-8'
+
+def test_iter_url_records_keeps_row_numbers_across_chunks(tmp_path):
+    """チャンクに分けて読んでも行番号（index）は通し番号のまま"""
+    path = tmp_path / 'many.csv'
+    lines = ['company,url'] + [f'会社{i},' + (f'http://h{i}.example/' if i % 3 == 0 else '') for i in range(10)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    stats = {}
+    chunks = []
+    records = list(iter_url_records(str(path), stats, chunksize=4, on_chunk=chunks.append))
+
+    assert [record['index'] for record in records] == [0, 3, 6, 9]
+    assert [record['company'] for record in records] == ['会社0', '会社3', '会社6', '会社9']
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert chunks[-1].index.tolist() == [8, 9]
+    assert stats['total_rows'] == 10
+
+def _write_xlsx(path, rows):
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+def test_excel_duplicate_headers_are_mangled_like_read_excel(tmp_path):
+    """重複した見出しは pd.read_excel と同じ name, name.1 に付け替え、URL列を1列として読む"""
+    path = str(tmp_path / 'duplicate.xlsx')
+    _write_xlsx(path, [
+        ['url', '会社名', 'url', None, 'url.1'],
+        ['http://a.example/', '会社A', 'http://other.example/', 'x', 'y'],
+        ['なし', '会社B', '', None, None]
+    ])
+
+    chunk = next(iter_sheet_chunks(path))
+    stats = {}
+    records = list(iter_url_records(path, stats))
+
+    assert list(chunk.columns) == [str(column) for column in pd.read_excel(path).columns]
+    assert list(chunk.columns) == ['url', '会社名', 'url.2', 'Unnamed: 3', 'url.1']
+    assert records == [{'index': 0, 'url': 'http://a.example/', 'company': '会社A'}]
+    assert stats == {'total_rows': 2, 'url_column': 'url'}
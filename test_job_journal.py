@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理結果ジャーナルと再開のテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、処理関数を差し替えて process_urls の再開を確認する。
+"""
+
+import form_automation
+import job_journal
+from job_journal import JobJournal
+
+def test_result_clears_in_flight_mark(tmp_path):
+    """「送信中」の記録は、その行の結果を追記すると消え、初期化でも消える"""
+    journal = JobJournal(str(tmp_path / 'journal.sqlite3'))
+    try:
+        journal.mark_in_flight({'index': 3, 'url': 'http://a.example/', 'company': '会社A'})
+        journal.mark_in_flight({'index': 5, 'url': 'http://b.example/', 'company': '会社B'})
+        journal.append({'index': 3, 'url': 'http://a.example/', 'status': 'success'})
+
+        assert not journal.is_in_flight(3)
+        assert journal.is_in_flight(5)
+        assert journal.load_in_flight() == [{'index': 5, 'url': 'http://b.example/', 'company': '会社B'}]
+
+        journal.reset()
+        assert journal.load_in_flight() == [] and journal.load_results() == []
+    finally:
+        journal.close()
+
+class Driver:
+    current_window_handle = 'main'
+    window_handles = ['main']
+
+    def quit(self):
+        pass
+
+def test_resume_flags_rows_stopped_after_submit_click(monkeypatch, tmp_path):
+    """停止がクリック後・記録前に届いた行は、再開時に再送信せず要確認として記録する"""
+    monkeypatch.setattr(job_journal, 'JOURNAL_FOLDER', str(tmp_path / 'journals'))
+    monkeypatch.setattr(form_automation, 'launch_browser', lambda slot, page_load_strategy='eager': (Driver(), None))
+    input_path = tmp_path / 'list.csv'
+    input_path.write_text('company,url\n会社A,http://a.example/form\n会社B,http://b.example/form\n', encoding='utf-8')
+    options = {'workers': 1, 'dedup': False, 'preflight': False, 'dataset_cache': False, 'form_cache': False,
+               'restart_after_urls': 0, 'renderer_rss_limit_mb': 0}
+    calls = []
+    status_dict = {}
+
+    def process_url(driver, url_info, options=None, layout_cache=None, lifecycle=None, journal=None):
+        calls.append(url_info['url'])
+        result = {'index': url_info['index'], 'url': url_info['url'], 'company': url_info['company'],
+                  'status': 'success', 'error': '送信成功', 'timestamp': ''}
+        if url_info['index'] == 0:
+            # クリック直前に「送信中」を記録した後、JobManager.stop が driver.quit() した状態
+            journal.mark_in_flight(url_info)
+            status_dict['is_running'] = False
+            result.update(status='failed', error='エラー: invalid session id')
+        return result
+
+    monkeypatch.setattr(form_automation, 'process_url_in_new_tab', process_url)
+    for resume in (False, True):
+        status_dict.update({'is_running': True, 'success': 0, 'failed': 0, 'processed': 0, 'current_url': ''})
+        result = form_automation.process_urls(str(input_path), status_dict, lambda *args: None,
+                                              options=dict(options, resume=resume))
+
+    assert calls == ['http://a.example/form', 'http://b.example/form']
+    assert result['success'] and (result['success_count'], result['skipped_count']) == (1, 1)
+    lines = (tmp_path / 'list_result.csv').read_text(encoding='utf-8-sig').splitlines()
+    assert lines[1].startswith('会社A,http://a.example/form,skipped,要確認: 送信ボタンのクリック後に中断されました')
+    assert lines[2].startswith('会社B,http://b.example/form,success')
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョブマネージャーのテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、終了のタイミングをテスト側で決められる処理関数でジョブを実行する。
+"""
+
+import threading
+
+import pytest
+
+from job_manager import (
+    JobManager, JobRejected, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_STOPPED
+)
+
+class FakeDriver:
+    """quit されると処理関数の待機を解除するWebDriver"""
+
+    def __init__(self, release):
+        self.release = release
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+        self.release.set()
+
+class FakeRun:
+    """release[filepath] がセットされるまで終わらない処理関数"""
+
+    def __init__(self):
+        self.release = {}
+        self.options = {}
+        self.drivers = {}
+
+    def __call__(self, filepath, status_dict, callback_func, driver_callback=None, options=None):
+        self.options[filepath] = options
+        self.drivers[filepath] = FakeDriver(self.release[filepath])
+        driver_callback(self.drivers[filepath])
+        callback_func('', 1, 1, 0, 1, [{'index': 0, 'status': 'success'}])
+        self.release[filepath].wait(5)
+        return {'success': True, 'output_file': f'{filepath}_result'}
+
+@pytest.fixture
+def run():
+    return FakeRun()
+
+def _upload(tmp_path, run, name, content=None):
+    path = tmp_path / name
+    path.write_text(content or f'company,url\n{name},http://{name}.example/\n', encoding='utf-8')
+    run.release[str(path)] = threading.Event()
+    return str(path)
+
+def _finish(run, job):
+    run.release[job.filepath].set()
+    job.thread.join(5)
+
+def test_duplicate_content_is_rejected_while_active(tmp_path, run):
+    """同じ内容のファイルは、先のジョブが終わるまで受け付けない（ファイル名が違っても）"""
+    manager = JobManager(run, browser_budget=2)
+    first = manager.submit(_upload(tmp_path, run, 'a.csv', 'company,url\nA,http://a.example/\n'), {})
+    copy = _upload(tmp_path, run, 'a_copy.csv', 'company,url\nA,http://a.example/\n')
+
+    with pytest.raises(JobRejected):
+        manager.submit(copy, {})
+
+    _finish(run, first)
+    second = manager.submit(copy, {})
+    _finish(run, second)
+
+    assert first.state == second.state == JOB_COMPLETED
+    assert first.status['output_file'] == f'{first.filepath}_result'
+    assert first.status['results'] == [{'index': 0, 'status': 'success'}]
+
+def test_slots_are_dispatched_in_order_and_released(tmp_path, run):
+    """ブラウザ枠は登録順に割り当て、先頭のジョブが入らない間は後続も待たせる"""
+    manager = JobManager(run, browser_budget=3)
+    big = manager.submit(_upload(tmp_path, run, 'big.csv'), {'workers': 2})
+    waiting = manager.submit(_upload(tmp_path, run, 'waiting.csv'), {'workers': 2})
+    small = manager.submit(_upload(tmp_path, run, 'small.csv'), {'workers': 1})
+
+    assert (big.state, big.slots) == (JOB_RUNNING, [0, 1])
+    assert waiting.state == small.state == JOB_QUEUED
+    assert manager.browsers_in_use() == 2
+    assert run.options[big.filepath]['browser_slots'] == [0, 1]
+
+    _finish(run, big)
+
+    assert (waiting.state, waiting.slots) == (JOB_RUNNING, [0, 1])
+    assert (small.state, small.slots) == (JOB_RUNNING, [2])
+    assert manager.browsers_in_use() == 3
+
+    _finish(run, waiting)
+    _finish(run, small)
+
+    assert manager.browsers_in_use() == 0
+    assert manager.queue_stats()['states'][JOB_COMPLETED] == 3
+
+def test_workers_are_capped_by_budget_and_queue_is_bounded(tmp_path, run):
+    """1ジョブのワーカー数は予算を超えず、実行待ちは上限を超えて受け付けない"""
+    manager = JobManager(run, browser_budget=2, max_queued=1)
+    running = manager.submit(_upload(tmp_path, run, 'running.csv'), {'workers': 8})
+    queued = manager.submit(_upload(tmp_path, run, 'queued.csv'), {})
+
+    assert running.workers == 2
+    with pytest.raises(JobRejected):
+        manager.submit(_upload(tmp_path, run, 'overflow.csv'), {})
+
+    _finish(run, running)
+    _finish(run, queued)
+
+def test_stop_cancels_queued_and_quits_running(tmp_path, run):
+    """実行待ちのジョブは取り消し、実行中のジョブはWebDriverを終了させて停止する"""
+    manager = JobManager(run, browser_budget=1)
+    running = manager.submit(_upload(tmp_path, run, 'running.csv'), {})
+    queued = manager.submit(_upload(tmp_path, run, 'queued.csv'), {})
+
+    assert manager.stop(queued.id)
+    assert queued.state == JOB_STOPPED
+    assert manager.stop(running.id)
+    running.thread.join(5)
+
+    assert run.drivers[running.filepath].quit_called
+    assert running.state == JOB_STOPPED
+    assert queued.filepath not in run.options
+    assert manager.browsers_in_use() == 0
+    assert not manager.stop('missing')
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理結果の結合のテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+import pandas as pd
+
+import openpyxl
+
+from form_automation import merge_results, save_results
+
+def test_count_columns_stay_integer():
+    """未処理行や値のない結果があっても、件数・バイト数の列は整数のまま出力する"""
+    df = pd.DataFrame({'company': ['会社A', '会社B', '会社C'], 'url': ['http://a', 'http://b', 'http://c']})
+    results = [
+        {'index': 0, 'status': 'success', 'error': '送信成功', 'blocked_requests': 3,
+         'bytes_saved': 1024, 'bytes_loaded': 2048, 'stage_timings': {'navigate': 1.5}},
+        {'index': 1, 'status': 'skipped', 'error': '重複'}
+    ]
+
+    merged = merge_results(df, results)
+
+    for column in ('blocked_requests', 'bytes_saved_estimate', 'bytes_loaded'):
+        assert merged[column].dtype == 'int64'
+    assert merged['blocked_requests'].tolist() == [3, 0, 0]
+    assert merged['processing_status'].tolist() == ['success', 'skipped', 'not_processed']
+    assert merged.to_csv(index=False).splitlines()[1].split(',')[7:10] == ['3', '1024', '2048']
+
+def _chunks():
+    """入力シートを2行ずつのチャンク（インデックスは通し番号の行番号）で返す"""
+    df = pd.DataFrame({'company': ['会社A', '会社B', '会社C'], 'url': ['http://a', 'http://b', 'http://c'],
+                       'zip': ['00123', '1000001', '']})
+    return [df.iloc[0:2], df.iloc[2:3]]
+
+def test_save_results_writes_chunks_in_order(tmp_path):
+    """チャンクごとに結合して書き出し、見出しは1回だけ・元の値はそのまま出力する"""
+    results = [{'index': 2, 'status': 'success', 'blocked_requests': 4}]
+    csv_path = tmp_path / 'result.csv'
+    xlsx_path = tmp_path / 'result.xlsx'
+
+    assert save_results(iter(_chunks()), results, str(csv_path))
+    assert save_results(iter(_chunks()), results, str(xlsx_path))
+
+    lines = csv_path.read_text(encoding='utf-8-sig').splitlines()
+    assert len(lines) == 4
+    assert lines[0].startswith('company,url,zip,processing_status')
+    assert lines[1].startswith('会社A,http://a,00123,not_processed')
+    assert lines[3].startswith('会社C,http://c,,success')
+
+    rows = list(openpyxl.load_workbook(xlsx_path).active.iter_rows(values_only=True))
+    header = rows[0]
+    assert len(rows) == 4
+    assert rows[1][header.index('zip')] == '00123'
+    assert rows[3][header.index('processing_status')] == 'success'
+    assert rows[3][header.index('blocked_requests')] == 4
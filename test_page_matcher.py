@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ページ判定用のパターン照合のテスト
+LOVANTVICTORIA営業支援システム
+"""
+
+from page_matcher import (
+    PatternTable, normalize_page, extract_page, match_success, match_confirmation, match_validation_error,
+    classify_page
+)
+
+def _page(url='https://example.co.jp/contact/', title='', text='', controls=''):
+    return normalize_page({'url': url, 'title': title, 'text': text, 'controls': controls})
+
+class ExtractDriver:
+    """判定用の抽出スクリプトの戻り値を返すWebDriver"""
+
+    def __init__(self, page):
+        self.page = page
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append(args)
+        return self.page
+
+def test_pattern_table_keeps_first_position_of_duplicates():
+    """小文字化して重複を除き、元の表での順位を保つ"""
+    table = PatternTable(['Thanks', 'complete', 'thanks', 'THANK YOU'])
+
+    assert table.entries == (('thanks', 0), ('complete', 1), ('thank you', 3))
+    assert table.first('order complete - thank you') == 1
+    assert table.search('order complete - thank you') == 'complete'
+    assert table.first('お問い合わせ') is None
+
+def test_match_success_order_url_then_text_then_title():
+    """成功の判定は URL → 本文 → タイトルの順で、最初に一致した理由を返す"""
+    assert match_success(_page(url='https://example.co.jp/contact/Thanks.html', text='送信しました')) == (
+        '成功URL検出: https://example.co.jp/contact/thanks.html (パターン: thanks)'
+    )
+    assert match_success(_page(text='お問い合わせを受け付けました。', title='Thank You')) == (
+        '成功メッセージ検出: 受け付けました'
+    )
+    assert match_success(_page(title='送信完了 | 株式会社テスト')) == '成功タイトル検出: 送信完了 | 株式会社テスト'
+    assert match_success(_page(text='お名前 メールアドレス お問い合わせ内容')) is None
+
+def test_match_success_uses_message_priority():
+    """本文に複数の成功メッセージがあれば SUCCESS_MESSAGES の順で最初のものを返す"""
+    assert match_success(_page(text='正常に送信されました。ありがとうございました。')) == '成功メッセージ検出: ありがとう'
+
+def test_match_confirmation_checks_url_title_text_and_controls():
+    """確認画面は URL・タイトル・本文・ボタンの値とフォームの送信先のどれかで判定する"""
+    assert match_confirmation(_page(url='https://example.co.jp/contact/confirm/')) == 'confirm'
+    assert match_confirmation(_page(title='入力内容の確認')) == '確認'
+    assert match_confirmation(_page(text='以下の内容でよろしければ送信してください。Preview')) == 'preview'
+    assert match_confirmation(_page(controls='送信する /contact/check.php')) == 'check'
+    assert match_confirmation(_page(text='お名前 メールアドレス', controls='送信')) is None
+
+def test_markup_only_words_are_not_matched():
+    """本文の表示テキストだけで判定し、マークアップ（class名など）の語には反応しない"""
+    page = _page(text='お名前\nメールアドレス\nプライバシーポリシーに同意する', controls='送信 /contact/send.php')
+
+    assert classify_page(page) == {'success': None, 'confirmation': None}
+
+def test_match_validation_error_ignores_messages_already_present():
+    """入力エラーのメッセージは、比較元のページになかったものだけを返す"""
+    before = _page(text='※ 必須項目です')
+    after = _page(text='※ 必須項目です\nメールアドレスを入力してください')
+
+    assert match_validation_error(after) == '入力してください'
+    assert match_validation_error(after, before) == '入力してください'
+    assert match_validation_error(before, before) is None
+
+def test_extract_page_is_one_script_call_and_lowercased():
+    """抽出は1回のスクリプト呼び出しで行い、すべて小文字化する（欠けた項目は空文字）"""
+    driver = ExtractDriver({'url': 'https://Example.co.jp/Thanks/', 'title': 'THANK YOU', 'text': None})
+
+    page = extract_page(driver, limit=100)
+
+    assert driver.calls == [(100,)]
+    assert page == {'url': 'https://example.co.jp/thanks/', 'title': 'thank you', 'text': '', 'controls': ''}
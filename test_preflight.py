@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP事前チェックのテスト
+LOVANTVICTORIA営業支援システム
+
+ローカルのHTTPサーバーでチャンク分割された応答を返し、判定を確認する。
+"""
+
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from preflight import run_preflight, VERDICT_CANDIDATE, VERDICT_NO_FORM
+
+FIRST_CHUNK = b'<html><head><title>Contact</title></head><body><p>' + b'company ' * 2000 + b'</p>'
+FORM_CHUNK = b'<form action="/post" method="post"><textarea name="message"></textarea></form></body></html>'
+
+class ChunkedHandler(BaseHTTPRequestHandler):
+    """本文を2つのチャンクに分け、間を空けて送る（フォームは2つ目のチャンク）"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        chunks = [FIRST_CHUNK, FORM_CHUNK] if self.path == '/contact/' else [FIRST_CHUNK, b'</body></html>']
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+            self.wfile.flush()
+            time.sleep(0.2)
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+def test_form_in_later_chunk_is_candidate():
+    """フォームが2つ目以降のチャンクにあってもフォームなしと判定しない"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        with_form, without_form = run_preflight([f'{base}/contact/', f'{base}/about/'])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert with_form['verdict'] == VERDICT_CANDIDATE
+    assert without_form['verdict'] == VERDICT_NO_FORM
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ネットワークリソースのブロックパターンのテスト
+LOVANTVICTORIA営業支援システム
+
+Network.setBlockedURLs と同じく '*' が任意の文字列（'/' を含む）に一致するものとして照合する。
+"""
+
+from fnmatch import fnmatchcase
+
+from resource_blocking import blocked_url_patterns
+
+def _blocked(url, profile='standard'):
+    return any(fnmatchcase(url, pattern) for pattern in blocked_url_patterns(profile))
+
+def test_tracker_domains_match_only_on_label_boundary():
+    """トラッカーのドメイン本体とサブドメインだけをブロックし、末尾が同じ別のホストはブロックしない"""
+    assert _blocked('https://google-analytics.com/analytics.js', 'trackers')
+    assert _blocked('https://www.google-analytics.com/g/collect?v=2', 'trackers')
+    assert _blocked('https://region1.analytics.google-analytics.com/g/collect', 'trackers')
+    assert _blocked('https://www.youtube.com/embed/abc', 'trackers')
+    assert not _blocked('https://notgoogle-analytics.com/contact/', 'trackers')
+    assert not _blocked('https://static.notyoutube.com/form.js', 'trackers')
+    assert not _blocked('https://myclarity.ms/form/', 'trackers')
+
+def test_profiles():
+    """standard は画像・フォント・動画も、trackers はトラッカーだけをブロックし、none・不明なプロファイルは何もしない"""
+    assert _blocked('https://www.example.co.jp/images/logo.png')
+    assert _blocked('https://www.example.co.jp/fonts/noto.woff2?v=3')
+    assert not _blocked('https://www.example.co.jp/contact/', 'standard')
+    assert not _blocked('https://www.example.co.jp/images/logo.png', 'trackers')
+    assert blocked_url_patterns('none') == []
+    assert blocked_url_patterns('unknown') == []
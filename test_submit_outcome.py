@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+送信結果の判定のテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、probe_page と同じ形の抽出を組み立てて classify_outcome を確認する。
+"""
+
+from submit_outcome import (
+    classify_outcome, OUTCOME_SUCCESS, OUTCOME_CONFIRMATION, OUTCOME_VALIDATION_ERROR
+)
+
+FORM_URL = 'https://www.example.co.jp/contact/'
+
+def _page(url=FORM_URL, title='お問い合わせ', text='', controls='', marker=True, mutations=0,
+          quiet_ms=0, errors=None):
+    """probe_page の戻り値と同じ形の抽出（小文字化済み）"""
+    return {
+        'url': url.lower(), 'title': title.lower(), 'text': text.lower(), 'controls': controls.lower(),
+        'marker': marker, 'mutations': mutations, 'quiet_ms': quiet_ms, 'invalid': 0,
+        'pending': False, 'ready': 'complete', 'errors': list(errors or [])
+    }
+
+BEFORE = _page(text='入力→確認→完了\nお名前\nメールアドレス\nお問い合わせ内容', controls='確認画面へ /contact/confirm/')
+
+def test_step_bar_confirmation_page_is_not_success():
+    """「入力→確認→完了」のステップ表示がある確認画面を送信成功としない"""
+    page = _page(url=FORM_URL + 'confirm/', title='お問い合わせ（確認）', marker=False,
+                 text='入力→確認→完了\nお名前 山田太郎\n以下の内容でよろしければ送信してください',
+                 controls='戻る 送信する /contact/thanks/')
+
+    outcome = classify_outcome(page, BEFORE, 0.5)
+
+    assert outcome['kind'] == OUTCOME_CONFIRMATION
+
+def test_confirmation_notice_mentioning_completion_is_not_success():
+    """「送信完了後…」の案内がある確認画面（URLは同じまま）を送信成功としない"""
+    page = _page(marker=False, text='内容をご確認ください。送信完了後、担当者よりご連絡いたします。',
+                 controls='修正する 送信')
+
+    outcome = classify_outcome(page, BEFORE, 0.5)
+
+    assert outcome['kind'] == OUTCOME_CONFIRMATION
+
+def test_thanks_page_is_success():
+    """確認画面の表示がないありがとうページは送信成功"""
+    page = _page(url=FORM_URL + 'thanks/', title='送信完了', marker=False,
+                 text='お問い合わせありがとうございました。')
+
+    outcome = classify_outcome(page, BEFORE, 0.5)
+
+    assert outcome['kind'] == OUTCOME_SUCCESS
+    assert 'thanks' in outcome['reason']
+
+def test_validation_error_after_navigation():
+    """遷移先に入力エラーの表示があれば入力エラー"""
+    page = _page(marker=False, text='入力→確認→完了\nお名前を入力してください', errors=['お名前を入力してください'])
+
+    outcome = classify_outcome(page, BEFORE, 0.5)
+
+    assert outcome['kind'] == OUTCOME_VALIDATION_ERROR
+
+def test_same_document_step_bar_is_not_new_success():
+    """同じドキュメントでは、クリック前からあった「完了」の表示を成功とみなさない"""
+    page = dict(BEFORE, mutations=3, quiet_ms=1000)
+
+    assert classify_outcome(page, BEFORE, 0.5) is None
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件待機エンジンのテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、暗黙待機の動作を模したWebDriverで段階の予算を確認する。
+"""
+
+import time
+
+from selenium.webdriver.common.timeouts import Timeouts
+from selenium.common.exceptions import NoSuchElementException
+
+from wait_engine import UrlDeadline
+from form_automation import (
+    handle_select_elements, find_form_fields_by_selectors, find_submit_button_by_selectors
+)
+
+class ImplicitWaitDriver:
+    """見つからない要素の検索（find_elements）が暗黙待機の時間だけ止まるWebDriver"""
+
+    def __init__(self):
+        # W3C WebDriverの既定値（暗黙待機なし）
+        self.implicit_wait = 0
+        self.find_calls = 0
+
+    @property
+    def timeouts(self):
+        return Timeouts(implicit_wait=self.implicit_wait)
+
+    @timeouts.setter
+    def timeouts(self, timeouts):
+        if timeouts.implicit_wait:
+            self.implicit_wait = timeouts.implicit_wait
+
+    def implicitly_wait(self, seconds):
+        self.implicit_wait = seconds
+
+    def find_elements(self, by, value):
+        self.find_calls += 1
+        time.sleep(self.implicit_wait)
+        return []
+
+    def find_element(self, by, value):
+        self.find_calls += 1
+        time.sleep(self.implicit_wait)
+        raise NoSuchElementException(value)
+
+def test_fill_stage_without_selects_does_not_wait():
+    """select もラジオボタンもないフォームで fill 段階が暗黙待機に止められない"""
+    driver = ImplicitWaitDriver()
+    deadline = UrlDeadline(driver, {'fill': 2}, total=10)
+
+    started = time.time()
+    with deadline.stage('fill'):
+        handle_select_elements(driver)
+    deadline.restore()
+
+    assert driver.find_calls == 2
+    assert driver.implicit_wait == 0
+    assert time.time() - started < 1
+
+def test_selector_detection_stays_within_url_deadline():
+    """セレクタ方式の検出で検索が何十回外れても、1回ごとに暗黙待機で止まらない"""
+    driver = ImplicitWaitDriver()
+    deadline = UrlDeadline(driver, {'detect': 2}, total=10)
+
+    started = time.time()
+    with deadline.stage('detect'):
+        fields = find_form_fields_by_selectors(driver)
+        button = find_submit_button_by_selectors(driver)
+    deadline.restore()
+
+    assert fields == {}
+    assert button is None
+    assert driver.find_calls > 50
+    assert time.time() - started < 1
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ワーカーのブラウザ起動し直しのテスト
+LOVANTVICTORIA営業支援システム
+
+ブラウザを起動せず、セッションが失われるWebDriverを模してワーカーの動作を確認する。
+"""
+
+import threading
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException
+
+import form_automation
+from host_scheduler import HostScheduler
+from job_journal import JobJournal
+
+class SessionDriver:
+    """dead にするとセッション確認（ウィンドウ一覧の取得）が失敗するWebDriver"""
+
+    def __init__(self):
+        self.dead = False
+        self.current_window_handle = 'main'
+
+    @property
+    def window_handles(self):
+        if self.dead:
+            raise InvalidSessionIdException('invalid session id')
+        return ['main']
+
+    def quit(self):
+        pass
+
+def _process_url(driver, url_info, options=None, layout_cache=None, lifecycle=None, journal=None):
+    """crash を含むURLの1回目でセッションを失わせる（clicked を含むURLは送信ボタンのクリック後に落ちる）"""
+    if 'clicked' in url_info['url']:
+        journal.mark_in_flight(url_info)
+    if 'crash' in url_info['url'] and not url_info.get('session_retries'):
+        driver.dead = True
+    status = 'failed' if driver.dead else 'success'
+    return {'index': url_info['index'], 'url': url_info['url'], 'company': url_info['company'],
+            'status': status, 'error': 'エラー: invalid session id' if driver.dead else '', 'timestamp': ''}
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / 'journal.sqlite3'))
+    yield journal
+    journal.close()
+
+def _shared(total, journal):
+    return {
+        'status_dict': {'is_running': True, 'success': 0, 'failed': 0, 'processed': 0, 'current_url': ''},
+        'callback_func': lambda *args: None,
+        'options': form_automation.resolve_job_options({'restart_after_urls': 0, 'renderer_rss_limit_mb': 0}),
+        'layout_cache': None,
+        'journal': journal,
+        'contact_index': None,
+        'command_report': None,
+        'results': [],
+        'total': total,
+        'lock': threading.Lock(),
+        'started_workers': 0,
+        'errors': []
+    }
+
+def _urls(*urls):
+    return [{'index': i, 'url': url, 'company': f'会社{i}'} for i, url in enumerate(urls)]
+
+def test_respawn_requeues_in_flight_url(monkeypatch, journal):
+    """セッションが失われたら起動し直し、処理中だったURLを再処理する"""
+    launched = []
+
+    def launch_browser(slot, page_load_strategy='eager'):
+        launched.append(SessionDriver())
+        return launched[-1], None
+
+    monkeypatch.setattr(form_automation, 'launch_browser', launch_browser)
+    monkeypatch.setattr(form_automation, 'process_url_in_new_tab', _process_url)
+    registered = []
+    urls = _urls('http://a.example/crash', 'http://b.example/ok')
+    shared = _shared(len(urls), journal)
+
+    form_automation._run_worker(0, HostScheduler(urls, 0), shared, registered.append)
+
+    assert len(launched) == 2
+    assert registered == launched
+    assert sorted((r['url'], r['status']) for r in shared['results']) == [
+        ('http://a.example/crash', 'success'), ('http://b.example/ok', 'success')
+    ]
+    assert shared['status_dict']['browser_respawns'] == 1
+    assert shared['status_dict']['respawn_causes'] == {'invalid_session': 1}
+
+def test_failed_relaunch_keeps_in_flight_url_queued(monkeypatch, journal):
+    """起動し直しに失敗しても、処理中だったURLはスケジューラに残る"""
+    launched = []
+
+    def launch_browser(slot, page_load_strategy='eager'):
+        if launched:
+            raise Exception('Chromeを起動できません')
+        launched.append(SessionDriver())
+        return launched[-1], None
+
+    monkeypatch.setattr(form_automation, 'launch_browser', launch_browser)
+    monkeypatch.setattr(form_automation, 'process_url_in_new_tab', _process_url)
+    urls = _urls('http://a.example/crash')
+    shared = _shared(len(urls), journal)
+    scheduler = HostScheduler(urls, 0)
+
+    form_automation._run_worker(0, scheduler, shared)
+
+    assert shared['results'] == []
+    assert shared['errors'] == ['Chromeを起動できません']
+    assert scheduler.has_pending()
+    requeued = scheduler.acquire()
+    assert requeued['url'] == 'http://a.example/crash'
+    assert requeued['session_retries'] == 1
+
+def test_crash_after_submit_click_is_not_resubmitted(monkeypatch, journal):
+    """送信ボタンのクリック後にセッションが失われたURLは、再処理せず失敗として記録する"""
+    monkeypatch.setattr(form_automation, 'launch_browser', lambda slot, page_load_strategy='eager': (SessionDriver(), None))
+    calls = []
+    def process_url(driver, url_info, *args, **kwargs):
+        calls.append(url_info['url'])
+        return _process_url(driver, url_info, *args, **kwargs)
+    monkeypatch.setattr(form_automation, 'process_url_in_new_tab', process_url)
+    urls = _urls('http://a.example/crash-clicked', 'http://b.example/ok')
+    shared = _shared(len(urls), journal)
+
+    form_automation._run_worker(0, HostScheduler(urls, 0), shared)
+
+    assert calls == ['http://a.example/crash-clicked', 'http://b.example/ok']
+    assert [(r['url'], r['status']) for r in shared['results']] == [
+        ('http://a.example/crash-clicked', 'failed'), ('http://b.example/ok', 'success')
+    ]
+    assert '再送信しません' in shared['results'][0]['error']
+    assert journal.load_in_flight() == []
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件待機エンジン
+LOVANTVICTORIA営業支援システム
+
+固定の time.sleep の代わりに、ページの状態（読み込み完了・フォーム出現・
+URL変化・DOM変化）を監視し、条件を満たした時点ですぐに戻る。
+各段階の待機には上限時間（予算）を設ける。
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+from selenium.webdriver.common.timeouts import Timeouts
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# 段階ごとの最大待機時間（秒）
+WAIT_BUDGETS = {
+    'page_load': 10,      # driver.get 後の document.readyState
+    'form': 5,            # フォーム要素の出現
+    'new_tab': 5,         # 新しいタブの出現
+    'after_submit': 8,    # 送信クリック後の結果判定（submit_outcome.py）
+    'confirmation': 8,    # 確認画面での送信クリック後の結果判定
+    'no_change': 3,       # クリック後に何も変化しなければ「変化なし」と判定するまでの時間
+    'mutation_quiet': 0.5 # DOM変化が落ち着いたとみなす無変化時間
+}
+
+# 1URLあたりの処理段階ごとの上限時間（秒）
+STAGE_BUDGETS = {
+    'navigate': 15,   # ページアクセス・読み込み・フォーム出現
+    'detect': 8,      # キャッシュ参照・入力欄の検出
+    'fill': 15,       # 入力と選択
+    'submit': 12,     # 送信ボタン検出・クリック・送信結果の判定
+    'confirm': 12,    # 確認画面の送信と送信結果の判定
+    'verify': 8       # 成功判定
+}
+
+# 1URLあたりの上限時間（秒）。各段階の予算はこの残り時間を超えない
+URL_DEADLINE = 60
+
+# 段階外で使うWebDriverのタイムアウト（setup_chrome_driverの設定値）
+# 要素の検索は条件待機とスナップショットのスクリプトで行うため、暗黙待機は使わない（0のまま）。
+# 暗黙待機があると、見つからない要素の検索（find_elements）が毎回その時間だけ止まる。
+DEFAULT_TIMEOUTS = {'page_load': 10, 'script': 30}
+
+# 条件の確認間隔（秒）
+POLL_INTERVAL = 0.1
+
+# ページ変化検出用のマーカーとMutationObserverを仕込むスクリプト
+_ARM_CHANGE_DETECTOR_SCRIPT = """
+window.__formAutoMarker = true;
+window.__formAutoMutations = 0;
+window.__formAutoLastMutation = 0;
+if (window.__formAutoObserver) { window.__formAutoObserver.disconnect(); }
+window.__formAutoObserver = new MutationObserver(function(records) {
+    window.__formAutoMutations += records.length;
+    window.__formAutoLastMutation = Date.now();
+});
+window.__formAutoObserver.observe(document.documentElement,
+    {childList: true, subtree: true, characterData: true, attributes: true});
+window.__formAutoInvalid = 0;
+window.__formAutoSubmitted = false;
+window.__formAutoUnloading = false;
+if (!window.__formAutoListeners) {
+    window.__formAutoListeners = true;
+    // ブラウザの入力チェックで送信が止められた
+    document.addEventListener('invalid', function() { window.__formAutoInvalid += 1; }, true);
+    // submit イベントが発生した（Ajax送信で既定の動作が止められた場合も含む）
+    document.addEventListener('submit', function() { window.__formAutoSubmitted = true; }, true);
+    // ページ遷移が始まった（応答待ち）
+    window.addEventListener('beforeunload', function() { window.__formAutoUnloading = true; });
+}
+"""
+
+# ページ変化の状態を取得するスクリプト
+_CHANGE_STATE_SCRIPT = """
+return {
+    marker: window.__formAutoMarker === true,
+    mutations: window.__formAutoMutations || 0,
+    quiet_ms: window.__formAutoLastMutation ? Date.now() - window.__formAutoLastMutation : 0,
+    ready: document.readyState,
+    url: location.href
+};
+"""
+
+# 入力可能なフォーム要素の数を数えるスクリプト
+_FORM_CONTROL_COUNT_SCRIPT = """
+return document.querySelectorAll(
+    'input:not([type="hidden"]), textarea, select').length;
+"""
+
+def resolve_wait_budgets(overrides=None):
+    """既定の待機予算にジョブ固有の指定を重ねて返す"""
+    budgets = dict(WAIT_BUDGETS)
+    if overrides:
+        budgets.update(overrides)
+    return budgets
+
+def wait_until(driver, condition, timeout, poll_interval=POLL_INTERVAL):
+    """condition(driver) が真になるまで待機し、その値を返す（タイムアウト時はNone）"""
+    try:
+        return WebDriverWait(
+            driver, timeout,
+            poll_frequency=poll_interval,
+            ignored_exceptions=(WebDriverException,)
+        ).until(condition)
+    except TimeoutException:
+        return None
+
+def wait_for_document_ready(driver, timeout, states=('interactive', 'complete')):
+    """document.readyState が指定状態になるまで待機"""
+    started = time.time()
+    ready = wait_until(
+        driver,
+        lambda d: d.execute_script('return document.readyState') in states,
+        timeout
+    )
+    logging.debug(f"readyState待機: {time.time() - started:.2f}秒 ({'完了' if ready else 'タイムアウト'})")
+    return bool(ready)
+
+def wait_for_form(driver, timeout):
+    """入力可能なフォーム要素が1つ以上現れるまで待機"""
+    started = time.time()
+    found = wait_until(
+        driver,
+        lambda d: d.execute_script(_FORM_CONTROL_COUNT_SCRIPT) > 0,
+        timeout
+    )
+    logging.debug(f"フォーム出現待機: {time.time() - started:.2f}秒 ({'検出' if found else 'タイムアウト'})")
+    return bool(found)
+
+def wait_for_new_window(driver, original_handles, timeout):
+    """新しいウィンドウ（タブ）が開かれるまで待機"""
+    return bool(wait_until(
+        driver,
+        EC.number_of_windows_to_be(len(original_handles) + 1),
+        timeout
+    ))
+
+def wait_for_url_change(driver, old_url, timeout):
+    """URLが old_url から変化するまで待機"""
+    return bool(wait_until(driver, EC.url_changes(old_url), timeout))
+
+def arm_change_detector(driver):
+    """クリック前にページ変化検出用のマーカーとMutationObserverを仕込む"""
+    try:
+        driver.execute_script(_ARM_CHANGE_DETECTOR_SCRIPT)
+        return True
+    except WebDriverException as e:
+        logging.debug(f"変化検出の準備に失敗: {str(e)}")
+        return False
+
+def wait_for_page_change(driver, old_url, timeout, quiet_period=None):
+    """arm_change_detector 以降のページ変化を待機し、変化の種類を返す
+
+    戻り値: 'navigation'（ページ遷移）, 'url_change'（URLのみ変化）,
+    'mutation'（同一ページ内のDOM変化）, 'timeout'（変化なし）
+    """
+    if quiet_period is None:
+        quiet_period = WAIT_BUDGETS['mutation_quiet']
+    started = time.time()
+    deadline = started + timeout
+    outcome = 'timeout'
+
+    while time.time() < deadline:
+        try:
+            state = driver.execute_script(_CHANGE_STATE_SCRIPT)
+        except WebDriverException:
+            # 遷移中はスクリプトが失敗することがある
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        if not state['marker']:
+            # マーカーが消えた = 新しいドキュメントに遷移した
+            wait_for_document_ready(driver, max(0, deadline - time.time()))
+            outcome = 'navigation'
+            break
+        if state['url'] != old_url:
+            outcome = 'url_change'
+            break
+        if state['mutations'] > 0 and state['quiet_ms'] >= quiet_period * 1000:
+            outcome = 'mutation'
+            break
+        time.sleep(POLL_INTERVAL)
+
+    logging.debug(f"ページ変化待機: {time.time() - started:.2f}秒 ({outcome})")
+    return outcome
+
+def wait_for_interval(last_started, interval):
+    """前回の開始時刻から interval 秒経過するまで待機（経過済みなら即座に戻る）"""
+    if last_started is None:
+        return 0
+    remaining = interval - (time.time() - last_started)
+    if remaining > 0:
+        time.sleep(remaining)
+        return remaining
+    return 0
+
+class DeadlineExceeded(Exception):
+    """URL処理の段階が予算を超えた"""
+
+    def __init__(self, stage, budget, elapsed):
+        super().__init__(f"{stage}段階が予算{budget:.0f}秒を超えました（{elapsed:.1f}秒）")
+        self.stage = stage
+        self.budget = budget
+        self.elapsed = elapsed
+
+class UrlDeadline:
+    """1URLの処理全体の期限と段階ごとの予算を管理するウォッチドッグ
+
+    段階に入るたびにWebDriverのタイムアウト（ページ読み込み・スクリプト）を
+    段階の残り時間に切り詰め、段階の終了時や check() で超過を検出すると
+    DeadlineExceeded を送出する。WebDriver自体は終了させない。
+    """
+
+    def __init__(self, driver, stage_budgets=None, total=URL_DEADLINE):
+        self.driver = driver
+        self.stage_budgets = dict(STAGE_BUDGETS, **(stage_budgets or {}))
+        self.total = total
+        self.started = time.time()
+        self.current_stage = None
+        self.stage_started = None
+        self.stage_deadline = None
+        self.stage_budget = None
+        self.timings = {}
+
+    def remaining(self):
+        """URL全体の残り時間（秒）"""
+        return self.total - (time.time() - self.started)
+
+    def budget(self, timeout):
+        """待機時間を現在の段階の残り時間に切り詰める"""
+        if self.stage_deadline is None:
+            return timeout
+        return max(0, min(timeout, self.stage_deadline - time.time()))
+
+    def check(self):
+        """現在の段階が予算を超えていれば DeadlineExceeded を送出"""
+        if self.stage_deadline is not None and time.time() > self.stage_deadline:
+            raise DeadlineExceeded(self.current_stage, self.stage_budget, time.time() - self.stage_started)
+
+    def _clamp_timeouts(self, seconds):
+        """WebDriverのタイムアウトを seconds 以下にまとめて設定（1回のコマンド、暗黙待機は0のまま）"""
+        seconds = max(1, seconds)
+        self.driver.timeouts = Timeouts(
+            page_load=min(DEFAULT_TIMEOUTS['page_load'], seconds),
+            script=min(DEFAULT_TIMEOUTS['script'], seconds)
+        )
+
+    @contextmanager
+    def stage(self, name):
+        """段階を開始し、終了時に超過を確認する
+
+        段階中にWebDriverのタイムアウトが発生し、かつ予算を使い切っていれば
+        DeadlineExceeded に置き換える。
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(name, 0, 0)
+        self.current_stage = name
+        self.stage_started = time.time()
+        self.stage_budget = min(self.stage_budgets.get(name, remaining), remaining)
+        self.stage_deadline = self.stage_started + self.stage_budget
+        self._clamp_timeouts(self.stage_budget)
+        try:
+            yield self
+        except (TimeoutException, WebDriverException) as e:
+            if time.time() >= self.stage_deadline:
+                raise DeadlineExceeded(name, self.stage_budget, time.time() - self.stage_started) from e
+            raise
+        finally:
+            self.timings[name] = round(time.time() - self.stage_started, 2)
+        self.check()
+
+    @contextmanager
+    def span(self, name):
+        """段階内の処理時間だけを timings に記録する（予算・タイムアウトは変えない）"""
+        started = time.time()
+        try:
+            yield self
+        finally:
+            self.timings[name] = round(time.time() - started, 2)
+
+    def restore(self):
+        """段階外の既定タイムアウトに戻す"""
+        self.current_stage = None
+        self.stage_deadline = None
+        try:
+            self.driver.timeouts = Timeouts(**DEFAULT_TIMEOUTS)
+        except WebDriverException as e:
+            logging.debug(f"タイムアウトの復元に失敗: {str(e)}")